@@ -4,8 +4,11 @@ import plotly.express as px
 from datetime import datetime
 import json
 import os
-from utils.mirror_agent import MirrorAgent
+import tempfile
+from utils.mirror_agent import MirrorAgent, get_mirror_agent
 from utils.memory_manager import MemoryManager
+from utils.memory_registry import resolve_tenant_id
+from config import Config
 from utils.personality_analyzer import PersonalityAnalyzer
 
 # Page configuration
@@ -24,12 +27,27 @@ def load_css():
 # Initialize session state
 def init_session_state():
     if 'mirror_agent' not in st.session_state:
-        st.session_state.mirror_agent = MirrorAgent()
+        # Agents, clients and memory are pooled per process; the session only keeps a reference
+        login = (st.user.get("email") or st.user.get("sub")) if getattr(st.user, "is_logged_in", False) else None
+        user_id = resolve_tenant_id(login, st.query_params.get("user"))
+        if user_id is None:
+            st.info("Sign in to talk to your mirror.")
+            st.button("Sign in", on_click=st.login)
+            st.stop()
+        st.session_state.mirror_agent = get_mirror_agent(user_id)
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = []
     if 'typing' not in st.session_state:
         st.session_state.typing = False
 
+# Write an export to a temporary file only when the download is clicked; Streamlit reads it into memory to serve it
+def export_file(agent):
+    f = tempfile.TemporaryFile()
+    for chunk in agent.iter_export():
+        f.write(chunk.encode("utf-8"))
+    f.seek(0)
+    return f
+
 # Create animated header
 def create_header():
     st.markdown("""
@@ -100,10 +118,10 @@ def create_sidebar():
             st.rerun()
         
         if st.button("📥 Export Data", key="export_btn", help="Download your personality data"):
-            data = st.session_state.mirror_agent.export_data()
+            agent = st.session_state.mirror_agent
             st.download_button(
                 "💾 Download JSON",
-                json.dumps(data, indent=2),
+                lambda: export_file(agent),
                 file_name=f"mirrorme_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                 mime="application/json"
             )
@@ -209,15 +227,26 @@ def chat_page():
         # Show typing indicator
         st.session_state.typing = True
         
-        # Generate AI response
+        # Stream AI response into the page as it is generated
+        response_placeholder = st.empty()
         with st.spinner("🤖 Thinking..."):
             try:
                 last_user_message = st.session_state.chat_history[-1]["content"]
-                ai_response = st.session_state.mirror_agent.generate_response(last_user_message)
+                ai_response = ""
+                for chunk in st.session_state.mirror_agent.stream_response(last_user_message):
+                    ai_response += chunk
+                    response_placeholder.markdown(f"""
+                    <div class="chat-message ai-message">
+                        <div class="message-avatar ai-avatar">🪞</div>
+                        <div class="message-content">
+                            <div class="message-text">{ai_response}</div>
+                        </div>
+                    </div>
+                    """, unsafe_allow_html=True)
                 
                 ai_message = {
                     "role": "assistant",
-                    "content": ai_response,
+                    "content": ai_response.strip(),
                     "timestamp": datetime.now().strftime("%H:%M")
                 }
                 st.session_state.chat_history.append(ai_message)
@@ -272,8 +301,8 @@ def dashboard_page():
     </div>
     """, unsafe_allow_html=True)
     
-    # Get personality data
-    personality_data = st.session_state.mirror_agent.memory_manager.get_personality_traits()
+    # Get personality data; charts are built once per profile revision
+    personality_data = st.session_state.mirror_agent.memory_manager.get_profile()
     
     if not personality_data:
         st.markdown("""
@@ -298,7 +327,7 @@ def dashboard_page():
         # Personality radar chart
         traits = personality_data.get("personality_traits", {})
         if traits:
-            fig = create_personality_radar(traits)
+            fig = personality_data.view("radar", lambda data: create_personality_radar(data["personality_traits"]))
             st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
     
     with col2:
@@ -435,6 +464,9 @@ def analytics_page():
     with col4:
         create_analytics_card("Learning Stage", progress.get('learning_stage', 'Initial Learning'), "🎯", "#ff6b6b")
     
+    if progress.get('analysis_pending', False):
+        st.info("⏳ Personality analysis pending - your profile will refresh when it finishes.")
+    
     # Learning progress chart
     st.markdown("""
     <div class="analytics-section">
@@ -455,7 +487,7 @@ def analytics_page():
         """, unsafe_allow_html=True)
     
     # Message statistics
-    personality_data = st.session_state.mirror_agent.memory_manager.get_personality_traits()
+    personality_data = st.session_state.mirror_agent.memory_manager.get_profile()
     stats = personality_data.get("message_statistics", {})
     
     if stats:
@@ -572,10 +604,10 @@ def settings_page():
     
     with col2:
         if st.button("💬 Export Chat History", key="export_chat"):
-            chat_data = st.session_state.mirror_agent.export_data()
+            agent = st.session_state.mirror_agent
             st.download_button(
                 "💾 Download History",
-                json.dumps(chat_data, indent=2),
+                lambda: export_file(agent),
                 file_name=f"chat_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                 mime="application/json"
             )
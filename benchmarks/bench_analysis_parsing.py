@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark personality analysis reply handling: plain json.loads with the
+default profile on any error, as before, against the tolerant parser with
+one repair retry.
+
+The model is simulated. Its replies are valid JSON, or JSON in a code
+fence, after a sentence of prose, with a trailing comma, with scores
+written as text, cut off mid-object, or a refusal, in the given shares.
+Repair requests succeed unless the reply held no analysis at all. Reports
+the share of analyses kept, tokens paid for analyses that were thrown
+away, and extra tokens spent on repairs.
+
+Usage: python benchmarks/bench_analysis_parsing.py [--analyses 1000] [--messages 50]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage
+from utils.personality_analyzer import PersonalityAnalyzer
+from utils.prompt_builder import get_token_counter
+
+WORDS = ("so i was thinking about the weekend and honestly it could be fun to go hiking "
+         "or maybe just stay in and cook something new lol what do you think").split()
+
+ANALYSIS = {
+    "communication_style": {"tone": "casual", "formality_level": 3, "enthusiasm_level": 8,
+                            "typical_sentence_length": "short", "uses_emojis": True, "uses_slang": True},
+    "personality_traits": {"openness": 8, "conscientiousness": 4, "extraversion": 7,
+                           "agreeableness": 6, "neuroticism": 3},
+    "interests_and_topics": ["hiking", "cooking", "indie music"],
+    "favorite_phrases": ["lol", "honestly"],
+    "emotional_patterns": {"default_mood": "positive", "emotional_range": 6, "stress_indicators": []},
+    "linguistic_patterns": {"avg_words_per_message": 14, "complexity_level": 4, "question_frequency": 6}
+}
+
+def text_scores(text):
+    scores = {trait: f"{score}/10" for trait, score in ANALYSIS["personality_traits"].items()}
+    return json.dumps(dict(ANALYSIS, personality_traits=scores), indent=2)
+
+# Reply shapes and how often the model produces each
+REPLIES = {
+    "valid": (0.80, lambda text: text),
+    "fenced": (0.08, lambda text: f"```json\n{text}\n```"),
+    "prose": (0.04, lambda text: f"Here is the analysis you asked for:\n{text}"),
+    "trailing comma": (0.02, lambda text: text[:-2] + ",\n}"),
+    "text scores": (0.02, text_scores),
+    "truncated": (0.03, lambda text: text[:len(text) // 2]),
+    "refusal": (0.01, lambda text: "I'm sorry, I can't determine personality traits from these messages."),
+}
+
+class SimulatedAnalyst:
+    """Stands in for the chat model, replying in a randomly drawn shape"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.last_shape = None
+
+    def invoke(self, prompt):
+        text = json.dumps(ANALYSIS, indent=2)
+        if "could not be used" in prompt:
+            # A repair request: the content comes back as valid JSON unless there was none
+            return AIMessage(content=text if self.last_shape != "refusal" else "I can't help with that.")
+        shapes = list(REPLIES)
+        self.last_shape = self.rng.choices(shapes, weights=[REPLIES[shape][0] for shape in shapes])[0]
+        return AIMessage(content=REPLIES[self.last_shape][1](text))
+
+def old_analyze(analyzer, messages, counter):
+    """The previous handling: json.loads, falling back to the default profile; returns (kept, wasted tokens)"""
+    prompt = analyzer.analysis_prompt.format(messages="\n".join(messages))
+    response_text = analyzer.llm.invoke(prompt).content
+    try:
+        json.loads(response_text)
+        return True, 0
+    except Exception:
+        return False, counter.count(prompt) + counter.count(response_text)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--analyses", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=50, help="user messages per analysis")
+    args = parser.parse_args()
+
+    counter = get_token_counter()
+    rng = random.Random(3)
+    messages = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))) for _ in range(args.messages)]
+    statistics = {"message_statistics": {}}
+
+    old = PersonalityAnalyzer(llm=SimulatedAnalyst(random.Random(17)))
+    old_kept, old_wasted = 0, 0
+    for _ in range(args.analyses):
+        kept, wasted = old_analyze(old, messages, counter)
+        old_kept += kept
+        old_wasted += wasted
+
+    new = PersonalityAnalyzer(llm=SimulatedAnalyst(random.Random(17)))
+    for _ in range(args.analyses):
+        new.analyze_messages(messages, statistics)
+    stats = new.get_stats()
+
+    print(f"🪞 Analysis parsing benchmark ({args.analyses} analyses of {args.messages} messages, "
+          f"{1 - REPLIES['valid'][0]:.0%} of replies not plain JSON)")
+    print("=" * 72)
+    print(f"{'handling':<22} {'kept':>8} {'wasted tokens':>14} {'repair tokens':>14}")
+    print(f"{'json.loads':<22} {old_kept / args.analyses:>8.1%} {old_wasted:>14,} {0:>14,}")
+    print(f"{'tolerant + repair':<22} {stats['success_rate']:>8.1%} {stats['wasted_tokens']:>14,} "
+          f"{stats['repair_tokens']:>14,}")
+    print("=" * 72)
+    print(f"{stats['repaired']} analyses repaired, {stats['failed']} failed")
+
+if __name__ == "__main__":
+    main()
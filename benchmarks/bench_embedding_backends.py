@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Compare embedding backends on a synthetic chat corpus: time to embed and
+index the corpus, and per-query latency (embed + FAISS search).
+
+The OpenAI backend is only included with --openai and a configured key,
+since it costs real API calls.
+
+Usage: python benchmarks/bench_embedding_backends.py [--messages 10000] [--openai]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+from config import Config
+from utils.embeddings import embed_array, get_embeddings
+from utils.vector_index import MessageVectorIndex
+
+TOPICS = {
+    "music": ["guitar", "concert", "album", "playlist", "drums", "lyrics"],
+    "coding": ["python", "bug", "deploy", "refactor", "tests", "compiler"],
+    "food": ["pizza", "ramen", "recipe", "spicy", "brunch", "tacos"],
+    "travel": ["flight", "hostel", "passport", "beach", "train", "mountains"],
+    "fitness": ["run", "gym", "yoga", "marathon", "stretching", "protein"],
+}
+FILLER = ["honestly", "lol", "i think", "so yeah", "kinda", "today", "again", "maybe", "super"]
+
+def make_corpus(count, seed=7):
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    corpus = []
+    for i in range(count):
+        topic = topics[i % len(topics)]
+        words = rng.sample(TOPICS[topic], 3) + rng.sample(FILLER, 3)
+        rng.shuffle(words)
+        corpus.append((topic, " ".join(words)))
+    return corpus
+
+def bench_backend(backend, corpus, queries):
+    embeddings = get_embeddings(backend)
+    texts = [text for _, text in corpus]
+
+    start = time.perf_counter()
+    index = MessageVectorIndex(embeddings)
+    for batch_start in range(0, len(texts), 1000):
+        batch = texts[batch_start:batch_start + 1000]
+        ids = list(range(batch_start, batch_start + len(batch)))
+        index.add_embeddings(ids, embed_array(embeddings, batch),
+                             [Document(page_content=text) for text in batch])
+    build = time.perf_counter() - start
+
+    latencies = []
+    matches = 0
+    for topic, query in queries:
+        start = time.perf_counter()
+        results = index.similarity_search(query, k=1)
+        latencies.append(time.perf_counter() - start)
+        matches += bool(results) and results[0].page_content in topic_texts(corpus, topic)
+    return build, statistics.mean(latencies) * 1000, matches / len(queries)
+
+_topic_cache = {}
+
+def topic_texts(corpus, topic):
+    if topic not in _topic_cache:
+        _topic_cache[topic] = {text for t, text in corpus if t == topic}
+    return _topic_cache[topic]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--openai", action="store_true", help="include the OpenAI backend")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.messages)
+    queries = make_corpus(args.queries, seed=11)
+    backends = ["fake", "local"]
+    if args.openai and Config.OPENAI_API_KEY:
+        backends.append("openai")
+
+    print(f"🪞 Embedding backend benchmark ({args.messages} messages, {Config.EMBEDDING_DIMENSIONS} dims local)")
+    print("=" * 72)
+    print(f"{'backend':>10} {'build (s)':>12} {'msgs/sec':>12} {'query (ms)':>12} {'topic@1':>10}")
+    for backend in backends:
+        build, query_ms, topic_at_1 = bench_backend(backend, corpus, queries)
+        print(f"{backend:>10} {build:>12.3f} {args.messages / build:>12.0f} {query_ms:>12.3f} {topic_at_1:>10.0%}")
+    print("=" * 72)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory for loading and exporting a large chat history:
+parsing the whole snapshot with json.load and exporting with json.dumps,
+versus the streaming tail loader and the chunked export.
+
+Each mode runs in a fresh process so peak RSS covers only that mode.
+
+Usage: python benchmarks/bench_history_memory.py [--size-mb 100]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chat_log import ChatLog
+from utils.embeddings import FakeEmbeddings
+from utils.memory_manager import MemoryManager
+
+def write_history(path, size_mb):
+    """Write a legacy plain-list chat_history.json of roughly size_mb"""
+    target = size_mb * 1024 * 1024
+    with open(path, 'w') as f:
+        f.write("[\n")
+        written, i = 0, 0
+        while written < target:
+            message = {
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": f"message {i} " + "lorem ipsum dolor sit amet " * 8,
+                "timestamp": "2024-01-01T12:00:00",
+                "metadata": {}
+            }
+            text = ("" if i == 0 else ",\n") + json.dumps(message, indent=2)
+            f.write(text)
+            written += len(text)
+            i += 1
+        f.write("\n]")
+    return i
+
+def load_whole_snapshot(self, limit=None):
+    """The previous loader: parse the entire file, then keep the tail"""
+    with open(self.snapshot_file, 'r') as f:
+        data = json.load(f)
+    for message_id, message in enumerate(data, 1):
+        message.setdefault('id', message_id)
+    return data[-limit:] if limit else data, len(data)
+
+def run_once(mode, data_dir):
+    if mode == "json.load":
+        ChatLog._load_snapshot = load_whole_snapshot
+
+    start = time.perf_counter()
+    memory = MemoryManager(embeddings=FakeEmbeddings(64), data_dir=data_dir)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with tempfile.TemporaryFile() as f:
+        if mode == "json.load":
+            f.write(json.dumps(memory.export_data(), indent=2).encode("utf-8"))
+        else:
+            for chunk in memory.iter_export():
+                f.write(chunk.encode("utf-8"))
+    export_seconds = time.perf_counter() - start
+
+    return {
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "load_seconds": load_seconds,
+        "export_seconds": export_seconds,
+        "messages": len(memory.chat_history)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_once(args.mode, args.data_dir)))
+        return
+
+    print(f"🪞 Chat history memory benchmark ({args.size_mb}MB legacy history)")
+    print("=" * 72)
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, "chat_history.json")
+        count = write_history(source, args.size_mb)
+        print(f"Wrote {count} messages")
+        print(f"{'loader':<12} {'peak rss (MB)':>14} {'load (s)':>10} {'export (s)':>11} {'kept':>8}")
+
+        for mode in ("json.load", "streaming"):
+            # Each run gets its own copy because loading migrates the data directory
+            data_dir = os.path.join(root, mode)
+            os.makedirs(data_dir)
+            os.link(source, os.path.join(data_dir, "chat_history.json"))
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--mode", mode, "--data-dir", data_dir],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:<12} {result['peak_rss_mb']:>14.1f} {result['load_seconds']:>10.2f} "
+                  f"{result['export_seconds']:>11.3f} {result['messages']:>8}")
+    print("=" * 72)
+
+if __name__ == "__main__":
+    main()
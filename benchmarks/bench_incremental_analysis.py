@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark personality analysis cycles: re-analyzing the full ANALYSIS_WINDOW
+every cycle versus sending only new messages with a compact profile summary
+and blending the result into the profile.
+
+The model is simulated: it answers after a base delay plus a delay per
+prompt token, and estimates the user's true trait scores with noise that
+shrinks with the number of messages it reads. Reports prompt tokens and
+latency per cycle, how far scores move between cycles, and their error
+against the true scores.
+
+Usage: python benchmarks/bench_incremental_analysis.py [--messages 500] [--base-ms 50] [--ms-per-token 0.1]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import AIMessage
+from config import Config
+from utils.memory_manager import MemoryManager
+from utils.personality_analyzer import PersonalityAnalyzer
+
+WORDS = ("so i was thinking about the weekend and honestly it could be fun to go hiking "
+         "or maybe just stay in and cook something new lol what do you think").split()
+TRUE_TRAITS = {"openness": 8, "conscientiousness": 4, "extraversion": 7, "agreeableness": 6, "neuroticism": 3}
+INTERESTS = ["hiking", "cooking", "indie music", "board games", "travel", "photography", "coffee", "running"]
+
+class SimulatedAnalyst:
+    """Stands in for the chat model, with latency and accuracy depending on the prompt"""
+
+    def __init__(self, rng, base_ms, ms_per_token):
+        self.rng = rng
+        self.base_ms = base_ms
+        self.ms_per_token = ms_per_token
+        self.analyzer = None
+
+    def invoke(self, prompt):
+        stats = self.analyzer.last_analysis_stats
+        time.sleep((self.base_ms + self.ms_per_token * stats["prompt_tokens"]) / 1000)
+        noise = 3 / stats["messages"] ** 0.5
+        return AIMessage(content=json.dumps({
+            "communication_style": {"tone": "casual", "formality_level": round(self.rng.gauss(3, noise))},
+            "personality_traits": {trait: round(min(10, max(1, self.rng.gauss(score, noise))))
+                                   for trait, score in TRUE_TRAITS.items()},
+            "interests_and_topics": self.rng.sample(INTERESTS, 4),
+            "favorite_phrases": ["lol", "honestly"]
+        }))
+
+def run(incremental, args):
+    """Chat through the messages, analyzing as the agent would; returns per-cycle results"""
+    Config.INCREMENTAL_PERSONALITY_ANALYSIS = incremental
+    rng = random.Random(11)
+    model = SimulatedAnalyst(random.Random(29), args.base_ms, args.ms_per_token)
+    analyzer = PersonalityAnalyzer(llm=model)
+    model.analyzer = analyzer
+
+    tokens, latencies, moves, errors = [], [], [], []
+    with tempfile.TemporaryDirectory() as data_dir:
+        memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+        for count in range(1, args.messages + 1):
+            memory.add_message("user", " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))))
+            if count < Config.MIN_MESSAGES_FOR_ANALYSIS or count % Config.PERSONALITY_ANALYSIS_FREQUENCY:
+                continue
+
+            before = dict(memory.get_profile().get("personality_traits", {}))
+            start = time.perf_counter()
+            analyzer.update_profile(memory)
+            latencies.append((time.perf_counter() - start) * 1000)
+            tokens.append(analyzer.last_analysis_stats["prompt_tokens"])
+
+            after = memory.get_profile().get("personality_traits")
+            if before:
+                moves.append(statistics.mean(abs(after[trait] - before[trait]) for trait in TRUE_TRAITS))
+            errors.append(statistics.mean(abs(after[trait] - score) for trait, score in TRUE_TRAITS.items()))
+    # The first cycle is a full analysis in both modes
+    return tokens[1:], latencies[1:], moves, errors[1:]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--base-ms", type=float, default=50, help="simulated model latency per request")
+    parser.add_argument("--ms-per-token", type=float, default=0.1, help="simulated model latency per prompt token")
+    args = parser.parse_args()
+
+    saved = Config.INCREMENTAL_PERSONALITY_ANALYSIS
+    print(f"🪞 Incremental analysis benchmark ({args.messages} messages, analysis every "
+          f"{Config.PERSONALITY_ANALYSIS_FREQUENCY}, window {Config.ANALYSIS_WINDOW}, "
+          f"EWMA alpha {Config.PROFILE_EWMA_ALPHA})")
+    print("=" * 86)
+    print(f"{'analysis':<12} {'tokens/cycle':>13} {'p50 (ms)':>10} {'p95 (ms)':>10} "
+          f"{'score move/cycle':>17} {'score error':>12}")
+    try:
+        for name, incremental in (("full window", False), ("incremental", True)):
+            tokens, latencies, moves, errors = run(incremental, args)
+            p95 = sorted(latencies)[int(len(latencies) * 0.95)]
+            print(f"{name:<12} {statistics.mean(tokens):>13.0f} {statistics.median(latencies):>10.1f} {p95:>10.1f} "
+                  f"{statistics.mean(moves):>17.2f} {statistics.mean(errors):>12.2f}")
+    finally:
+        Config.INCREMENTAL_PERSONALITY_ANALYSIS = saved
+    print("=" * 86)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark message statistics over a stream of user messages: recomputing
+every statistic over the analysis window at each analysis versus the
+running MessageStatistics engine fed as messages arrive.
+
+Usage: python benchmarks/bench_message_stats.py [--messages 10000]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from textblob import TextBlob
+from config import Config
+from utils.message_stats import MessageStatistics
+
+WORDS = ("love great terrible coffee weekend project deadline music guitar really awesome tired "
+         "happy sad meeting code python game friends family movie").split()
+
+def recompute_statistics(messages):
+    """The previous from-scratch implementation, kept here as the baseline"""
+    total_words = sum(len(msg.split()) for msg in messages)
+    total_chars = sum(len(msg) for msg in messages)
+    sentiments = [TextBlob(msg).sentiment.polarity for msg in messages]
+    stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them', 'my', 'your', 'his', 'her', 'its', 'our', 'their'}
+    all_words = []
+    for msg in messages:
+        words = re.findall(r'\b\w+\b', msg.lower())
+        all_words.extend([w for w in words if w not in stop_words and len(w) > 2])
+    return {
+        "avg_words_per_message": total_words / len(messages),
+        "avg_chars_per_message": total_chars / len(messages),
+        "avg_sentiment": sum(sentiments) / len(sentiments),
+        "common_words": [word for word, _ in Counter(all_words).most_common(10)],
+        "exclamation_frequency": sum(msg.count('!') for msg in messages) / len(messages),
+        "question_frequency": sum(msg.count('?') for msg in messages) / len(messages)
+    }
+
+def make_messages(count):
+    rng = random.Random(7)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 20))) + rng.choice(["!", "?", ".", ""])
+            for _ in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    args = parser.parse_args()
+
+    window, every = Config.ANALYSIS_WINDOW, Config.PERSONALITY_ANALYSIS_FREQUENCY
+    messages = make_messages(args.messages)
+    analyses = args.messages // every
+
+    print(f"🪞 Message statistics benchmark ({args.messages} messages, analysis every {every}, window {window})")
+    print("=" * 72)
+
+    start = time.perf_counter()
+    for i in range(every, args.messages + 1, every):
+        baseline = recompute_statistics(messages[max(0, i - window):i])
+    recompute_seconds = time.perf_counter() - start
+
+    stats = MessageStatistics(window)
+    add_start = time.perf_counter()
+    summary_seconds = 0.0
+    for i, text in enumerate(messages, 1):
+        stats.add(text)
+        if i % every == 0:
+            summary_start = time.perf_counter()
+            incremental = stats.summary()["message_statistics"]
+            summary_seconds += time.perf_counter() - summary_start
+    incremental_seconds = time.perf_counter() - add_start
+
+    assert abs(incremental["avg_sentiment"] - baseline["avg_sentiment"]) < 1e-9
+    assert incremental["avg_words_per_message"] == baseline["avg_words_per_message"]
+
+    print(f"{'mode':<14} {'total (s)':>10} {'per analysis (ms)':>18} {'per message (ms)':>18}")
+    print(f"{'recompute':<14} {recompute_seconds:>10.3f} {recompute_seconds / analyses * 1000:>18.3f} {'-':>18}")
+    print(f"{'incremental':<14} {incremental_seconds:>10.3f} {summary_seconds / analyses * 1000:>18.3f} "
+          f"{(incremental_seconds - summary_seconds) / args.messages * 1000:>18.3f}")
+    print("=" * 72)
+    print(f"⚡ {recompute_seconds / incremental_seconds:.1f}x less total work, "
+          f"{recompute_seconds / summary_seconds:.0f}x faster at analysis time")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the chat history accessors: the previous list of
+message dicts versus the columnar MessageStore, plus memory per message.
+
+Usage: python benchmarks/bench_message_store.py [--capacity 1000] [--rounds 2000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.message_store import MessageStore
+
+class ListHistory:
+    """The previous list-of-dicts history and its accessors"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.chat_history = []
+
+    def append(self, message):
+        self.chat_history.append(message)
+        if len(self.chat_history) > self.capacity:
+            trimmed = self.chat_history[:-self.capacity]
+            self.chat_history = self.chat_history[-self.capacity:]
+            return [msg['id'] for msg in trimmed if msg['role'] == 'user']
+        return []
+
+    def user_count(self):
+        return len([msg for msg in self.chat_history if msg['role'] == 'user'])
+
+    def analysis_window(self, limit=50):
+        user_messages = [msg['content'] for msg in self.chat_history if msg['role'] == 'user']
+        return user_messages[-limit:] if user_messages else []
+
+    def context(self, limit=10):
+        return self.chat_history[-limit:] if self.chat_history else []
+
+    def read_all(self):
+        return list(self.chat_history)
+
+class StoreHistory:
+    def __init__(self, capacity):
+        self.chat_history = MessageStore(capacity)
+
+    def append(self, message):
+        return self.chat_history.append(message)
+
+    def user_count(self):
+        return self.chat_history.user_count
+
+    def analysis_window(self, limit=50):
+        return self.chat_history.user_contents(limit)
+
+    def context(self, limit=10):
+        return self.chat_history[-limit:]
+
+    def read_all(self):
+        return list(self.chat_history)
+
+def make_message(i, start=datetime(2024, 1, 1)):
+    message = {
+        "role": "user" if i % 2 == 0 else "assistant",
+        "content": f"message number {i} with some ordinary chat text in it",
+        "timestamp": (start + timedelta(seconds=i * 37)).isoformat(),
+        "metadata": {},
+        "id": i + 1
+    }
+    if i % 2 == 0:
+        message["metadata"]["sentiment"] = 0.25
+    return message
+
+def filled(history_class, capacity, count):
+    history = history_class(capacity)
+    for i in range(count):
+        history.append(make_message(i))
+    return history
+
+def bytes_per_message(history_class, capacity):
+    """Bytes held per message after filling the history, and after a full read as compaction and export do"""
+    # Build the messages first so both stores are charged for the same inputs' copies only
+    messages = [make_message(i) for i in range(capacity)]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    history = history_class(capacity)
+    for message in messages:
+        history.append(dict(message, metadata=dict(message["metadata"])))
+    filled_snapshot = tracemalloc.take_snapshot()
+    history.read_all()
+    read_snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return [sum(stat.size_diff for stat in snapshot.compare_to(before, "filename")) / capacity
+            for snapshot in (filled_snapshot, read_snapshot)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--capacity", type=int, default=1000, help="MAX_MEMORY_ITEMS")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    capacity, rounds = args.capacity, args.rounds
+    histories = {name: filled(cls, capacity, capacity) for name, cls in (("list", ListHistory), ("store", StoreHistory))}
+
+    print(f"🪞 Chat history accessor microbenchmarks ({capacity} messages held)")
+    print("=" * 70)
+    print(f"{'accessor':<28} {'list (µs)':>12} {'store (µs)':>12} {'speedup':>10}")
+
+    cases = [
+        ("get_user_message_count", lambda h: h.user_count()),
+        ("analysis window (50)", lambda h: h.analysis_window(50)),
+        ("conversation context (10)", lambda h: h.context(10)),
+    ]
+    for name, call in cases:
+        timings = {key: min(timeit.repeat(lambda: call(h), number=rounds, repeat=3)) / rounds * 1e6
+                   for key, h in histories.items()}
+        print(f"{name:<28} {timings['list']:>12.2f} {timings['store']:>12.2f} {timings['list'] / timings['store']:>9.2f}x")
+
+    # Appending to a full history, which also trims the oldest message
+    appends = {}
+    for key, cls in (("list", ListHistory), ("store", StoreHistory)):
+        history = filled(cls, capacity, capacity)
+        messages = [make_message(capacity + i) for i in range(rounds)]
+        start = timeit.default_timer()
+        for message in messages:
+            history.append(message)
+        appends[key] = (timeit.default_timer() - start) / rounds * 1e6
+    print(f"{'append when full':<28} {appends['list']:>12.2f} {appends['store']:>12.2f} {appends['list'] / appends['store']:>9.2f}x")
+
+    memory = {key: bytes_per_message(cls, capacity) for key, cls in (("list", ListHistory), ("store", StoreHistory))}
+    print("=" * 70)
+    for i, label in enumerate(("after filling", "after a full read")):
+        print(f"💾 Bytes per message {label}: list {memory['list'][i]:.0f}, store {memory['store'][i]:.0f} "
+              f"({1 - memory['store'][i] / memory['list'][i]:.0%} less)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark chat calls against a local stub of the OpenAI API: a client with
+the SDK's default settings against the shared client from get_chat_model,
+with its keep-alive pool, timeouts, jittered retries and circuit breaker.
+
+Concurrent callers make chat calls while the stub injects latency and
+errors, first with a share of 503s, then during a full outage. Reports
+calls that succeeded, throughput, latency, requests that reached the
+server and TCP connections opened.
+
+Usage: python benchmarks/bench_openai_clients.py [--calls 400] [--concurrency 8] [--latency-ms 50] [--error-rate 0.05]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_openai import ChatOpenAI
+from config import Config
+from utils.clients import get_chat_model, get_client_stats, reset_clients
+from benchmarks.stub_openai import StubOpenAIServer
+
+def call(llm):
+    """One chat call, returning whether it succeeded and its latency in ms"""
+    start = time.perf_counter()
+    try:
+        llm.invoke("hi")
+        ok = True
+    except Exception:
+        ok = False
+    return ok, (time.perf_counter() - start) * 1000
+
+def run(make_llm, calls, concurrency, latency, error_rate):
+    """Make calls from concurrent threads against a fresh stub, returning the results and server counts"""
+    with StubOpenAIServer(latency=latency, error_rate=error_rate, seed=7) as server:
+        Config.OPENAI_BASE_URL = server.url
+        reset_clients()
+        llm = make_llm(server.url)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(lambda _: call(llm), range(calls)))
+        elapsed = time.perf_counter() - start
+        return results, elapsed, server.requests, server.connections
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.05, help="share of requests failing with 503")
+    args = parser.parse_args()
+
+    saved = (Config.OPENAI_API_KEY, Config.OPENAI_BASE_URL)
+    Config.OPENAI_API_KEY = "sk-bench"
+    clients = {
+        "SDK defaults": lambda url: ChatOpenAI(model_name=Config.MODEL_NAME, openai_api_key="sk-bench", base_url=url),
+        "shared client": lambda url: get_chat_model()
+    }
+    scenarios = {f"{args.error_rate:.0%} errors": args.error_rate, "outage": 1.0}
+
+    print(f"🪞 OpenAI client benchmark ({args.calls} calls, {args.concurrency} concurrent, "
+          f"stub latency {args.latency_ms:.0f}ms, retries {Config.OPENAI_MAX_RETRIES}, "
+          f"breaker after {Config.CIRCUIT_BREAKER_FAILURES} failures)")
+    print("=" * 96)
+    print(f"{'scenario':<12} {'client':<14} {'succeeded':>10} {'calls/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'server reqs':>12} {'connections':>12}")
+    try:
+        for scenario, error_rate in scenarios.items():
+            for name, make_llm in clients.items():
+                results, elapsed, requests, connections = run(make_llm, args.calls, args.concurrency,
+                                                              args.latency_ms / 1000, error_rate)
+                latencies = sorted(latency for _, latency in results)
+                succeeded = sum(ok for ok, _ in results) / len(results)
+                print(f"{scenario:<12} {name:<14} {succeeded:>10.1%} {len(results) / elapsed:>8.1f} "
+                      f"{statistics.median(latencies):>9.1f} {latencies[int(len(latencies) * 0.99)]:>9.1f} "
+                      f"{requests:>12} {connections:>12}")
+            breaker = get_client_stats().get("breaker", {})
+            if breaker:
+                print(f"{'':<12} breaker opened {breaker['opened']}x, rejected {breaker['rejected']} calls")
+    finally:
+        Config.OPENAI_API_KEY, Config.OPENAI_BASE_URL = saved
+        reset_clients()
+    print("=" * 96)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-turn chat history persistence: rewriting chat_history.json
+versus appending to the JSONL chat log.
+
+A turn persists two messages (user and assistant). History is trimmed to
+Config.MAX_MEMORY_ITEMS exactly as MemoryManager does; sizes beyond the
+cap show the cost once trimming kicks in.
+
+Usage: python benchmarks/bench_persistence.py [--turns 500]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from utils.chat_log import ChatLog
+
+SIZES = [100, 500, 1000, 2000, 5000]
+
+def make_message(i):
+    return {
+        "role": "user" if i % 2 == 0 else "assistant",
+        "content": f"message {i} with a typical amount of chat text in it, maybe a question?",
+        "timestamp": datetime.now().isoformat(),
+        "metadata": {}
+    }
+
+def old_turns(path, history, turns):
+    """Previous behaviour: rewrite the whole file after every message"""
+    timings = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        for i in range(2):
+            history.append(make_message(len(history) + i))
+            if len(history) > Config.MAX_MEMORY_ITEMS:
+                history = history[-Config.MAX_MEMORY_ITEMS:]
+            with open(path, 'w') as f:
+                json.dump(history, f, indent=2)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def new_turns(data_dir, history, turns):
+    """Chat log: append each message, compact periodically"""
+    chat_log = ChatLog(
+        os.path.join(data_dir, "chat_history.json"),
+        os.path.join(data_dir, "chat_history.log.jsonl"),
+        fsync_every=Config.CHAT_LOG_FSYNC_EVERY,
+        compact_every=Config.CHAT_LOG_COMPACT_EVERY
+    )
+    chat_log.compact(history)
+    timings = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        for i in range(2):
+            message = make_message(len(history) + i)
+            history.append(message)
+            if len(history) > Config.MAX_MEMORY_ITEMS:
+                history = history[-Config.MAX_MEMORY_ITEMS:]
+            chat_log.append(message)
+            if chat_log.needs_compaction():
+                chat_log.compact(history)
+        timings.append(time.perf_counter() - start)
+    chat_log.close()
+    return timings
+
+def summarize(timings):
+    ordered = sorted(timings)
+    return statistics.mean(timings) * 1000, ordered[int(len(ordered) * 0.99) - 1] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=500, help="turns measured per size")
+    args = parser.parse_args()
+
+    print("🪞 Chat history persistence benchmark (ms per turn)")
+    print("=" * 72)
+    print(f"{'history':>10} {'old mean':>10} {'old p99':>10} {'new mean':>10} {'new p99':>10} {'speedup':>10}")
+
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as data_dir:
+            history = [make_message(i) for i in range(size)][-Config.MAX_MEMORY_ITEMS:]
+            old_mean, old_p99 = summarize(old_turns(os.path.join(data_dir, "old.json"), list(history), args.turns))
+            new_mean, new_p99 = summarize(new_turns(data_dir, list(history), args.turns))
+            print(f"{size:>10} {old_mean:>10.3f} {old_p99:>10.3f} {new_mean:>10.3f} {new_p99:>10.3f} {old_mean / new_mean:>9.1f}x")
+
+    print("=" * 72)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark the profile work done per chat turn and per Dashboard render:
+copying and formatting the profile every time versus views memoized per
+profile revision, with the profile updated every
+PERSONALITY_ANALYSIS_FREQUENCY user messages.
+
+Usage: python benchmarks/bench_profile_views.py [--turns 2000] [--render-every 1]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from app import create_personality_radar
+from config import Config
+from utils.memory_manager import MemoryManager
+from utils.personality_analyzer import PersonalityAnalyzer
+from utils.prompt_builder import render_personality_context
+
+def profile_for(turn):
+    """A profile as the analyzer would produce it after this many turns"""
+    return {
+        "communication_style": {"tone": "playful", "formality_level": 3, "enthusiasm_level": 8},
+        "personality_traits": {"openness": 8, "conscientiousness": 5, "extraversion": 8,
+                               "agreeableness": 6, "neuroticism": 3},
+        "interests_and_topics": ["hiking", "cooking", "indie music", "board games", "travel", f"topic {turn}"],
+        "favorite_phrases": ["lol", "honestly", "no way", "for real"],
+        "message_statistics": {"avg_words_per_message": 14.2, "avg_sentiment": 0.24, "total_messages": turn}
+    }
+
+def per_turn_copy(memory, analyzer):
+    return render_personality_context(memory.get_personality_traits())
+
+def per_turn_view(memory, analyzer):
+    return memory.get_profile().view("prompt_context", render_personality_context)
+
+def per_render_copy(memory, analyzer):
+    profile = memory.get_personality_traits()
+    return analyzer.get_personality_summary(profile), create_personality_radar(profile["personality_traits"])
+
+def per_render_view(memory, analyzer):
+    profile = memory.get_profile()
+    return (profile.view("summary", analyzer.get_personality_summary),
+            profile.view("radar", lambda data: create_personality_radar(data["personality_traits"])))
+
+def run(turn_work, render_work, turns, render_every):
+    """Time each turn's and each render's profile work in ms"""
+    analyzer = PersonalityAnalyzer(llm=FakeListChatModel(responses=["{}"]))
+    turn_times, render_times = [], []
+    with tempfile.TemporaryDirectory() as data_dir:
+        memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+        memory.update_personality_profile(profile_for(0))
+        for turn in range(1, turns + 1):
+            if turn % Config.PERSONALITY_ANALYSIS_FREQUENCY == 0:
+                memory.update_personality_profile(profile_for(turn))
+            start = time.perf_counter()
+            turn_work(memory, analyzer)
+            turn_times.append((time.perf_counter() - start) * 1000)
+            if turn % render_every == 0:
+                start = time.perf_counter()
+                render_work(memory, analyzer)
+                render_times.append((time.perf_counter() - start) * 1000)
+    return turn_times, render_times
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--render-every", type=int, default=1, help="turns between Dashboard renders")
+    args = parser.parse_args()
+
+    print(f"🪞 Profile views benchmark ({args.turns} turns, profile update every "
+          f"{Config.PERSONALITY_ANALYSIS_FREQUENCY}, Dashboard render every {args.render_every})")
+    print("=" * 80)
+    print(f"{'profile work':<16} {'turn p50 (ms)':>14} {'turn total (ms)':>16} {'render p50 (ms)':>16} "
+          f"{'render total (ms)':>17}")
+    for name, turn_work, render_work in (("copy and format", per_turn_copy, per_render_copy),
+                                         ("memoized views", per_turn_view, per_render_view)):
+        turn_times, render_times = run(turn_work, render_work, args.turns, args.render_every)
+        print(f"{name:<16} {statistics.median(turn_times):>14.4f} {sum(turn_times):>16.1f} "
+              f"{statistics.median(render_times):>16.4f} {sum(render_times):>17.1f}")
+    print("=" * 80)
+
+if __name__ == "__main__":
+    main()
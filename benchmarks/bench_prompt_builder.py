@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark prompt assembly: the previous fixed template against the
+token-budgeted PromptBuilder, over a conversation where users sometimes
+paste long texts.
+
+Reports prompt tokens per turn, how many turns would overflow the budget,
+and the time to format each prompt, including rendering the personality
+context. Tokens are counted with tiktoken when its encoding can be loaded,
+otherwise estimated at 4 characters per token.
+
+Usage: python benchmarks/bench_prompt_builder.py [--turns 300] [--paste-rate 0.05]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.prompts import PromptTemplate
+from config import Config
+from utils.personality_profile import PersonalityProfile
+from utils.prompt_builder import (PromptBuilder, format_similar_messages, get_token_counter, prompt_token_budget,
+                                  render_personality_context)
+
+WORDS = ("so i was thinking about the weekend and honestly it could be fun to go hiking "
+         "or maybe just stay in and cook something new lol what do you think").split()
+
+PROFILE = {
+    "communication_style": {"tone": "playful", "formality_level": 3},
+    "personality_traits": {"openness": 8, "extraversion": 8, "neuroticism": 3, "agreeableness": 6},
+    "interests_and_topics": ["hiking", "cooking", "indie music", "board games", "travel", "photography"],
+    "favorite_phrases": ["lol", "honestly", "no way", "for real"],
+    "message_statistics": {"avg_words_per_message": 14.2, "avg_sentiment": 0.24}
+}
+
+# The template and per-turn formatting used before the prompt builder
+OLD_TEMPLATE = PromptTemplate.from_template("""
+        You are MirrorMe, an AI that learns to mirror the user's personality and communication style over time.
+
+        PERSONALITY PROFILE:
+        {personality_context}
+
+        SIMILAR PAST MESSAGES:
+        {similar_messages}
+
+        CONVERSATION CONTEXT:
+        {conversation_context}
+
+        INSTRUCTIONS:
+        1. Respond in the user's typical communication style based on the personality profile
+        2. Use similar tone, formality level, and enthusiasm as shown in past messages
+        3. Reference their interests and use their favorite phrases when appropriate
+        4. Keep responses concise and engaging
+        5. Gradually become more like them as you learn more about their style
+
+        Current message: {input}
+
+        Response:""")
+
+def old_prompt(history, similar, user_input):
+    personality = render_personality_context(dict(PROFILE))
+    conversation = "\n".join(f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}"
+                             for m in history[-6:])
+    return OLD_TEMPLATE.format(personality_context=personality,
+                               similar_messages=format_similar_messages(similar),
+                               conversation_context=conversation, input=user_input)
+
+def new_prompt(profile, builder, history, similar, user_input):
+    personality = profile.view("prompt_context", render_personality_context)
+    return builder.build(personality, similar, history[-(Config.CONTEXT_MESSAGES + 1):], user_input)[0]
+
+def make_message(rng, paste_rate):
+    length = rng.randint(600, 1500) if rng.random() < paste_rate else rng.randint(5, 30)
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--paste-rate", type=float, default=0.05, help="share of messages that are long pastes")
+    args = parser.parse_args()
+
+    rng = random.Random(23)
+    counter = get_token_counter()
+    budget = prompt_token_budget()
+    profile = PersonalityProfile(dict(PROFILE), revision=1)
+    builder = PromptBuilder(counter)
+
+    history, user_messages = [], []
+    results = {"fixed template": ([], []), "prompt builder": ([], [])}
+    for _ in range(args.turns):
+        user_input = make_message(rng, args.paste_rate)
+        history.append({"role": "user", "content": user_input})
+        similar = rng.sample(user_messages, min(3, len(user_messages)))
+        user_messages.append(user_input)
+
+        for name, build in (("fixed template", lambda: old_prompt(history, similar, user_input)),
+                            ("prompt builder", lambda: new_prompt(profile, builder, history, similar, user_input))):
+            start = time.perf_counter()
+            prompt = build()
+            elapsed = (time.perf_counter() - start) * 1000
+            results[name][0].append(counter.count(prompt))
+            results[name][1].append(elapsed)
+        history.append({"role": "assistant", "content": make_message(rng, 0)})
+
+    print(f"🪞 Prompt builder benchmark ({args.turns} turns, {args.paste_rate:.0%} pastes, budget {budget} tokens, "
+          f"tokens by {'tiktoken' if counter.encoding else 'estimate'})")
+    print("=" * 88)
+    print(f"{'prompt':<16} {'mean tokens':>12} {'p95 tokens':>11} {'max tokens':>11} {'over budget':>12} "
+          f"{'format p50 (ms)':>16}")
+    for name, (tokens, times) in results.items():
+        p95 = sorted(tokens)[int(len(tokens) * 0.95)]
+        over = sum(t > budget for t in tokens)
+        print(f"{name:<16} {statistics.mean(tokens):>12.0f} {p95:>11} {max(tokens):>11} {over:>12} "
+              f"{statistics.median(times):>16.3f}")
+    print("=" * 88)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark the similar-messages block of the prompt: plain top-k rank
+fusion against threshold, repeat removal and MMR re-ranking.
+
+Replays a conversation on the synthetic topic corpus from
+bench_retrieval, where users often repeat themselves. Each turn stores
+the message first, as the agent does, so plain top-k tends to retrieve
+the message itself and its repeats. The useful threshold depends on the
+embedding model, so several are compared. Tokens are counted with
+tiktoken when its encoding can be loaded, otherwise estimated at 4
+characters per token.
+
+Usage: python benchmarks/bench_prompt_tokens.py [--messages 2000] [--turns 300] [--thresholds 0.5,0.7,0.8]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_retrieval import TOPICS, TopicEmbeddings, build_corpus
+from config import Config
+from utils.lexical_index import reciprocal_rank_fusion
+from utils.memory_manager import MemoryManager
+from utils.prompt_builder import format_similar_messages, get_token_counter
+
+def plain_top_k(memory, query, k):
+    """Retrieval before the threshold: top-k of rank fusion, unfiltered"""
+    lexical_ids = [doc_id for doc_id, _ in memory.lexical_index.search(query, k=k * 2)]
+    vector = memory.embeddings.embed_query(query)
+    similar = memory.vector_store.similarity_search_by_vector(vector, k=k * 2)
+    vector_ids = [doc.metadata['id'] for doc, _ in similar]
+    return memory._contents(reciprocal_rank_fusion([lexical_ids, vector_ids], k, Config.RRF_CONSTANT))
+
+def filtered(memory, query, k):
+    return memory.get_similar_messages(query, k=k)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--repeat-rate", type=float, default=0.3, help="share of messages that repeat an earlier one")
+    parser.add_argument("--thresholds", default="0.5,0.7,0.8", help="comma-separated SIMILARITY_THRESHOLD values")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(17)
+    vocabulary, _, corpus, sentence = build_corpus(args.messages, rng)
+    history = []
+    for topic, text in corpus:
+        if history and rng.random() < args.repeat_rate:
+            topic, text = rng.choice(history)
+            text = text if rng.random() < 0.5 else text + " " + rng.choice(["lol", "really", "again"])
+        history.append((topic, text))
+    labels = {text: topic for topic, text in history}
+
+    turns = []
+    for _ in range(args.turns):
+        if rng.random() < args.repeat_rate:
+            turns.append(rng.choice(history))
+        else:
+            topic = rng.randrange(TOPICS)
+            turns.append((topic, sentence(topic, rng.randint(6, 14))))
+    labels.update({text: topic for topic, text in turns})
+
+    counter = get_token_counter()
+    modes = [("plain top-k", plain_top_k, Config.SIMILARITY_THRESHOLD)]
+    modes += [(f"filtered, threshold {threshold}", filtered, float(threshold))
+              for threshold in args.thresholds.split(",")]
+    saved = (Config.MAX_MEMORY_ITEMS, Config.SIMILARITY_THRESHOLD)
+    Config.MAX_MEMORY_ITEMS = max(saved[0], args.messages + args.turns)
+    results = {}
+
+    try:
+        for name, retrieve, threshold in modes:
+            Config.SIMILARITY_THRESHOLD = threshold
+            with tempfile.TemporaryDirectory() as data_dir:
+                memory = MemoryManager(embeddings=TopicEmbeddings(vocabulary), data_dir=data_dir)
+                memory.import_messages({"role": "user", "content": text} for _, text in history)
+
+                tokens, latencies, on_topic, returned, repeats = [], [], [], [], 0
+                for topic, text in turns:
+                    memory.add_message("user", text)
+                    start = time.perf_counter()
+                    similar = retrieve(memory, text, args.k)
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+                    tokens.append(counter.count(format_similar_messages(similar)))
+                    returned.append(len(similar))
+                    on_topic.extend(labels.get(message) == topic for message in similar)
+                    keys = [MemoryManager._normalize(message) for message in similar]
+                    repeats += len(keys) - len(set(keys)) + keys.count(MemoryManager._normalize(text))
+                results[name] = (statistics.mean(tokens), statistics.mean(returned),
+                                 statistics.mean(on_topic) if on_topic else 0.0, repeats,
+                                 statistics.median(latencies))
+    finally:
+        Config.MAX_MEMORY_ITEMS, Config.SIMILARITY_THRESHOLD = saved
+
+    print(f"🪞 Prompt token benchmark ({args.messages} messages, {args.turns} turns, "
+          f"{args.repeat_rate:.0%} repeats, k={args.k}, tokens by {'tiktoken' if counter.encoding else 'estimate'})")
+    print("=" * 92)
+    print(f"{'retrieval':<28} {'tokens/turn':>12} {'messages/turn':>14} {'on-topic':>9} "
+          f"{'repeats':>8} {'p50 (ms)':>9}")
+    for name, (tokens, returned, on_topic, repeats, latency) in results.items():
+        print(f"{name:<28} {tokens:>12.1f} {returned:>14.2f} {on_topic:>9.0%} {repeats:>8} {latency:>9.2f}")
+    print("=" * 92)
+    before = results["plain top-k"][0]
+    for name, (after, *_) in list(results.items())[1:]:
+        print(f"Tokens saved per turn, {name}: {before - after:.1f} ({1 - after / before:.0%})")
+    print("Repeats: retrieved copies of the current message or of another retrieved message")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Simulate chat turns, embedding calls and a backlog of personality analyses
+sharing one API key, against a local stub of the OpenAI API that enforces
+requests and tokens per minute like the provider, answering 429s.
+
+Compares sending calls straight away and retrying 429s, the client-side
+rate limiter with every call in one class, and the limiter with priority
+classes, where analysis leaves a reserve for chat turns and embeddings.
+Reports per class calls completed and failed, latency, 429s received and
+analysis tokens processed.
+
+Usage: python benchmarks/bench_rate_limiter.py [--duration 30] [--rpm 600] [--tpm 120000] [--turns-per-second 1]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from utils.clients import get_chat_model, get_client_stats, get_embedding_model, reset_clients
+from utils.rate_limiter import request_priority
+from benchmarks.stub_openai import StubOpenAIServer
+
+TURN_PROMPT = "x" * 2200  # About 550 prompt tokens, as a full chat turn prompt
+ANALYSIS_PROMPT = "x" * 10000  # About 2500 tokens of messages to analyze
+ANALYSIS_MAX_TOKENS = 500
+
+class Recorder:
+    """Outcomes and latencies of the calls of one class"""
+
+    def __init__(self):
+        self.latencies = []
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def call(self, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            return
+        with self._lock:
+            self.latencies.append((time.perf_counter() - start) * 1000)
+
+def run(mode, args):
+    """Run the workload for one mode against a fresh stub, returning recorders per class and server counts"""
+    Config.RATE_LIMIT_RPM, Config.RATE_LIMIT_TPM = (args.rpm, args.tpm) if mode != "no limiter" else (0, 0)
+    with StubOpenAIServer(latency=args.latency_ms / 1000, requests_per_minute=args.rpm,
+                          tokens_per_minute=args.tpm) as server:
+        Config.OPENAI_BASE_URL = server.url
+        reset_clients()
+        chat = get_chat_model(Config.TEMPERATURE, Config.MAX_TOKENS)
+        analysis = get_chat_model(0.3, ANALYSIS_MAX_TOKENS)
+        embeddings = get_embedding_model()
+        # One class means every call is scheduled first come, first served
+        classes = {"interactive": "interactive", "embedding": "embedding", "background": "background"}
+        if mode == "one class":
+            classes = dict.fromkeys(classes, "interactive")
+        recorders = {name: Recorder() for name in classes}
+
+        def turn():
+            with request_priority(classes["interactive"]):
+                chat.invoke(TURN_PROMPT)
+
+        def embed():
+            with request_priority(classes["embedding"]):
+                embeddings.client.create(input=["a new message to remember"], model=embeddings.model)
+
+        def analyze():
+            with request_priority(classes["background"]):
+                analysis.invoke(ANALYSIS_PROMPT)
+
+        stop = time.perf_counter() + args.duration
+
+        def analysis_worker():
+            while time.perf_counter() < stop:
+                recorders["background"].call(analyze)
+
+        workers = [threading.Thread(target=analysis_worker) for _ in range(args.analysis_workers)]
+        for worker in workers:
+            worker.start()
+        with ThreadPoolExecutor(32) as pool:
+            # Open-loop arrivals: turns and embeddings come at a fixed rate however slow the replies are
+            tick, interval = 0, 1 / (args.turns_per_second * 2)
+            while time.perf_counter() < stop:
+                pool.submit(recorders["embedding"].call, embed)
+                if tick % 2 == 0:
+                    pool.submit(recorders["interactive"].call, turn)
+                tick += 1
+                time.sleep(interval)
+        for worker in workers:
+            worker.join()
+        return recorders, server.rate_limited, server.requests
+
+def percentile(values, share):
+    return sorted(values)[int(len(values) * share)] if values else float("nan")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=30, help="seconds of traffic per mode")
+    parser.add_argument("--rpm", type=float, default=600, help="requests per minute the stub allows")
+    parser.add_argument("--tpm", type=float, default=120000, help="tokens per minute the stub allows")
+    parser.add_argument("--turns-per-second", type=float, default=1, help="chat turns, with two embedding calls each")
+    parser.add_argument("--analysis-workers", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    names = ("OPENAI_API_KEY", "OPENAI_BASE_URL", "RATE_LIMIT_RPM", "RATE_LIMIT_TPM")
+    saved = {name: getattr(Config, name) for name in names}
+    Config.OPENAI_API_KEY = "sk-bench"
+
+    print(f"🪞 Rate limiter benchmark ({args.duration:.0f}s per mode, stub limits {args.rpm:.0f} RPM / "
+          f"{args.tpm:.0f} TPM, {args.turns_per_second:g} turns/s, {args.analysis_workers} analysis workers)")
+    print("=" * 96)
+    print(f"{'mode':<12} {'class':<12} {'completed':>10} {'failed':>7} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+    try:
+        for mode in ("no limiter", "one class", "priorities"):
+            recorders, rate_limited, requests = run(mode, args)
+            analysis_rate = len(recorders["background"].latencies) * (
+                len(ANALYSIS_PROMPT) // 4 + ANALYSIS_MAX_TOKENS) / args.duration
+            for i, (name, recorder) in enumerate(recorders.items()):
+                print(f"{mode if i == 0 else '':<12} {name:<12} {len(recorder.latencies):>10} {recorder.failed:>7} "
+                      f"{percentile(recorder.latencies, 0.5):>9.0f} {percentile(recorder.latencies, 0.95):>9.0f}")
+            print(f"{'':<12} {requests} requests reached the stub, {rate_limited} answered 429, "
+                  f"{get_client_stats()['retries']} retries, {analysis_rate:.0f} analysis tokens/s")
+    finally:
+        for name, value in saved.items():
+            setattr(Config, name, value)
+        reset_clients()
+    print("=" * 96)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark the response cache over a chat where a share of user messages
+are short repeats ("hi", "thanks", "lol") and the rest are unique.
+
+Runs the real MirrorAgent turn with the local embedding backend and a
+simulated model that answers after a fixed delay. Personality analysis
+runs as configured, so profile updates invalidate cached replies as they
+would in use. Reports the cache hit rate, model calls, turn latency and
+model time saved, with the cache off, on with exact matching with and
+without the preceding user message in the key, and on with
+near-duplicate matching.
+
+Usage: python benchmarks/bench_response_cache.py [--turns 300] [--repeat-rate 0.3] [--llm-ms 100] [--analysis-every 10]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from config import Config
+from utils.embeddings import get_embeddings
+from utils.memory_manager import MemoryManager
+from utils.mirror_agent import MirrorAgent
+from utils.personality_analyzer import PersonalityAnalyzer
+
+WORDS = ("so i was thinking about the weekend and honestly it could be fun to go hiking "
+         "or maybe just stay in and cook something new lol what do you think").split()
+# Short messages users send again and again, most common first, with the variants people type
+REPEATS = [["hi", "Hi!", "hi there"], ["thanks", "Thanks!", "thanks so much"], ["lol", "LOL", "lol!"],
+           ["ok", "OK", "okay"], ["haha", "hahaha"], ["good night", "night!"], ["yes", "yep"]]
+
+# (label, RESPONSE_CACHE, RESPONSE_CACHE_CONTEXT_MESSAGES, RESPONSE_CACHE_SIMILARITY)
+SETTINGS = [
+    ("off", False, 0, 0.0),
+    ("exact, 1 user msg", True, 1, 0.0),
+    ("exact, 0 msgs", True, 0, 0.0),
+    ("similar 0.8, 0 msgs", True, 0, 0.8),
+]
+
+class SimulatedModel:
+    """Stands in for the chat model, answering every prompt after a fixed delay"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return AIMessage(content=f"reply {self.calls}")
+
+def make_turns(turns, repeat_rate, rng):
+    """User messages, a share of them drawn from the repeats with a skew toward the common ones"""
+    messages = []
+    for _ in range(turns):
+        if rng.random() < repeat_rate:
+            variants = REPEATS[min(int(rng.expovariate(0.6)), len(REPEATS) - 1)]
+            messages.append(rng.choice(variants))
+        else:
+            messages.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))))
+    return messages
+
+def run(messages, llm_ms):
+    """Chat through the messages, returning turn latencies in ms, model calls and cache stats"""
+    model = SimulatedModel(llm_ms / 1000)
+    with tempfile.TemporaryDirectory() as data_dir:
+        agent = MirrorAgent(
+            llm=model,
+            memory_manager=MemoryManager(embeddings=get_embeddings("local"), data_dir=data_dir),
+            personality_analyzer=PersonalityAnalyzer(
+                llm=FakeListChatModel(responses=['{"personality_traits": {"openness": 7}}']))
+        )
+        latencies = []
+        for message in messages:
+            start = time.perf_counter()
+            agent.generate_response(message)
+            latencies.append((time.perf_counter() - start) * 1000)
+        agent.analysis_worker.wait(10)
+        return latencies, model.calls, agent.get_response_cache_stats()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--repeat-rate", type=float, default=0.3, help="share of messages that are short repeats")
+    parser.add_argument("--llm-ms", type=float, default=100, help="simulated model latency")
+    parser.add_argument("--analysis-every", type=int, default=Config.PERSONALITY_ANALYSIS_FREQUENCY,
+                        help="user messages between profile updates, each of which retires cached replies")
+    args = parser.parse_args()
+
+    messages = make_turns(args.turns, args.repeat_rate, random.Random(41))
+    saved = (Config.OPENAI_API_KEY, Config.RESPONSE_CACHE, Config.RESPONSE_CACHE_CONTEXT_MESSAGES,
+             Config.RESPONSE_CACHE_SIMILARITY, Config.PERSONALITY_ANALYSIS_FREQUENCY)
+    Config.OPENAI_API_KEY = saved[0] or "sk-bench"
+    Config.PERSONALITY_ANALYSIS_FREQUENCY = args.analysis_every
+
+    print(f"🪞 Response cache benchmark ({args.turns} turns, {args.repeat_rate:.0%} short repeats, "
+          f"model {args.llm_ms:.0f}ms, profile update every {args.analysis_every} messages)")
+    print("=" * 84)
+    print(f"{'cache':<20} {'hit rate':>9} {'model calls':>12} {'p50 (ms)':>9} {'mean (ms)':>10} {'saved (s)':>10}")
+    try:
+        for label, enabled, context_messages, similarity in SETTINGS:
+            Config.RESPONSE_CACHE = enabled
+            Config.RESPONSE_CACHE_CONTEXT_MESSAGES = context_messages
+            Config.RESPONSE_CACHE_SIMILARITY = similarity
+            latencies, calls, stats = run(messages, args.llm_ms)
+            print(f"{label:<20} {stats.get('hit_rate', 0.0):>9.1%} {calls:>12} {statistics.median(latencies):>9.1f} "
+                  f"{statistics.mean(latencies):>10.1f} {stats.get('saved_seconds', 0.0):>10.1f}")
+    finally:
+        (Config.OPENAI_API_KEY, Config.RESPONSE_CACHE, Config.RESPONSE_CACHE_CONTEXT_MESSAGES,
+         Config.RESPONSE_CACHE_SIMILARITY, Config.PERSONALITY_ANALYSIS_FREQUENCY) = saved
+    print("=" * 84)
+
+if __name__ == "__main__":
+    main()
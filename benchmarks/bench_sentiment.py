@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark sentiment scoring throughput: the per-message TextBlob loop
+versus batch scoring across worker processes and the lexicon scorer,
+plus how closely the lexicon scores track TextBlob's.
+
+Usage: python benchmarks/bench_sentiment.py [--messages 10000] [--processes 4]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from textblob import TextBlob
+from benchmarks.bench_message_stats import make_messages
+from utils.sentiment import LexiconScorer, TextBlobScorer
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages)
+    print(f"🪞 Sentiment scoring benchmark ({args.messages} messages)")
+    print("=" * 64)
+    print(f"{'scorer':<28} {'seconds':>10} {'messages/s':>12} {'speedup':>10}")
+
+    baseline, loop_seconds = timed(lambda: [TextBlob(text).sentiment.polarity for text in messages])
+    rows = [("TextBlob loop", loop_seconds)]
+    _, seconds = timed(lambda: TextBlobScorer().score_batch(messages, processes=args.processes))
+    rows.append((f"TextBlob x{args.processes} processes", seconds))
+    lexicon, seconds = timed(lambda: LexiconScorer().score_batch(messages))
+    rows.append(("lexicon (incl. table build)", seconds))
+
+    for name, seconds in rows:
+        print(f"{name:<28} {seconds:>10.3f} {args.messages / seconds:>12.0f} {loop_seconds / seconds:>9.1f}x")
+    print("=" * 64)
+
+    baseline, lexicon = np.asarray(baseline), np.asarray(lexicon)
+    correlation = np.corrcoef(baseline, lexicon)[0, 1]
+    same_sign = np.mean(np.sign(np.round(baseline, 2)) == np.sign(np.round(lexicon, 2)))
+    print(f"📊 Lexicon vs TextBlob: correlation {correlation:.3f}, same sign {same_sign:.0%}, "
+          f"mean abs diff {np.mean(np.abs(baseline - lexicon)):.3f}")
+
+if __name__ == "__main__":
+    main()
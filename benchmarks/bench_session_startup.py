@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark time-to-interactive for new browser sessions: building a fresh
+MirrorAgent per session versus reusing the process-wide pooled agent,
+clients and memory.
+
+Uses the local embedding backend and a placeholder API key, so nothing
+goes over the network.
+
+Usage: python benchmarks/bench_session_startup.py [--history 5000] [--sessions 10]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_openai import ChatOpenAI
+from config import Config
+from utils import memory_registry
+from utils.embeddings import HashingEmbeddings
+from utils.memory_manager import MemoryManager
+from utils.memory_registry import MemoryRegistry
+from utils.mirror_agent import MirrorAgent, get_mirror_agent
+from utils.personality_analyzer import PersonalityAnalyzer
+
+def seed_history(data_dir, count):
+    memory = MemoryManager(embeddings=HashingEmbeddings(), data_dir=data_dir)
+    memory.import_messages(
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"seed message {i} about topic {i % 53}"}
+        for i in range(count)
+    )
+    memory.flush()
+
+def unpooled_session(data_dir):
+    """What every new session used to do: new clients, new memory, new index"""
+    return MirrorAgent(
+        llm=ChatOpenAI(model_name=Config.MODEL_NAME, temperature=Config.TEMPERATURE,
+                       max_tokens=Config.MAX_TOKENS, openai_api_key=Config.OPENAI_API_KEY),
+        memory_manager=MemoryManager(embeddings=HashingEmbeddings(), data_dir=data_dir),
+        personality_analyzer=PersonalityAnalyzer(llm=ChatOpenAI(
+            model_name=Config.MODEL_NAME, temperature=0.3, openai_api_key=Config.OPENAI_API_KEY))
+    )
+
+def time_sessions(open_session, sessions):
+    """Open sessions one after another, keeping them alive like open tabs"""
+    timings, open_tabs = [], []
+    for _ in range(sessions):
+        start = time.perf_counter()
+        agent = open_session()
+        agent.get_learning_progress()
+        timings.append((time.perf_counter() - start) * 1000)
+        open_tabs.append(agent)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--history", type=int, default=5000, help="messages already in memory")
+    parser.add_argument("--sessions", type=int, default=10)
+    args = parser.parse_args()
+
+    Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "sk-bench"
+
+    print(f"🪞 Session startup benchmark ({args.history} messages of history)")
+    print("=" * 64)
+    print(f"{'mode':<12} {'first (ms)':>12} {'Nth median (ms)':>16} {'Nth max (ms)':>14}")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        seed_history(data_dir, args.history)
+
+        rows = [("per-session", time_sessions(lambda: unpooled_session(data_dir), args.sessions))]
+
+        memory_registry._registry = MemoryRegistry(data_dir=data_dir, embeddings=HashingEmbeddings())
+        rows.append(("pooled", time_sessions(get_mirror_agent, args.sessions)))
+
+        for mode, timings in rows:
+            rest = timings[1:] or timings
+            print(f"{mode:<12} {timings[0]:>12.2f} {statistics.median(rest):>16.3f} {max(rest):>14.3f}")
+    print("=" * 64)
+
+if __name__ == "__main__":
+    main()
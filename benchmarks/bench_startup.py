@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark MemoryManager cold-start time: re-embedding all history versus
+loading the persisted FAISS index.
+
+Uses a fake embedding model with simulated per-request latency so the
+numbers reflect the shape of the OpenAI round trips without an API key.
+
+Usage: python benchmarks/bench_startup.py [--latency-ms 50]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+from config import Config
+from utils.memory_manager import MemoryManager
+
+SIZES = [100, 1000, 10000]
+
+class SlowFakeEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic embeddings that sleep like a network call per request"""
+    latency: float = 0.05
+    batch_size: int = 1000
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        for start in range(0, len(texts), self.batch_size):
+            self.calls += 1
+            time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+def write_history(data_dir, count):
+    """Write a synthetic chat history alternating user and assistant messages"""
+    start = datetime(2024, 1, 1)
+    history = []
+    for i in range(count):
+        history.append({
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"message {i} about topic {i % 37} with some extra words",
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+            "metadata": {}
+        })
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, "chat_history.json"), 'w') as f:
+        json.dump(history, f)
+    return history
+
+def old_startup(history, embeddings):
+    """The previous startup path: embed every user message"""
+    user_messages = [msg for msg in history if msg['role'] == 'user']
+    documents = [Document(page_content=msg['content'], metadata={"timestamp": msg['timestamp']})
+                 for msg in user_messages]
+    return FAISS.from_documents(documents, embeddings)
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=50.0,
+                        help="simulated latency per embedding request")
+    args = parser.parse_args()
+
+    # Keep the whole synthetic history, not just the default cap
+    Config.MAX_MEMORY_ITEMS = max(SIZES)
+
+    print("🪞 MemoryManager startup benchmark")
+    print("=" * 72)
+    print(f"{'messages':>10} {'old (s)':>10} {'new cold (s)':>14} {'new warm (s)':>14} {'warm calls':>12}")
+
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as data_dir:
+            history = write_history(data_dir, size)
+
+            embeddings = SlowFakeEmbeddings(size=1536, latency=args.latency_ms / 1000)
+            old = timed(lambda: old_startup(history, embeddings))
+
+            # First start builds and saves the index, later starts load it
+            cold = timed(lambda: MemoryManager(embeddings=embeddings, data_dir=data_dir))
+            embeddings.calls = 0
+            warm = timed(lambda: MemoryManager(embeddings=embeddings, data_dir=data_dir))
+
+            print(f"{size:>10} {old:>10.3f} {cold:>14.3f} {warm:>14.3f} {embeddings.calls:>12}")
+
+    print("=" * 72)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark chat turn latency with personality analysis run inline during
+the turn versus on the background worker.
+
+Fake chat models with fixed latencies stand in for OpenAI so every 10th
+turn's analysis round trip shows up (or not) in the p99.
+
+Usage: python benchmarks/bench_turn_latency.py [--turns 100]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from config import Config
+from utils.memory_manager import MemoryManager
+from utils.mirror_agent import MirrorAgent
+from utils.personality_analyzer import PersonalityAnalyzer
+
+CHAT_LATENCY = 0.05
+ANALYSIS_LATENCY = 0.8
+
+ANALYSIS_RESPONSE = json.dumps({
+    "communication_style": {"tone": "casual", "formality_level": 3, "enthusiasm_level": 8},
+    "personality_traits": {"openness": 8, "conscientiousness": 5, "extraversion": 7,
+                           "agreeableness": 6, "neuroticism": 3},
+    "interests_and_topics": ["music", "coding"],
+    "favorite_phrases": ["no way"]
+})
+
+def run_turns(background, turns):
+    Config.BACKGROUND_PERSONALITY_ANALYSIS = background
+    with tempfile.TemporaryDirectory() as data_dir:
+        agent = MirrorAgent(
+            llm=FakeListChatModel(responses=["sounds good!"], sleep=CHAT_LATENCY),
+            memory_manager=MemoryManager(embeddings=DeterministicFakeEmbedding(size=256), data_dir=data_dir),
+            personality_analyzer=PersonalityAnalyzer(
+                llm=FakeListChatModel(responses=[ANALYSIS_RESPONSE], sleep=ANALYSIS_LATENCY)
+            )
+        )
+        timings = []
+        for i in range(turns):
+            start = time.perf_counter()
+            agent.generate_response(f"turn {i}: just chatting about music and code!")
+            timings.append(time.perf_counter() - start)
+        agent.analysis_worker.wait()
+        return timings, agent.analysis_worker.get_status()
+
+def percentile(timings, pct):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=100)
+    args = parser.parse_args()
+
+    Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "sk-benchmark"
+
+    print("🪞 Turn latency benchmark (ms)")
+    print("=" * 72)
+    print(f"{'analysis':>12} {'p50':>10} {'p99':>10} {'max':>10} {'mean':>10} {'analyses':>10}")
+
+    for label, background in (("inline", False), ("background", True)):
+        timings, status = run_turns(background, args.turns)
+        completed = status["completed"] if background else args.turns // Config.PERSONALITY_ANALYSIS_FREQUENCY
+        print(f"{label:>12} {percentile(timings, 0.5):>10.1f} {percentile(timings, 0.99):>10.1f} "
+              f"{max(timings) * 1000:>10.1f} {statistics.mean(timings) * 1000:>10.1f} {completed:>10}")
+
+    print("=" * 72)
+
+if __name__ == "__main__":
+    main()
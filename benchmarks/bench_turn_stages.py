@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing breakdown of MirrorAgent turns.
+
+Reads MirrorAgent.last_turn_timings after each turn, with fake models that
+simulate embedding and chat completion round trips, and reports the mean
+time of each stage next to the total so the critical path is visible.
+
+Usage: python benchmarks/bench_turn_stages.py [--turns 50]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from config import Config
+from utils.memory_manager import MemoryManager
+from utils.mirror_agent import MirrorAgent
+from utils.personality_analyzer import PersonalityAnalyzer
+
+EMBEDDING_LATENCY = 0.08
+CHAT_LATENCY = 0.2
+
+class SlowFakeEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic embeddings that wait like a network call"""
+
+    def embed_documents(self, texts):
+        time.sleep(EMBEDDING_LATENCY)
+        return super().embed_documents(texts)
+
+    async def aembed_documents(self, texts):
+        await asyncio.sleep(EMBEDDING_LATENCY)
+        return super().embed_documents(texts)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "sk-benchmark"
+    stages = defaultdict(list)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        agent = MirrorAgent(
+            llm=FakeListChatModel(responses=["haha same, tell me more"], sleep=CHAT_LATENCY),
+            memory_manager=MemoryManager(embeddings=SlowFakeEmbeddings(size=256), data_dir=data_dir),
+            personality_analyzer=PersonalityAnalyzer(llm=FakeListChatModel(responses=["{}"]))
+        )
+        for i in range(args.turns):
+            agent.generate_response(f"turn {i}: what do you think about weekend hiking plans?")
+            for stage, elapsed in agent.last_turn_timings.items():
+                stages[stage].append(elapsed * 1000)
+        agent.analysis_worker.wait()
+
+    print("🪞 Turn stage breakdown (mean ms)")
+    print("=" * 48)
+    for stage, values in stages.items():
+        print(f"{stage:>24} {statistics.mean(values):>10.2f}")
+    serial = sum(statistics.mean(values) for stage, values in stages.items() if stage != "total")
+    print("-" * 48)
+    print(f"{'sum of stages':>24} {serial:>10.2f}")
+    print("=" * 48)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vector index tiers: exact flat search, HNSW and IVF-PQ,
+each with exact re-ranking of its candidates, at growing corpus sizes.
+
+Vectors are unit-length draws from a mixture of topic clusters, like
+message embeddings, and queries are fresh draws from the same mixture.
+Recall@k compares against exact search. A final run measures query
+latency while a background rebuild is in progress. HNSW at 1M vectors
+takes several minutes to build on one core.
+
+Usage: python benchmarks/bench_vector_index.py [--sizes 1000,10000,100000,1000000] [--dims 128]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from config import Config
+from utils.vector_index import MessageVectorIndex
+
+TIERS = {
+    # kind: (VECTOR_INDEX_HNSW_MIN, VECTOR_INDEX_IVF_MIN) forcing that kind
+    "flat": (float("inf"), float("inf")),
+    "hnsw": (0, float("inf")),
+    "ivfpq": (0, 0),
+}
+
+def make_vectors(count, dims, rng, topics):
+    """Unit vectors scattered around topic centres"""
+    vectors = topics[rng.integers(len(topics), size=count)] + rng.normal(scale=0.8, size=(count, dims))
+    vectors = vectors.astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+def build(kind, vectors, documents, background=False):
+    """Index vectors with the given tier forced, returning the index"""
+    Config.VECTOR_INDEX_HNSW_MIN, Config.VECTOR_INDEX_IVF_MIN = TIERS[kind]
+    Config.VECTOR_INDEX_BACKGROUND_BUILD = background
+    index = MessageVectorIndex(None)
+    index.add_embeddings(list(range(len(vectors))), vectors, documents)
+    return index
+
+def measure(index, queries, truth, k):
+    """Median query latency in ms and recall@k against exact search"""
+    latencies, found = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = index.similarity_search_by_vector(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += len({doc.metadata["id"] for doc, _ in results} & set(expected.tolist()))
+    return statistics.median(latencies), found / (len(truth) * k)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--dims", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--kinds", default="flat,hnsw,ivfpq")
+    parser.add_argument("--rebuild-size", type=int, default=100000, help="corpus size for the background rebuild run")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    kinds = args.kinds.split(",")
+    rng = np.random.default_rng(5)
+    saved = (Config.VECTOR_INDEX_HNSW_MIN, Config.VECTOR_INDEX_IVF_MIN, Config.VECTOR_INDEX_BACKGROUND_BUILD)
+
+    print(f"🪞 Vector index benchmark ({args.dims} dims, {args.queries} queries, k={args.k}, "
+          f"HNSW M={Config.HNSW_M} efSearch={Config.HNSW_EF_SEARCH}, IVF nprobe={Config.IVF_NPROBE}, "
+          f"refine x{Config.VECTOR_INDEX_REFINE})")
+    print("=" * 72)
+    print(f"{'vectors':>9} {'index':<7} {'build (s)':>10} {'p50 (ms)':>10} {'recall@' + str(args.k):>10}")
+
+    try:
+        for size in sizes:
+            # About 500 messages per topic at every size
+            topics = rng.normal(size=(max(16, size // 500), args.dims))
+            queries = make_vectors(args.queries, args.dims, rng, topics)
+            vectors = make_vectors(size, args.dims, rng, topics)
+            documents = [Document(page_content="", metadata={"id": doc_id}) for doc_id in range(size)]
+            exact = faiss.IndexFlatL2(args.dims)
+            exact.add(vectors)
+            _, truth = exact.search(queries, args.k)
+            del exact
+
+            for kind in kinds:
+                start = time.perf_counter()
+                index = build(kind, vectors, documents)
+                build_seconds = time.perf_counter() - start
+                latency, recall = measure(index, queries, truth, args.k)
+                print(f"{size:>9,} {kind:<7} {build_seconds:>10.1f} {latency:>10.3f} {recall:>10.3f}")
+                del index
+
+            if size == args.rebuild_size:
+                # Serve from exact search while HNSW builds on the worker thread
+                index = build("flat", vectors, documents)
+                flat_latency, _ = measure(index, queries, truth, args.k)
+                Config.VECTOR_INDEX_HNSW_MIN = 0
+                Config.VECTOR_INDEX_BACKGROUND_BUILD = True
+                index.remove([0])
+                building_latency, building_recall = measure(index, queries, truth, args.k)
+                served_during = index.get_stats()["building"]
+                index.wait_for_build()
+                after_latency, after_recall = measure(index, queries, truth, args.k)
+                rebuild = (size, flat_latency, building_latency, building_recall, served_during,
+                           after_latency, after_recall, index.last_build_seconds)
+                del index
+            del vectors, documents
+    finally:
+        Config.VECTOR_INDEX_HNSW_MIN, Config.VECTOR_INDEX_IVF_MIN, Config.VECTOR_INDEX_BACKGROUND_BUILD = saved
+    print("=" * 72)
+
+    if args.rebuild_size in sizes:
+        size, flat_latency, building_latency, building_recall, served_during, after_latency, after_recall, seconds = rebuild
+        print(f"Background HNSW build at {size:,} vectors took {seconds:.1f}s")
+        print(f"  before: p50 {flat_latency:.3f}ms (flat)")
+        print(f"  during: p50 {building_latency:.3f}ms, recall@{args.k} {building_recall:.3f} "
+              f"({'old index still serving' if served_during else 'build finished before queries ended'})")
+        print(f"  after:  p50 {after_latency:.3f}ms, recall@{args.k} {after_recall:.3f} (hnsw)")
+
+if __name__ == "__main__":
+    main()
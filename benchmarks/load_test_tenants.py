@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Load test for the per-user memory registry: simulated users chat
+concurrently, each with their own memory, while the registry keeps at
+most --max-tenants of them loaded. Reports resident memory and message
+and search latency for each cap.
+
+Each cap runs in a fresh process so RSS figures are not mixed.
+
+Usage: python benchmarks/load_test_tenants.py [--users 100] [--turns 20] [--max-tenants 10,50,100]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.soak_memory import current_rss_mb
+from utils.embeddings import FakeEmbeddings
+from utils.memory_registry import MemoryRegistry
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def simulate_user(registry, user_id, turns, latencies, lock):
+    """One user sending messages and searching their own memory"""
+    rng = random.Random(user_id)
+    samples = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        memory = registry.get(user_id)
+        memory.add_message("user", f"{user_id} says hello for the {turn}th time about topic {rng.randrange(50)}")
+        memory.get_similar_messages(f"topic {rng.randrange(50)}", k=3)
+        memory.add_message("assistant", f"reply {turn} to {user_id}")
+        samples.append((time.perf_counter() - start) * 1000)
+        # Users do not type continuously, which lets idle tenants age out
+        time.sleep(rng.uniform(0, 0.005))
+    with lock:
+        latencies.extend(samples)
+
+def run_once(users, turns, max_tenants, dims):
+    """Run one load test in this process and return its results"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        registry = MemoryRegistry(data_dir=data_dir, max_tenants=max_tenants, embeddings=FakeEmbeddings(dims))
+        baseline_rss = current_rss_mb()
+        latencies, lock = [], threading.Lock()
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=simulate_user, args=(registry, f"user-{i}", turns, latencies, lock))
+                   for i in range(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        registry.flush_all()
+        stats = registry.get_stats()
+        return {
+            "max_tenants": max_tenants,
+            "rss_mb": current_rss_mb() - baseline_rss,
+            "p50_ms": percentile(latencies, 50),
+            "p99_ms": percentile(latencies, 99),
+            "turns_per_sec": len(latencies) / elapsed,
+            "loads": stats["loads"],
+            "evictions": stats["evictions"]
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=20, help="turns per user")
+    parser.add_argument("--max-tenants", default="10,50,100", help="comma-separated registry caps")
+    parser.add_argument("--dims", type=int, default=512, help="embedding dimensions")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_once(args.users, args.turns, int(args.max_tenants), args.dims)))
+        return
+
+    print(f"🪞 Multi-user load test ({args.users} users x {args.turns} turns)")
+    print("=" * 80)
+    print(f"{'max tenants':>12} {'rss (MB)':>10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'turns/s':>10} {'loads':>8} {'evictions':>10}")
+    for cap in args.max_tenants.split(","):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--single", "--users", str(args.users),
+             "--turns", str(args.turns), "--max-tenants", cap, "--dims", str(args.dims)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{result['max_tenants']:>12} {result['rss_mb']:>10.1f} {result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f} "
+              f"{result['turns_per_sec']:>10.0f} {result['loads']:>8} {result['evictions']:>10}")
+    print("=" * 80)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Soak test for MemoryManager: push many messages through add_message and
+check that the vector index, resident memory and search latency stay
+bounded once history trimming kicks in.
+
+Exits non-zero if any bound is violated.
+
+Usage: python benchmarks/soak_memory.py [--messages 50000] [--dims 256]
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from config import Config
+from utils.memory_manager import MemoryManager
+
+RSS_GROWTH_LIMIT_MB = 64
+SEARCH_SLOWDOWN_LIMIT = 3.0
+
+def current_rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak RSS is the best we can do without procfs
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def search_latency_ms(memory, rounds=50):
+    start = time.perf_counter()
+    for i in range(rounds):
+        memory.get_similar_messages(f"soak query {i}", k=3)
+    return (time.perf_counter() - start) / rounds * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--dims", type=int, default=256, help="embedding dimensions")
+    args = parser.parse_args()
+
+    print("🪞 MemoryManager soak test")
+    print("=" * 72)
+    print(f"{'messages':>10} {'history':>10} {'vectors':>10} {'rss (MB)':>10} {'search (ms)':>12}")
+
+    failures = []
+    baseline_rss = baseline_search = None
+    checkpoint = max(args.messages // 10, 1)
+    warmup = args.messages * 3 // 10
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=args.dims), data_dir=data_dir)
+
+        for i in range(1, args.messages + 1):
+            role = "user" if i % 2 else "assistant"
+            memory.add_message(role, f"soak message {i} about topic {i % 97}")
+
+            if i % checkpoint == 0:
+                rss = current_rss_mb()
+                search = search_latency_ms(memory)
+                vectors = memory.vector_store.index.ntotal
+                print(f"{i:>10} {len(memory.chat_history):>10} {vectors:>10} {rss:>10.1f} {search:>12.3f}")
+
+                if vectors != len(memory.vector_store.documents) or vectors > Config.MAX_MEMORY_ITEMS:
+                    failures.append(f"index holds {vectors} vectors at {i} messages")
+
+                # Measure growth only after the embedding cache and history have filled up
+                if i >= warmup:
+                    if baseline_rss is None:
+                        baseline_rss, baseline_search = rss, search
+                    elif rss - baseline_rss > RSS_GROWTH_LIMIT_MB:
+                        failures.append(f"RSS grew {rss - baseline_rss:.1f}MB by {i} messages")
+                    elif search > baseline_search * SEARCH_SLOWDOWN_LIMIT:
+                        failures.append(f"search slowed to {search:.3f}ms by {i} messages")
+
+    print("=" * 72)
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Index size, RSS and search latency stayed bounded")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Local stand-in for the OpenAI API, for tests and benchmarks of the client
+settings. Answers chat completion and embedding requests after an injected
+latency, failing a share of them with a given status, and counts requests,
+errors and the TCP connections clients opened. Given per-minute limits it
+enforces them like the provider does, answering 429 with Retry-After.
+
+    with StubOpenAIServer(latency=0.05, error_rate=0.1) as server:
+        Config.OPENAI_BASE_URL = server.url
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from utils.rate_limiter import TokenBucket, estimate_body_tokens
+
+class StubOpenAIServer:
+    """Threaded HTTP server speaking enough of the OpenAI API for the chat and embedding clients"""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, error_status: int = 503, seed: int = 0,
+                 requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fail_next = 0  # Requests to fail before error_rate applies again
+        self.rng = random.Random(seed)
+
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._request_bucket = TokenBucket(requests_per_minute, time.monotonic) if requests_per_minute > 0 else None
+        self._token_bucket = TokenBucket(tokens_per_minute, time.monotonic) if tokens_per_minute > 0 else None
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def start(self) -> "StubOpenAIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                fail = True
+            else:
+                fail = self.rng.random() < self.error_rate
+            self.errors += fail
+            return fail
+
+    def _retry_after(self, body) -> Optional[float]:
+        """Take a request's share of the rate limits, or return seconds until it would fit"""
+        tokens = estimate_body_tokens(body)
+        charges = [(bucket, amount) for bucket, amount in ((self._request_bucket, 1), (self._token_bucket, tokens))
+                   if bucket]
+        with self._lock:
+            for bucket, _ in charges:
+                bucket.refill()
+            wait = max([bucket.wait_time(amount, 0.0) for bucket, amount in charges], default=0.0)
+            if wait > 0:
+                self.requests += 1
+                self.rate_limited += 1
+                return wait
+            for bucket, amount in charges:
+                bucket.level -= min(amount, bucket.level)
+            return None
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep connections alive so pooling shows in the counts
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                retry_after = stub._retry_after(body)
+                if retry_after is not None:
+                    self._send(429, {"error": {"message": "rate limit reached", "type": "requests"}},
+                               {"Retry-After": f"{retry_after:.3f}"})
+                    return
+                time.sleep(stub.latency)
+                if stub._should_fail():
+                    self._send(stub.error_status, {"error": {"message": "injected failure", "type": "server_error"}})
+                elif self.path.endswith("/chat/completions"):
+                    self._send(200, {
+                        "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": body.get("model"),
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": "stub reply"}}],
+                        "usage": {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3}
+                    })
+                elif self.path.endswith("/embeddings"):
+                    inputs = body.get("input") or []
+                    self._send(200, {
+                        "object": "list", "model": body.get("model"),
+                        "data": [{"object": "embedding", "index": i, "embedding": [0.1] * 8}
+                                 for i in range(len(inputs) if isinstance(inputs, list) else 1)],
+                        "usage": {"prompt_tokens": 1, "total_tokens": 1}
+                    })
+                else:
+                    self._send(404, {"error": {"message": f"no route {self.path}", "type": "invalid_request_error"}})
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
@@ -5,14 +5,69 @@ load_dotenv()
 
 class Config:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # Alternative API endpoint, None for OpenAI's
+    
+    # OpenAI connection settings
+    OPENAI_TIMEOUT = 30.0  # Seconds before a request is abandoned
+    OPENAI_CONNECT_TIMEOUT = 5.0  # Seconds to open a connection
+    OPENAI_MAX_CONNECTIONS = 20  # Open connections in the shared pool
+    OPENAI_MAX_KEEPALIVE = 10  # Idle connections kept open for reuse
+    OPENAI_MAX_RETRIES = 3  # Retries of a request after a 429, 5xx, timeout or other transport error
+    OPENAI_BACKOFF_BASE = 0.5  # Seconds; retry n waits a random time up to base * 2^n
+    OPENAI_BACKOFF_MAX = 8.0  # Longest wait between retries, including Retry-After
+    CIRCUIT_BREAKER_FAILURES = 5  # Failed requests in a row before calls fail fast
+    CIRCUIT_BREAKER_RESET = 30.0  # Seconds calls fail fast before a trial request is let through, and a trial may take
+    RATE_LIMIT_RPM = 0  # Requests per minute the provider allows this key, 0 for no client-side limit
+    RATE_LIMIT_TPM = 0  # Tokens per minute the provider allows this key, 0 for no client-side limit
+    RATE_LIMIT_EMBEDDING_RESERVE = 0.1  # Share of each budget embedding calls leave for chat turns
+    RATE_LIMIT_BACKGROUND_RESERVE = 0.3  # Share of each budget personality analysis leaves for chat and embeddings
+    RATE_LIMIT_MAX_WAIT = 30.0  # Seconds a call may wait for budget before it fails
     
     # Memory settings
+    DATA_DIR = "data"
+    DEFAULT_USER_ID = "default"  # Tenant whose data lives directly in DATA_DIR
+    TENANT_SOURCE = "default"  # Whose memory a visitor gets: default (the signed-in user's if Streamlit login is configured, else the single DATA_DIR memory), login (sign-in required) or url (?user=, unauthenticated, trusted deployments only)
+    MAX_LOADED_TENANTS = 50  # Idle tenants kept in memory before the least recent is unloaded
     MAX_MEMORY_ITEMS = 1000
-    SIMILARITY_THRESHOLD = 0.7
+    SIMILARITY_THRESHOLD = None  # Minimum cosine similarity for a message found only by vector search, None for the backend's default
+    SIMILARITY_THRESHOLDS = {"openai": 0.7, "local": 0.1, "fake": -1.0}  # Default threshold per embedding backend
+    DUPLICATE_THRESHOLD = 0.95  # Cosine similarity above which two retrieved messages count as repeats
+    RETRIEVAL_MMR = True  # Re-rank retrieved messages for diversity (maximal marginal relevance)
+    MMR_LAMBDA = 0.7  # 1.0 ranks purely by relevance, lower values favour diversity
+    RETRIEVAL_CANDIDATES = 4  # Candidates fetched per retrieved message before filtering
+    VECTOR_INDEX_HNSW_MIN = 20000  # Vectors before exact search gives way to an HNSW graph
+    VECTOR_INDEX_IVF_MIN = 500000  # Vectors before switching to an IVF-PQ index, which builds faster
+    VECTOR_INDEX_BACKGROUND_BUILD = True  # Build approximate indexes on a worker thread, searching the old one meanwhile
+    VECTOR_INDEX_REFINE = 10  # Approximate candidates per result, re-ranked by exact distance
+    VECTOR_INDEX_STALE_RATIO = 0.2  # Rebuild once this share of the approximate index was removed
+    HNSW_M = 32  # Graph links per vector; more raises recall and memory
+    HNSW_EF_CONSTRUCTION = 80  # Build-time search breadth; more raises recall and build time
+    HNSW_EF_SEARCH = 64  # Query-time search breadth; more raises recall and latency
+    IVF_NLIST = 0  # Inverted lists, 0 for 4 * sqrt(vectors) up to 1024
+    IVF_NPROBE = 16  # Lists scanned per query; more raises recall and latency
+    IVF_PQ_SUBQUANTIZERS = 32  # PQ code bytes per vector, rounded down to divide the dimensions
+    INDEX_SAVE_INTERVAL = 20  # Save the FAISS index every 20 user messages
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")  # openai, local or fake
+    EMBEDDING_DIMENSIONS = 512  # Vector size for the local and fake backends
+    EMBEDDING_CACHE_SIZE = 5000  # Embeddings kept in memory, the rest stay on disk
+    CHAT_LOG_FSYNC_EVERY = 8  # Appended messages between fsyncs
+    CHAT_LOG_COMPACT_EVERY = 500  # Appended messages between snapshot compactions
+    IMPORT_BATCH_SIZE = 256  # Messages embedded per request during bulk import
+    RETRIEVAL_MODE = "hybrid"  # hybrid (keywords + vectors), vector or lexical
+    LEXICAL_FAST_PATH_TOKENS = 2  # Queries this short are answered from keywords alone
+    RETRIEVAL_EMBED_TIMEOUT = 2.0  # Seconds to wait for a query embedding before using keywords only
+    RRF_CONSTANT = 60  # Reciprocal rank fusion damping; higher flattens rank differences
     
     # Personality analysis settings
     PERSONALITY_ANALYSIS_FREQUENCY = 10  # Every 10 messages
     MIN_MESSAGES_FOR_ANALYSIS = 5
+    ANALYSIS_WINDOW = 50  # Most recent user messages sent to each analysis
+    INCREMENTAL_PERSONALITY_ANALYSIS = True  # After the first analysis, send only new messages and merge the result
+    PROFILE_EWMA_ALPHA = 0.3  # Weight of a new analysis when blending scores into the profile
+    PROFILE_LIST_LIMIT = 20  # Interests, phrases and other list entries kept after merging
+    SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "textblob")  # textblob, or lexicon for fast approximate scores
+    SENTIMENT_PROCESSES = 0  # Worker processes for TextBlob scoring during bulk import, 0 to score in-process
+    BACKGROUND_PERSONALITY_ANALYSIS = True  # Analyze on a worker thread instead of during the turn
     
     # UI settings
     THEME_COLOR = "#6366f1"
@@ -21,4 +76,13 @@ class Config:
     # Model settings
     MODEL_NAME = "gpt-3.5-turbo"
     TEMPERATURE = 0.7
-    MAX_TOKENS = 150
\ No newline at end of file
+    MAX_TOKENS = 150
+    MODEL_CONTEXT_TOKENS = 16385  # Context window of MODEL_NAME, shared by the prompt and the reply
+    PROMPT_TOKEN_BUDGET = 2000  # Most prompt tokens per turn; lower-priority sections are trimmed to fit
+    CONTEXT_MESSAGES = 6  # Recent messages offered to the prompt, newest kept first when trimming
+    LOG_TURN_TIMINGS = False  # Print per-stage timings of every chat turn
+    RESPONSE_CACHE = False  # Reuse replies to repeated inputs; off where every reply must be freshly generated
+    RESPONSE_CACHE_SIZE = 256  # Replies kept per user before the least recently used is dropped
+    RESPONSE_CACHE_TTL = 3600  # Seconds a cached reply stays usable
+    RESPONSE_CACHE_CONTEXT_MESSAGES = 0  # Preceding user messages that must match for a cached reply to be reused
+    RESPONSE_CACHE_SIMILARITY = 0.0  # Cosine similarity for near-duplicate inputs to share a reply, 0 for exact only
\ No newline at end of file
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+MirrorMe - AI Personality Cloning System
+Bulk-import an existing chat export to seed a personality
+"""
+
+import argparse
+import sys
+from config import Config
+from utils.bulk_import import read_messages
+from utils.memory_manager import MemoryManager
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Seed MirrorMe memory from a chat export")
+    parser.add_argument("path", help="JSON, JSONL or CSV file of messages")
+    parser.add_argument("--format", choices=["json", "jsonl", "csv"],
+                        help="file format (default: from the file extension)")
+    parser.add_argument("--batch-size", type=int, default=Config.IMPORT_BATCH_SIZE,
+                        help="messages embedded per request")
+    parser.add_argument("--role", default="user", help="role for records without one")
+    parser.add_argument("--processes", type=int, default=Config.SENTIMENT_PROCESSES,
+                        help="worker processes for sentiment scoring (0: score in-process)")
+    parser.add_argument("--data-dir", default="data", help="MirrorMe data directory")
+    return parser.parse_args()
+
+def main():
+    """Main import function"""
+    args = parse_args()
+    
+    print("🪞 MirrorMe - Chat History Import")
+    print("=" * 50)
+    
+    try:
+        memory = MemoryManager(data_dir=args.data_dir)
+        messages = read_messages(args.path, file_format=args.format, default_role=args.role)
+        stats = memory.import_messages(messages, batch_size=args.batch_size, processes=args.processes)
+    except (OSError, ValueError) as e:
+        print(f"❌ Import failed: {e}")
+        sys.exit(1)
+    
+    print(f"✅ Read {stats['messages_read']} messages")
+    print(f"✅ Kept {stats['messages_imported']} (memory limit {Config.MAX_MEMORY_ITEMS})")
+    print(f"✅ Embedded {stats['messages_embedded']} user messages")
+    print(f"⚡ {stats['messages_per_sec']:.0f} messages/sec ({stats['seconds']:.2f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@ Test script for MirrorMe components
 
 import os
 import sys
+import tempfile
+from langchain_core.embeddings import DeterministicFakeEmbedding
 from utils.mirror_agent import MirrorAgent
 from utils.memory_manager import MemoryManager
 from utils.personality_analyzer import PersonalityAnalyzer
@@ -50,6 +52,481 @@ def test_memory_manager():
         print(f"❌ Memory manager error: {e}")
         return False
 
+def test_vector_index_persistence():
+    """Test that the FAISS index is reloaded instead of rebuilt"""
+    print("🧪 Testing vector index persistence...")
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            embeddings = DeterministicFakeEmbedding(size=32)
+            memory = MemoryManager(embeddings=embeddings, data_dir=data_dir)
+            for i in range(3):
+                memory.add_message("user", f"Persisted message {i}")
+            memory._save_vector_store()
+            memory.add_message("user", "Added after the last save")
+            
+            reloaded = MemoryManager(embeddings=embeddings, data_dir=data_dir)
+            contents = [doc.page_content for doc in reloaded.vector_store.documents.values()]
+            assert "Added after the last save" in contents
+            manifest = reloaded.index_store.load_manifest()
+            newest = reloaded.chat_history[-1]
+            assert manifest['message_count'] == 4 and manifest['last_id'] == newest['id']
+            assert manifest['last_timestamp'] == newest['timestamp']
+        print(f"✅ Vector index persistence working - {len(contents)} vectors reloaded")
+    except Exception as e:
+        print(f"❌ Vector index persistence error: {e}")
+        raise
+
+def test_embedding_cache():
+    """Test that repeated texts are embedded once"""
+    print("🧪 Testing embedding cache...")
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            memory.add_message("user", "Cache me if you can")
+            memory.get_similar_messages("Cache me if you can")
+            stats = memory.get_embedding_cache_stats()
+            assert stats["misses"] == 1 and stats["hits"] == 1
+            
+            reloaded = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            reloaded.get_similar_messages("Cache me if you can")
+            assert reloaded.get_embedding_cache_stats()["disk_hits"] == 1
+        print(f"✅ Embedding cache working - hit rate {stats['hit_rate']:.0%}")
+    except Exception as e:
+        print(f"❌ Embedding cache error: {e}")
+        raise
+
+def test_chat_log():
+    """Test chat log replay, compaction and torn-record recovery"""
+    print("🧪 Testing chat log...")
+    try:
+        from utils.chat_log import ChatLog
+        with tempfile.TemporaryDirectory() as data_dir:
+            snapshot = os.path.join(data_dir, "chat_history.json")
+            log_file = os.path.join(data_dir, "chat_history.log.jsonl")
+            chat_log = ChatLog(snapshot, log_file, compact_every=3)
+            messages = []
+            for i in range(4):
+                messages.append({"role": "user", "content": f"Logged {i}"})
+                chat_log.append(messages[-1])
+                if chat_log.needs_compaction():
+                    chat_log.compact(messages)
+            chat_log.close()
+            
+            with open(log_file, 'a') as f:
+                f.write('{"seq": 5, "mess')
+            
+            replayed = ChatLog(snapshot, log_file).load()
+            assert [m["content"] for m in replayed] == [m["content"] for m in messages]
+        print(f"✅ Chat log working - {len(replayed)} messages replayed")
+    except Exception as e:
+        print(f"❌ Chat log error: {e}")
+        raise
+
+def test_vector_index_trimming():
+    """Test that trimmed messages are evicted from the vector index"""
+    print("🧪 Testing vector index trimming...")
+    from config import Config
+    max_items = Config.MAX_MEMORY_ITEMS
+    try:
+        Config.MAX_MEMORY_ITEMS = 4
+        with tempfile.TemporaryDirectory() as data_dir:
+            memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            for i in range(6):
+                memory.add_message("user", f"Message {i}")
+                memory.add_message("assistant", f"Reply {i}")
+            
+            live_ids = {msg['id'] for msg in memory.chat_history if msg['role'] == 'user'}
+            assert set(memory.vector_store.documents) == live_ids
+            assert memory.vector_store.index.ntotal == len(live_ids) == 2
+            assert "Message 0" not in memory.get_similar_messages("Message 0", k=3)
+        print(f"✅ Vector index trimming working - {len(live_ids)} vectors kept")
+    except Exception as e:
+        print(f"❌ Vector index trimming error: {e}")
+        raise
+    finally:
+        Config.MAX_MEMORY_ITEMS = max_items
+
+def test_vector_index_tiers():
+    """Test switching to approximate indexes as the vector count grows"""
+    print("🧪 Testing vector index tiers...")
+    import numpy as np
+    from config import Config
+    from langchain_core.documents import Document
+    from utils.vector_index import MessageVectorIndex
+    saved = (Config.VECTOR_INDEX_HNSW_MIN, Config.VECTOR_INDEX_IVF_MIN)
+    try:
+        Config.VECTOR_INDEX_HNSW_MIN, Config.VECTOR_INDEX_IVF_MIN = 200, 2000
+        vectors = np.random.default_rng(0).normal(size=(2100, 16)).astype(np.float32)
+        index = MessageVectorIndex(None)
+        
+        def add(start, stop):
+            index.add_embeddings(list(range(start, stop)), vectors[start:stop],
+                                 [Document(page_content=str(i), metadata={"id": i}) for i in range(start, stop)])
+        
+        def nearest(doc_id):
+            return index.similarity_search_by_vector(vectors[doc_id], k=1)[0][0].metadata["id"]
+        
+        add(0, 300)
+        assert index.wait_for_build(30) and index.ann_kind == "hnsw"
+        index.remove(list(range(50)))
+        assert nearest(10) != 10 and nearest(100) == 100
+        
+        add(300, 2100)
+        assert index.wait_for_build(30) and index.ann_kind == "ivfpq"
+        assert nearest(2000) == 2000 and len(index.get_vectors([5, 60])) == 1
+        print(f"✅ Vector index tiers working - {index.get_stats()['kind']} at {len(index)} vectors")
+    except Exception as e:
+        print(f"❌ Vector index tiers error: {e}")
+        raise
+    finally:
+        Config.VECTOR_INDEX_HNSW_MIN, Config.VECTOR_INDEX_IVF_MIN = saved
+
+def test_analysis_worker():
+    """Test background personality analysis and request coalescing"""
+    print("🧪 Testing analysis worker...")
+    try:
+        import threading
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        from utils.analysis_worker import PersonalityAnalysisWorker
+        release = threading.Event()
+        
+        class SlowAnalyzer(PersonalityAnalyzer):
+            def _invoke(self, prompt):
+                release.wait(5)
+                return '{"favorite_phrases": ["no way"]}'
+        
+        with tempfile.TemporaryDirectory() as data_dir:
+            memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            memory.add_message("user", "no way that happened")
+            worker = PersonalityAnalysisWorker(SlowAnalyzer(llm=FakeListChatModel(responses=["{}"])), memory)
+            for _ in range(4):
+                worker.submit()
+            assert worker.is_pending()
+            release.set()
+            assert worker.wait(5)
+            status = worker.get_status()
+            assert memory.get_personality_traits()["favorite_phrases"] == ["no way"]
+            assert status["completed"] + status["coalesced"] == 4 and status["coalesced"] >= 2
+        print(f"✅ Analysis worker working - {status['completed']} run(s), {status['coalesced']} coalesced")
+    except Exception as e:
+        print(f"❌ Analysis worker error: {e}")
+        raise
+
+def test_embedding_backends():
+    """Test the local and fake embedding backends"""
+    print("🧪 Testing embedding backends...")
+    try:
+        import numpy as np
+        from utils.embeddings import get_embeddings
+        local = get_embeddings("local")
+        vectors = local.embed_documents_array(["I love playing guitar", "guitar playing is fun", "tax forms due"])
+        assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+        
+        fake = get_embeddings("fake")
+        assert fake.embed_query("same text") == fake.embed_query("same text")
+        assert np.allclose(np.linalg.norm(fake.embed_documents_array(["a", "b"]), axis=1), 1.0)
+        print(f"✅ Embedding backends working - {local.model}, {fake.model}")
+    except Exception as e:
+        print(f"❌ Embedding backends error: {e}")
+        raise
+
+def test_bulk_import():
+    """Test streaming a chat export into memory in batches"""
+    print("🧪 Testing bulk import...")
+    try:
+        import json
+        from utils.bulk_import import read_messages
+        with tempfile.TemporaryDirectory() as data_dir:
+            export_file = os.path.join(data_dir, "export.json")
+            with open(export_file, 'w') as f:
+                json.dump([{"role": "user" if i % 2 == 0 else "assistant", "text": f"Old message {i}"}
+                           for i in range(40)], f)
+            
+            memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            memory.add_message("user", "Already here")
+            stats = memory.import_messages(read_messages(export_file), batch_size=8)
+            assert stats["messages_read"] == 40 and stats["messages_embedded"] == 20
+            assert len(memory.vector_store) == 21
+            
+            reloaded = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            ids = [msg["id"] for msg in reloaded.chat_history]
+            assert len(ids) == 41 and len(set(ids)) == 41
+            assert reloaded.get_embedding_cache_stats()["misses"] == 0
+            
+            # Records that are not objects are reported with where they are, not a traceback
+            for name, body, where in (("bad.jsonl", '{"text": "ok", "metadata": "x"}\n\n"just text"\n', "Line 3"),
+                                      ("bad.json", '[{"text": "ok", "metadata": "x"}, 42]', "Message 2")):
+                bad_file = os.path.join(data_dir, name)
+                with open(bad_file, 'w') as f:
+                    f.write(body)
+                messages = read_messages(bad_file)
+                assert next(messages) == {"role": "user", "content": "ok", "metadata": {}}
+                try:
+                    list(messages)
+                    assert False, f"imported {name}"
+                except ValueError as e:
+                    assert str(e).startswith(where), e
+        print(f"✅ Bulk import working - {stats['messages_per_sec']:.0f} messages/sec")
+    except Exception as e:
+        print(f"❌ Bulk import error: {e}")
+        raise
+
+def test_streaming_history():
+    """Test loading only the history tail and streaming exports"""
+    print("🧪 Testing streaming history...")
+    try:
+        import json
+        from utils.bulk_import import read_messages
+        from utils.chat_log import ChatLog
+        with tempfile.TemporaryDirectory() as data_dir:
+            snapshot = os.path.join(data_dir, "chat_history.json")
+            with open(snapshot, 'w') as f:
+                json.dump([{"role": "user", "content": f"legacy {i}", "timestamp": "2024-01-01", "metadata": {}}
+                           for i in range(300)], f, indent=2)
+            
+            log = ChatLog(snapshot, os.path.join(data_dir, "chat_history.log.jsonl"))
+            tail = log.load(limit=10)
+            assert [msg["id"] for msg in tail] == list(range(291, 301)) and log.last_seq == 300
+            
+            memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            memory.update_personality_profile({"tone": "dry"})
+            exported = "".join(memory.iter_export())
+            expected = json.dumps(memory.export_data(), indent=2)
+            assert exported.split('"export_timestamp"')[0] == expected.split('"export_timestamp"')[0]
+            
+            export_file = os.path.join(data_dir, "export.json")
+            with open(export_file, 'w') as f:
+                f.write(exported)
+            assert len(list(read_messages(export_file))) == 300
+            
+            # An export read while the history is cleared and refilled holds only messages from before
+            from utils import memory_manager
+            chunks = memory.iter_export()
+            head = [next(chunks) for _ in range(3)]
+            memory.clear_memory()
+            memory.add_message("user", "after the reset")
+            partial = json.loads("".join(head) + "".join(chunks))["chat_history"]
+            assert len(partial) == memory_manager.EXPORT_BATCH_SIZE and partial[-1]["content"].startswith("legacy")
+        print(f"✅ Streaming history working - kept {len(tail)} of 300 messages")
+    except Exception as e:
+        print(f"❌ Streaming history error: {e}")
+        raise
+
+def test_message_store():
+    """Test the columnar chat history store against plain message dicts"""
+    print("🧪 Testing message store...")
+    try:
+        from utils.message_store import MessageStore
+        messages = [
+            {"role": "user", "content": "hi", "timestamp": "2024-05-01T10:00:00.123456", "metadata": {"sentiment": 0.5}, "id": 1},
+            {"role": "assistant", "content": "hello", "timestamp": "2024-05-01T10:00:01", "metadata": {}, "id": 2},
+            {"role": "user", "content": "tz", "timestamp": "2024-05-01T10:00:02+02:00", "metadata": {"source": "import"}, "id": 3},
+            {"role": "system", "content": "odd", "timestamp": "yesterday", "metadata": {}, "id": 4}
+        ]
+        store = MessageStore(capacity=3)
+        evicted = store.extend(messages)
+        assert evicted == [1] and len(store) == 3 and store.user_count == 1
+        assert list(store) == messages[1:] and store[-1] == messages[-1]
+        assert store.user_contents(5) == ["tz"] and store[-2:] == messages[2:]
+        store.append({"role": "user", "content": "again", "timestamp": None, "metadata": {}, "id": 5})
+        assert store.user_contents(2) == ["tz", "again"] and store[-1]["timestamp"] is None
+        # A timestamp read once must not outlive its message when the slot is reused
+        assert store[0]["timestamp"] == "2024-05-01T10:00:02+02:00" and store[1]["timestamp"] == "yesterday"
+        store.append({"role": "user", "content": "later", "timestamp": "2024-05-02T09:30:00", "metadata": {}, "id": 6})
+        assert [m["timestamp"] for m in store] == ["yesterday", None, "2024-05-02T09:30:00"]
+        
+        # Full reads, as compaction and export do, keep formatted text only for the newest messages
+        big = MessageStore(capacity=100, recent_timestamps=4)
+        big.extend({"role": "user", "content": str(i), "timestamp": f"2024-05-01T10:00:{i % 60:02d}", "id": i} for i in range(150))
+        assert [m["timestamp"] for m in big][-1] == "2024-05-01T10:00:29"
+        assert sorted(big._recent_texts) == [146, 147, 148, 149]
+        big.append({"role": "user", "content": "next", "timestamp": "2024-05-01T11:00:00", "id": 150})
+        assert len(big._recent_texts) <= 4 and big[-2]["timestamp"] == "2024-05-01T10:00:29"
+        print(f"✅ Message store working - {len(store)} messages, {store.user_count} from the user")
+    except Exception as e:
+        print(f"❌ Message store error: {e}")
+        raise
+
+def test_hybrid_retrieval():
+    """Test BM25 keyword search, rank fusion and the keyword fast path"""
+    print("🧪 Testing hybrid retrieval...")
+    from config import Config
+    mmr = Config.RETRIEVAL_MMR
+    try:
+        from utils.lexical_index import BM25Index
+        index = BM25Index()
+        index.add(1, "guitar practice tonight")
+        index.add(2, "tax forms tonight")
+        index.add(3, "new guitar strings for my guitar")
+        assert [doc_id for doc_id, _ in index.search("guitar", k=3)] == [3, 1]
+        index.remove([3])
+        assert [doc_id for doc_id, _ in index.search("guitar strings", k=3)] == [1]
+        
+        # Random fake vectors carry no meaning, so rank by fusion order alone
+        Config.RETRIEVAL_MMR = False
+        with tempfile.TemporaryDirectory() as data_dir:
+            memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            for text in ["I love my guitar", "tax forms are due", "lol", "my cat is asleep", "lol so true"]:
+                memory.add_message("user", text)
+            assert memory.get_similar_messages("lol") == ["lol so true"]
+            assert memory.get_similar_messages("ok") == []
+            assert memory.get_similar_messages("playing my guitar tonight", k=2)[0] == "I love my guitar"
+            
+            def unavailable(query):
+                raise ConnectionError("embedding service down")
+            memory.embeddings.embed_query = unavailable
+            assert memory.get_similar_messages("when are the tax forms due") == ["tax forms are due"]
+        print("✅ Hybrid retrieval working - keyword fast path and fallback")
+    except Exception as e:
+        print(f"❌ Hybrid retrieval error: {e}")
+        raise
+    finally:
+        Config.RETRIEVAL_MMR = mmr
+
+def test_retrieval_filtering():
+    """Test the similarity threshold, repeat removal and MMR re-ranking"""
+    print("🧪 Testing retrieval filtering...")
+    try:
+        import numpy as np
+        from config import Config
+        from langchain_core.embeddings import Embeddings
+        
+        class FixedEmbeddings(Embeddings):
+            vectors = {
+                "my dog ran away today": [1.0, 0.0, 0.0],
+                "I miss my dog": [0.9, 0.1, 0.0],
+                "I miss my dog so much": [0.9, 0.1, 0.01],
+                "my dog loves the park": [0.8, 0.0, 0.6],
+                "the weather is nice": [0.0, 1.0, 0.0],
+            }
+            def embed_documents(self, texts):
+                return [self.vectors[text] for text in texts]
+            def embed_query(self, text):
+                return self.vectors[text]
+        
+        from utils.embeddings import similarity_threshold
+        threshold, mode = Config.SIMILARITY_THRESHOLD, Config.RETRIEVAL_MODE
+        try:
+            assert similarity_threshold("local") < similarity_threshold("openai")
+            with tempfile.TemporaryDirectory() as data_dir:
+                memory = MemoryManager(embeddings=FixedEmbeddings(), data_dir=data_dir)
+                for text in ["I miss my dog", "I miss my dog so much", "my dog loves the park",
+                             "the weather is nice", "my dog ran away today"]:
+                    memory.add_message("user", text)
+                
+                # The current message, the repeat and the unrelated message are all left out
+                similar = memory.get_similar_messages("my dog ran away today")
+                assert similar == ["I miss my dog", "my dog loves the park"], similar
+                Config.SIMILARITY_THRESHOLD = 0.9
+                # Keyword matches are kept whatever their vector scores, vector-only ones need the threshold
+                assert memory.get_similar_messages("my dog ran away today") == ["I miss my dog", "my dog loves the park"]
+                Config.RETRIEVAL_MODE = "vector"
+                assert memory.get_similar_messages("my dog ran away today") == ["I miss my dog"]
+        finally:
+            Config.SIMILARITY_THRESHOLD, Config.RETRIEVAL_MODE = threshold, mode
+        
+        from utils.vector_index import maximal_marginal_relevance
+        vectors = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]])
+        assert maximal_marginal_relevance(np.array([0.9, 0.8, 0.5]), vectors, k=2) == [0, 2]
+        assert maximal_marginal_relevance(np.array([0.9, 0.8, 0.5]), vectors, k=3, duplicate_threshold=0.95) == [0, 2]
+        print(f"✅ Retrieval filtering working - {len(similar)} of 4 past messages kept")
+    except Exception as e:
+        print(f"❌ Retrieval filtering error: {e}")
+        raise
+
+def test_memory_registry():
+    """Test per-user memory isolation and idle tenant unloading"""
+    print("🧪 Testing memory registry...")
+    try:
+        import gc
+        from config import Config
+        from utils.memory_registry import MemoryRegistry
+        with tempfile.TemporaryDirectory() as data_dir:
+            registry = MemoryRegistry(data_dir=data_dir, max_tenants=2, embeddings=DeterministicFakeEmbedding(size=32))
+            alice = registry.get("alice")
+            assert registry.get("alice") is alice
+            alice.add_message("user", "I'm Alice")
+            registry.get("bob").add_message("user", "I'm Bob")
+            assert registry.get("bob").get_user_message_count() == 1
+            
+            # Alice is unloaded but still held here, so she is reused rather than loaded again
+            registry.get("carol")
+            assert registry.get("alice") is alice
+            assert registry.tenant_dir("../evil") != registry.tenant_dir("___evil")
+            
+            # Visitors share the default memory unless they are signed in or a trusted ?user= names another
+            from utils.memory_registry import resolve_tenant_id
+            assert resolve_tenant_id(requested="alice") == Config.DEFAULT_USER_ID
+            assert registry.tenant_dir(resolve_tenant_id()) == data_dir
+            assert resolve_tenant_id(login="a@x.io") == "login-a@x.io"
+            assert resolve_tenant_id(source="login") is None
+            assert resolve_tenant_id(requested="alice", source="url") == "alice"
+            assert resolve_tenant_id(requested="login-a@x.io", source="url") == Config.DEFAULT_USER_ID
+            
+            # Once nothing holds her, Alice is reloaded from disk
+            del alice
+            registry.get("dave")
+            registry.get("erin")
+            gc.collect()
+            assert registry.get("alice").get_user_message_count() == 1
+            stats = registry.get_stats()
+            assert stats["loaded"] == 2 and stats["loads"] == 6
+        print(f"✅ Memory registry working - {stats['loads']} loads, {stats['evictions']} evictions")
+    except Exception as e:
+        print(f"❌ Memory registry error: {e}")
+        raise
+
+def test_message_statistics():
+    """Test running window statistics against a from-scratch computation"""
+    print("🧪 Testing message statistics...")
+    try:
+        from utils.message_stats import MessageStatistics
+        messages = [f"Coffee number {i} is great!" if i % 3 else f"Why is the deadline {i} so close?" for i in range(12)]
+        running = MessageStatistics(window=5)
+        for text in messages:
+            running.add(text)
+        expected = MessageStatistics.from_messages(messages[-5:]).summary()["message_statistics"]
+        actual = running.summary()["message_statistics"]
+        assert set(actual["common_words"]) == set(expected["common_words"])
+        for key in ("total_messages", "avg_words_per_message", "question_frequency", "exclamation_frequency"):
+            assert actual[key] == expected[key], key
+        assert abs(actual["avg_sentiment"] - expected["avg_sentiment"]) < 1e-9
+        
+        with tempfile.TemporaryDirectory() as data_dir:
+            memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            for text in messages:
+                memory.add_message("user", text)
+            reloaded = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            assert reloaded.get_message_statistics() == memory.get_message_statistics()
+        print(f"✅ Message statistics working - {actual['total_messages']} messages in window")
+    except Exception as e:
+        print(f"❌ Message statistics error: {e}")
+        raise
+
+def test_sentiment_scoring():
+    """Test sentiment scorers and scoring once at ingestion"""
+    print("🧪 Testing sentiment scoring...")
+    try:
+        from utils.sentiment import get_sentiment_scorer
+        texts = ["I love this, it is wonderful!", "This is terrible", "The meeting is at noon", "not good at all"]
+        textblob = get_sentiment_scorer("textblob").score_batch(texts)
+        lexicon = get_sentiment_scorer("lexicon").score_batch(texts)
+        assert lexicon[0] > 0 > lexicon[1] and lexicon[2] == 0 and lexicon[3] < 0
+        assert all(abs(a - b) < 0.3 for a, b in zip(textblob, lexicon))
+        
+        with tempfile.TemporaryDirectory() as data_dir:
+            memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            memory.add_message("user", texts[0])
+            memory.add_message("user", texts[1], {"sentiment": -0.25})
+            memory.import_messages([{"role": "user", "content": texts[2]}])
+            scores = [msg["metadata"]["sentiment"] for msg in memory.chat_history]
+            assert scores == [textblob[0], -0.25, 0.0]
+            assert abs(memory.get_message_statistics()["message_statistics"]["avg_sentiment"] - sum(scores) / 3) < 1e-9
+        print(f"✅ Sentiment scoring working - lexicon {lexicon[0]:.2f} vs TextBlob {textblob[0]:.2f}")
+    except Exception as e:
+        print(f"❌ Sentiment scoring error: {e}")
+        raise
+
 def test_personality_analyzer():
     """Test personality analyzer"""
     print("🧪 Testing personality analyzer...")
@@ -75,6 +552,439 @@ def test_mirror_agent():
         print(f"❌ Mirror agent error: {e}")
         return False
 
+def test_async_response():
+    """Test the async response pipeline and its stage timings"""
+    print("🧪 Testing async response generation...")
+    from config import Config
+    api_key = Config.OPENAI_API_KEY
+    try:
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        Config.OPENAI_API_KEY = api_key or "sk-test"
+        with tempfile.TemporaryDirectory() as data_dir:
+            agent = MirrorAgent(
+                llm=FakeListChatModel(responses=["hey there!"]),
+                memory_manager=MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir),
+                personality_analyzer=PersonalityAnalyzer(llm=FakeListChatModel(responses=["{}"]))
+            )
+            response = agent.generate_response("hello mirror")
+            assert response == "hey there!"
+            assert [m["role"] for m in agent.memory_manager.chat_history] == ["user", "assistant"]
+            assert {"store_message", "retrieval", "llm", "total"} <= set(agent.last_turn_timings)
+            
+            # A tenant stuck saving must not hold up other tenants' turns on the shared loop
+            import asyncio, time
+            from utils.async_runner import _get_loop
+            busy = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=os.path.join(data_dir, "busy"))
+            with busy._lock:
+                stuck = asyncio.run_coroutine_threadsafe(busy.aadd_message("user", "blocked"), _get_loop())
+                time.sleep(0.05)
+                asyncio.run_coroutine_threadsafe(agent.memory_manager.aadd_message("user", "still served"),
+                                                 _get_loop()).result(timeout=2)
+                asyncio.run_coroutine_threadsafe(agent.memory_manager.aget_similar_messages("still served please"),
+                                                 _get_loop()).result(timeout=2)
+            stuck.result(timeout=5)
+            assert busy.get_user_message_count() == 1
+        print(f"✅ Async response working - {agent.last_turn_timings['total'] * 1000:.1f}ms turn")
+    except Exception as e:
+        print(f"❌ Async response error: {e}")
+        raise
+    finally:
+        Config.OPENAI_API_KEY = api_key
+
+def test_stream_response():
+    """Test token streaming and persistence of the streamed response"""
+    print("🧪 Testing streamed responses...")
+    from config import Config
+    api_key = Config.OPENAI_API_KEY
+    try:
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        Config.OPENAI_API_KEY = api_key or "sk-test"
+        with tempfile.TemporaryDirectory() as data_dir:
+            agent = MirrorAgent(
+                llm=FakeListChatModel(responses=["streaming works"]),
+                memory_manager=MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir),
+                personality_analyzer=PersonalityAnalyzer(llm=FakeListChatModel(responses=["{}"]))
+            )
+            chunks = list(agent.stream_response("stream please"))
+            assert len(chunks) > 1 and "".join(chunks) == "streaming works"
+            assert agent.memory_manager.chat_history[-1]["content"] == "streaming works"
+            assert "first_token" in agent.last_turn_timings
+        print(f"✅ Streaming working - {len(chunks)} chunks")
+    except Exception as e:
+        print(f"❌ Streaming error: {e}")
+        raise
+    finally:
+        Config.OPENAI_API_KEY = api_key
+
+def test_prompt_builder():
+    """Test token-budgeted prompt assembly and personality context caching"""
+    print("🧪 Testing prompt builder...")
+    from config import Config
+    api_key = Config.OPENAI_API_KEY
+    try:
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        from utils.prompt_builder import PROMPT_PREFIX, PromptBuilder, get_token_counter
+        builder = PromptBuilder(budget=300)
+        conversation = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " + "word " * 40}
+                        for i in range(10)]
+        conversation.append({"role": "user", "content": "what now?"})
+        prompt, stats = builder.build("Interests: hiking", ["old " * 200, "short one"], conversation, "what now?")
+        
+        assert prompt.startswith(PROMPT_PREFIX) and prompt.endswith("Current message: what now?\n\nResponse:")
+        assert stats["total"] <= 300 and get_token_counter().count(prompt) <= 310
+        assert "message 9" in prompt and "message 0" not in prompt and prompt.count("what now?") == 1
+        assert "short one" in prompt and "old old" not in prompt
+        
+        _, stats = builder.build("", [], [], "long " * 2000)
+        assert stats["total"] <= 300
+        
+        Config.OPENAI_API_KEY = api_key or "sk-test"
+        with tempfile.TemporaryDirectory() as data_dir:
+            agent = MirrorAgent(
+                llm=FakeListChatModel(responses=["sure"]),
+                memory_manager=MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir),
+                personality_analyzer=PersonalityAnalyzer(llm=FakeListChatModel(responses=["{}"]))
+            )
+            first = agent._get_personality_context()
+            assert agent._get_personality_context() is first
+            agent.memory_manager.update_personality_profile({"interests_and_topics": ["hiking"]})
+            assert "hiking" in agent._get_personality_context()
+            agent.generate_response("hi there")
+            assert agent.last_prompt_stats["total"] > 0 and "format_prompt" in agent.last_turn_timings
+        print(f"✅ Prompt builder working - {agent.last_prompt_stats['total']} prompt tokens")
+    except Exception as e:
+        print(f"❌ Prompt builder error: {e}")
+        raise
+    finally:
+        Config.OPENAI_API_KEY = api_key
+
+def test_personality_profile():
+    """Test profile revisions and per-revision memoized views"""
+    print("🧪 Testing personality profile...")
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            renders = []
+            render = lambda data: renders.append(1) or len(data)
+            profile = memory.get_profile()
+            assert not profile and profile.view("size", render) == 0 and profile.view("size", render) == 0
+            
+            memory.update_personality_profile({"interests_and_topics": ["hiking"]})
+            updated = memory.get_profile()
+            assert updated.revision == profile.revision + 1 and updated.view("size", render) == 2
+            assert len(renders) == 2 and profile.view("size", render) == 0
+            
+            memory.get_personality_traits()["interests_and_topics"] = ["chess"]
+            assert memory.get_profile() is updated and updated.get("interests_and_topics") == ["hiking"]
+            
+            reloaded = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir).get_profile()
+            assert reloaded.get("interests_and_topics") == ["hiking"]
+            
+            memory.clear_memory()
+            assert not memory.get_profile() and memory.get_profile().revision == updated.revision + 1
+        print(f"✅ Personality profile working - {len(renders)} renders across 3 revisions")
+    except Exception as e:
+        print(f"❌ Personality profile error: {e}")
+        raise
+
+def test_incremental_analysis():
+    """Test that later analyses send only new messages and blend into the profile"""
+    print("🧪 Testing incremental analysis...")
+    try:
+        import json
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        first = {"personality_traits": {"openness": 8}, "interests_and_topics": ["hiking", "chess"]}
+        second = {"personality_traits": {"openness": 2}, "interests_and_topics": ["Hiking", "cooking"]}
+        analyzer = PersonalityAnalyzer(llm=FakeListChatModel(responses=[json.dumps(first), json.dumps(second)]))
+        
+        with tempfile.TemporaryDirectory() as data_dir:
+            memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            for i in range(12):
+                memory.add_message("user", f"earlier message {i}")
+            analyzer.update_profile(memory)
+            assert analyzer.last_analysis_stats["mode"] == "full" and analyzer.last_analysis_stats["messages"] == 12
+            full_tokens = analyzer.last_analysis_stats["prompt_tokens"]
+            
+            for i in range(3):
+                memory.add_message("user", f"newer message {i}")
+            analyzer.update_profile(memory)
+            stats = analyzer.last_analysis_stats
+            assert stats["mode"] == "incremental" and stats["messages"] == 3
+            profile = memory.get_profile()
+            assert profile.get("personality_traits")["openness"] == 6.2
+            assert profile.get("interests_and_topics") == ["Hiking", "cooking", "chess"]
+            
+            analyzer.update_profile(memory)
+            assert memory.get_profile() is profile
+        print(f"✅ Incremental analysis working - {full_tokens} then {stats['prompt_tokens']} prompt tokens")
+    except Exception as e:
+        print(f"❌ Incremental analysis error: {e}")
+        raise
+
+def test_analysis_parsing():
+    """Test tolerant parsing of analysis replies, the repair retry and failure handling"""
+    print("🧪 Testing analysis parsing...")
+    try:
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        from utils.analysis_parser import AnalysisParseError, parse_analysis
+        reply = 'Here you go:\n```json\n{"personality_traits": {"openness": "8/10", "neuroticism": "1-10 scale",},' \
+                ' "communication_style": {"uses_emojis": "yes"}, "interests_and_topics": "hiking, chess"}\n```'
+        parsed = parse_analysis(reply)
+        assert parsed["personality_traits"] == {"openness": 8}
+        assert parsed["communication_style"] == {"uses_emojis": True}
+        assert parsed["interests_and_topics"] == ["hiking", "chess"]
+        # Curly quotes inside a valid value are kept; curly quotes used as JSON quotes are straightened
+        quoted = parse_analysis('{"communication_style": {"tone": "says “hey” a lot"}}')
+        assert quoted["communication_style"] == {"tone": "says “hey” a lot"}
+        assert parse_analysis('{“favorite_phrases”: [“no way”]}')["favorite_phrases"] == ["no way"]
+        for bad in ("I can't analyze that", '{"mood": "great"}'):
+            try:
+                parse_analysis(bad)
+                assert False, f"parsed {bad!r}"
+            except AnalysisParseError:
+                pass
+        
+        analyzer = PersonalityAnalyzer(llm=FakeListChatModel(responses=[
+            "Openness is about 7", '{"personality_traits": {"openness": 7}}',  # repaired
+            "no idea", "still no idea"                                          # failed
+        ]))
+        assert analyzer.analyze_messages(["hi"])["personality_traits"] == {"openness": 7}
+        assert analyzer.last_analysis_stats["repaired"]
+        
+        with tempfile.TemporaryDirectory() as data_dir:
+            memory = MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir)
+            memory.update_personality_profile({"personality_traits": {"openness": 9}})
+            memory.add_message("user", "hello")
+            analyzer.update_profile(memory)
+            assert memory.get_personality_traits()["personality_traits"] == {"openness": 9}
+        
+        stats = analyzer.get_stats()
+        assert stats["analyses"] == 2 and stats["repaired"] == 1 and stats["failed"] == 1
+        assert stats["success_rate"] == 0.5 and stats["wasted_tokens"] > 0 and stats["repair_tokens"] > 0
+        print(f"✅ Analysis parsing working - {stats['wasted_tokens']} tokens wasted by the failed analysis")
+    except Exception as e:
+        print(f"❌ Analysis parsing error: {e}")
+        raise
+
+def test_response_cache():
+    """Test response cache keys, expiry, eviction, near-duplicate matching and agent hits"""
+    print("🧪 Testing response cache...")
+    from config import Config
+    saved = (Config.OPENAI_API_KEY, Config.RESPONSE_CACHE, Config.RESPONSE_CACHE_CONTEXT_MESSAGES)
+    try:
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        from utils.response_cache import ResponseCache
+        now = [0.0]
+        cache = ResponseCache(max_entries=2, ttl=60, similarity_threshold=0.9, clock=lambda: now[0])
+        context = ["Made it home!"]
+        key, scope = cache.make_key("Thanks!", 3, context)
+        assert cache.make_key("thanks", 3, ["made it home"]) == (key, scope)
+        assert cache.make_key("  thanks ", 3, context) == (key, scope)
+        assert cache.make_key("thanks", 4, context)[0] != key and cache.make_key("thanks", 3, [])[0] != key
+        
+        cache.put(key, scope, "anytime!", vector=[1.0, 0.0], cost=1.5)
+        assert cache.get(key, scope) == "anytime!"
+        other_key, _ = cache.make_key("thank you", 3, context)
+        assert cache.get(other_key, scope, vector=[0.99, 0.1]) == "anytime!"
+        assert cache.get(other_key, scope, vector=[0.0, 1.0]) is None
+        
+        now[0] = 61
+        assert cache.get(key, scope) is None
+        for text in ("a", "b", "c"):
+            cache.put(*cache.make_key(text, 3, []), text)
+        assert cache.get(*cache.make_key("a", 3, [])) is None and cache.get(*cache.make_key("c", 3, [])) == "c"
+        stats = cache.get_stats()
+        assert stats["hits"] == 3 and stats["semantic_hits"] == 1 and stats["expired"] == 1
+        assert stats["evictions"] == 1 and stats["saved_seconds"] == 3.0
+        
+        Config.OPENAI_API_KEY = saved[0] or "sk-test"
+        Config.RESPONSE_CACHE, Config.RESPONSE_CACHE_CONTEXT_MESSAGES = True, 0
+        with tempfile.TemporaryDirectory() as data_dir:
+            agent = MirrorAgent(
+                llm=FakeListChatModel(responses=["hey you", "something new"]),
+                memory_manager=MemoryManager(embeddings=DeterministicFakeEmbedding(size=32), data_dir=data_dir),
+                personality_analyzer=PersonalityAnalyzer(llm=FakeListChatModel(responses=["{}"]))
+            )
+            assert agent.generate_response("hi") == "hey you"
+            assert agent.generate_response("Hi!") == "hey you"
+            assert "llm" not in agent.last_turn_timings
+            assert agent.memory_manager.get_conversation_context(limit=10)[-2]["content"] == "Hi!"
+            agent.memory_manager.update_personality_profile({"interests_and_topics": ["hiking"]})
+            assert agent.generate_response("hi") == "something new"
+            stats = agent.get_response_cache_stats()
+            assert stats["hits"] == 1 and stats["misses"] == 2
+        print(f"✅ Response cache working - hit rate {stats['hit_rate']:.0%} in the agent")
+    except Exception as e:
+        print(f"❌ Response cache error: {e}")
+        raise
+    finally:
+        Config.OPENAI_API_KEY, Config.RESPONSE_CACHE, Config.RESPONSE_CACHE_CONTEXT_MESSAGES = saved
+
+def test_openai_clients():
+    """Test the shared OpenAI clients' retries and circuit breaker against a local stub server"""
+    print("🧪 Testing OpenAI clients...")
+    from config import Config
+    names = ("OPENAI_API_KEY", "OPENAI_BASE_URL", "OPENAI_BACKOFF_BASE", "OPENAI_BACKOFF_MAX",
+             "CIRCUIT_BREAKER_FAILURES", "CIRCUIT_BREAKER_RESET")
+    saved = {name: getattr(Config, name) for name in names}
+    from utils.clients import get_chat_model, get_client_stats, reset_clients
+    try:
+        import time
+        from benchmarks.stub_openai import StubOpenAIServer
+        with StubOpenAIServer() as server:
+            Config.OPENAI_API_KEY, Config.OPENAI_BASE_URL = "sk-test", server.url
+            Config.OPENAI_BACKOFF_BASE, Config.OPENAI_BACKOFF_MAX = 0.001, 0.01
+            Config.CIRCUIT_BREAKER_FAILURES, Config.CIRCUIT_BREAKER_RESET = 3, 0.2
+            reset_clients()
+            llm = get_chat_model()
+            
+            server.fail_next = 2
+            assert llm.invoke("hi").content == "stub reply"
+            assert get_client_stats()["retries"] == 2
+            for _ in range(3):
+                llm.invoke("hi")
+            assert server.connections == 1
+            
+            server.error_rate = 1.0
+            for _ in range(2):
+                try:
+                    llm.invoke("hi")
+                    assert False, "call to a failing provider succeeded"
+                except Exception:
+                    pass
+            stats = get_client_stats()
+            assert stats["breaker"]["state"] == "open" and stats["breaker"]["rejected"] == 1
+            assert server.requests == 9
+            
+            time.sleep(0.25)
+            server.error_rate = 0.0
+            assert llm.invoke("hi").content == "stub reply"
+            assert get_client_stats()["breaker"]["state"] == "closed"
+        
+        # A half-open trial ending in any transport error, or in none, must not block the provider for good
+        import httpx
+        from utils.rate_limiter import RateLimiter, RateLimitTimeout
+        from utils.resilience import CircuitBreaker, ResilientTransport, RetryPolicy
+        outcomes = [httpx.ConnectError("down"), httpx.RemoteProtocolError("dropped")]
+        
+        def respond(request):
+            if outcomes:
+                raise outcomes.pop(0)
+            return httpx.Response(200)
+        
+        breaker = CircuitBreaker(1, 0.05)
+        starved = RateLimiter(requests_per_minute=1, max_wait=0)
+        starved.acquire(1)
+        transport = ResilientTransport(httpx.MockTransport(respond), RetryPolicy(0, 0, 0), breaker)
+        for expected in (httpx.ConnectError, httpx.RemoteProtocolError, RateLimitTimeout):
+            transport.limiter = starved if expected is RateLimitTimeout else None
+            time.sleep(0.06)
+            try:
+                transport.handle_request(httpx.Request("POST", "http://stub/v1/chat/completions"))
+                assert False, "failed call succeeded"
+            except expected:
+                pass
+            assert breaker.state == "open"
+        transport.limiter = None
+        assert transport.handle_request(httpx.Request("POST", "http://stub/v1/chat/completions")).status_code == 200
+        assert breaker.state == "closed"
+        assert breaker.allow() and breaker.state == "closed"
+        breaker.state, breaker._trial_at = "half-open", time.monotonic()
+        assert not breaker.allow()
+        time.sleep(0.06)
+        assert breaker.allow(), "abandoned trial kept the breaker half-open"
+        print(f"✅ OpenAI clients working - {stats['retries']} retries, breaker opened {stats['breaker']['opened']}x")
+    except Exception as e:
+        print(f"❌ OpenAI clients error: {e}")
+        raise
+    finally:
+        for name, value in saved.items():
+            setattr(Config, name, value)
+        reset_clients()
+
+def test_rate_limiter():
+    """Test the rate limiter's budgets and priority classes, and that shared clients send through it"""
+    print("🧪 Testing rate limiter...")
+    from config import Config
+    names = ("OPENAI_API_KEY", "OPENAI_BASE_URL", "RATE_LIMIT_RPM", "RATE_LIMIT_TPM")
+    saved = {name: getattr(Config, name) for name in names}
+    from utils.clients import get_chat_model, get_client_stats, reset_clients
+    try:
+        import httpx
+        from utils.personality_analyzer import PersonalityAnalyzer
+        from utils.rate_limiter import RateLimiter, RateLimitTimeout, request_class, request_priority
+        now = [0.0]
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600, reserves={"background": 0.5},
+                              max_wait=5, clock=lambda: now[0])
+        
+        # Background calls stop at the reserve, interactive calls may use it
+        limiter.acquire(200, "background")
+        try:
+            limiter.acquire(200, "background")
+            assert False, "background call dipped into the reserve"
+        except RateLimitTimeout:
+            pass
+        limiter.acquire(300, "interactive")
+        now[0] += 30  # Half a minute refills half of each budget
+        assert limiter.get_stats()["budget_left"] == [60, 400]
+        
+        # Lower classes hold back while a more urgent call is waiting
+        limiter._waiting["interactive"] += 1
+        assert limiter._try_acquire(1, "embedding", now[0]) > 0
+        limiter._waiting["interactive"] -= 1
+        assert limiter._try_acquire(1, "embedding", now[0]) == 0
+        assert limiter.get_stats()["granted"] == {"interactive": 1, "embedding": 1, "background": 1}
+        
+        request = httpx.Request("POST", "http://stub/v1/embeddings", json={"input": ["hello"]})
+        assert request_class(request) == "embedding"
+        with request_priority("background"):
+            assert request_class(request) == "background"
+        
+        from benchmarks.stub_openai import StubOpenAIServer
+        with StubOpenAIServer() as server:
+            Config.OPENAI_API_KEY, Config.OPENAI_BASE_URL = "sk-test", server.url
+            Config.RATE_LIMIT_RPM, Config.RATE_LIMIT_TPM = 600, 100000
+            reset_clients()
+            llm = get_chat_model()
+            llm.invoke("hi")
+            PersonalityAnalyzer(llm)._invoke("hi")
+            stats = get_client_stats()["rate_limiter"]
+            assert stats["granted"] == {"interactive": 1, "embedding": 0, "background": 1}
+        print(f"✅ Rate limiter working - {stats['granted']['interactive']} interactive and "
+              f"{stats['granted']['background']} background calls scheduled")
+    except Exception as e:
+        print(f"❌ Rate limiter error: {e}")
+        raise
+    finally:
+        for name, value in saved.items():
+            setattr(Config, name, value)
+        reset_clients()
+
+def test_shared_agents():
+    """Test that sessions of a user share one pooled agent and clients"""
+    print("🧪 Testing shared agents...")
+    from config import Config
+    from utils import memory_registry
+    api_key, registry = Config.OPENAI_API_KEY, memory_registry._registry
+    try:
+        from utils.memory_registry import MemoryRegistry
+        from utils.mirror_agent import get_mirror_agent
+        Config.OPENAI_API_KEY = api_key or "sk-test"
+        with tempfile.TemporaryDirectory() as data_dir:
+            memory_registry._registry = MemoryRegistry(data_dir=data_dir, embeddings=DeterministicFakeEmbedding(size=32))
+            first_tab = get_mirror_agent("alice")
+            assert get_mirror_agent("alice") is first_tab
+            other_user = get_mirror_agent("bob")
+            assert other_user is not first_tab and other_user.memory_manager is not first_tab.memory_manager
+            assert other_user.llm is first_tab.llm
+            assert other_user.personality_analyzer.llm is first_tab.personality_analyzer.llm
+        print("✅ Shared agents working - one agent per user, one client per process")
+    except Exception as e:
+        print(f"❌ Shared agents error: {e}")
+        raise
+    finally:
+        Config.OPENAI_API_KEY, memory_registry._registry = api_key, registry
+
 def main():
     """Run all tests"""
     print("🪞 MirrorMe Component Tests")
@@ -84,14 +994,43 @@ def main():
         test_imports,
         test_config,
         test_memory_manager,
+        test_vector_index_persistence,
+        test_embedding_cache,
+        test_chat_log,
+        test_vector_index_trimming,
+        test_vector_index_tiers,
+        test_analysis_worker,
+        test_embedding_backends,
+        test_bulk_import,
+        test_streaming_history,
+        test_message_store,
+        test_hybrid_retrieval,
+        test_retrieval_filtering,
+        test_memory_registry,
+        test_message_statistics,
+        test_sentiment_scoring,
         test_personality_analyzer,
-        test_mirror_agent
+        test_mirror_agent,
+        test_async_response,
+        test_stream_response,
+        test_prompt_builder,
+        test_personality_profile,
+        test_incremental_analysis,
+        test_analysis_parsing,
+        test_response_cache,
+        test_openai_clients,
+        test_rate_limiter,
+        test_shared_agents
     ]
     
     passed = 0
     for test in tests:
-        if test():
-            passed += 1
+        # Newer tests raise on failure so pytest reports them; the older ones return False
+        try:
+            if test() is not False:
+                passed += 1
+        except Exception:
+            pass
         print()
     
     print("=" * 40)
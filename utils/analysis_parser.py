@@ -0,0 +1,137 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Union
+from pydantic import BaseModel, BeforeValidator, ConfigDict, ValidationError
+from typing_extensions import Annotated
+
+FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+RANGE = re.compile(r"^\s*\d+(\.\d+)?\s*-\s*\d+")
+NUMBER = re.compile(r"-?\d+(\.\d+)?")
+SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+class AnalysisParseError(ValueError):
+    """The model's reply held no usable personality analysis"""
+
+def _number(value: Any, low: float, high: float) -> Optional[Union[int, float]]:
+    """A number from a number or the first one in text, clamped to [low, high], None if there is none"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, str):
+        match = NUMBER.search(value)
+        if not match:
+            return None
+        value = float(match.group())
+    if not isinstance(value, (int, float)):
+        return None
+    value = min(high, max(low, value))
+    return int(value) if float(value).is_integer() else value
+
+def to_score(value: Any) -> Optional[Union[int, float]]:
+    """A 1-10 score from a number or text like "7", "7/10" or "about 7", None if there is none"""
+    # A range such as "1-10 scale" is the template echoed back, not a score
+    if isinstance(value, str) and RANGE.match(value):
+        return None
+    return _number(value, 1, 10)
+
+def to_flag(value: Any) -> Optional[bool]:
+    """A yes/no answer, None if it is neither"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return {"true": True, "yes": True, "false": False, "no": False}.get(value.strip().lower())
+    return None
+
+def to_text_list(value: Any) -> Optional[List[str]]:
+    """A list of non-empty strings from a list or a comma-separated string"""
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list):
+        return None
+    return [str(item).strip() for item in value if str(item).strip()]
+
+def to_text(value: Any) -> Optional[str]:
+    """A label such as a tone, None unless it is a non-empty string"""
+    return value.strip() if isinstance(value, str) and value.strip() else None
+
+def to_count(value: Any) -> Optional[Union[int, float]]:
+    """A non-negative quantity such as a word count, None if there is none"""
+    return _number(value, 0, float("inf"))
+
+def to_section(value: Any) -> Optional[Dict[str, Any]]:
+    """A nested section, None if the model answered it with something other than an object"""
+    return value if isinstance(value, dict) else None
+
+Score = Annotated[Optional[Union[int, float]], BeforeValidator(to_score)]
+Count = Annotated[Optional[Union[int, float]], BeforeValidator(to_count)]
+Flag = Annotated[Optional[bool], BeforeValidator(to_flag)]
+Label = Annotated[Optional[str], BeforeValidator(to_text)]
+TextList = Annotated[Optional[List[str]], BeforeValidator(to_text_list)]
+
+class _Section(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+class CommunicationStyle(_Section):
+    tone: Label = None
+    formality_level: Score = None
+    enthusiasm_level: Score = None
+    typical_sentence_length: Label = None
+    uses_emojis: Flag = None
+    uses_slang: Flag = None
+
+class PersonalityTraits(_Section):
+    openness: Score = None
+    conscientiousness: Score = None
+    extraversion: Score = None
+    agreeableness: Score = None
+    neuroticism: Score = None
+
+class EmotionalPatterns(_Section):
+    default_mood: Label = None
+    emotional_range: Score = None
+    stress_indicators: TextList = None
+
+class LinguisticPatterns(_Section):
+    avg_words_per_message: Count = None
+    complexity_level: Score = None
+    question_frequency: Score = None
+
+class PersonalityAnalysis(_Section):
+    """The analysis the model is asked for; every field is optional so partial answers still count"""
+    communication_style: Annotated[Optional[CommunicationStyle], BeforeValidator(to_section)] = None
+    personality_traits: Annotated[Optional[PersonalityTraits], BeforeValidator(to_section)] = None
+    interests_and_topics: TextList = None
+    favorite_phrases: TextList = None
+    emotional_patterns: Annotated[Optional[EmotionalPatterns], BeforeValidator(to_section)] = None
+    linguistic_patterns: Annotated[Optional[LinguisticPatterns], BeforeValidator(to_section)] = None
+
+def extract_json_object(text: str) -> Dict[str, Any]:
+    """The first JSON object in text, tolerating code fences, prose around it, trailing commas and curly quotes"""
+    text = FENCE.sub("", text)
+    # Curly quotes are only straightened when the text fails to parse as is, since valid values may contain them
+    straightened = text.translate(SMART_QUOTES)
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        for variant in (text[start:], straightened[start:]):
+            for candidate in (variant, TRAILING_COMMA.sub(r"\1", variant)):
+                try:
+                    value, _ = decoder.raw_decode(candidate)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(value, dict):
+                    return value
+        start = text.find("{", start + 1)
+    raise AnalysisParseError("no JSON object found")
+
+def parse_analysis(text: str) -> Dict[str, Any]:
+    """Parse and validate a personality analysis reply, dropping fields that hold no usable value"""
+    try:
+        analysis = PersonalityAnalysis.model_validate(extract_json_object(text))
+    except ValidationError as e:
+        raise AnalysisParseError(f"unexpected structure: {e.error_count()} invalid fields") from e
+
+    data = {key: value for key, value in analysis.model_dump(exclude_none=True).items() if value not in ({}, [])}
+    if not data:
+        raise AnalysisParseError("no personality fields found")
+    return data
@@ -0,0 +1,81 @@
+import threading
+import time
+from typing import Dict, Any, Optional
+
+class PersonalityAnalysisWorker:
+    """Runs personality analysis on a background thread, off the chat hot path"""
+
+    def __init__(self, personality_analyzer, memory_manager):
+        self.personality_analyzer = personality_analyzer
+        self.memory_manager = memory_manager
+
+        self.state = "idle"  # idle, pending or running
+        self.completed = 0
+        self.coalesced = 0
+        self.last_error: Optional[str] = None
+        self.last_duration = 0.0
+
+        self._rerun = False
+        self._condition = threading.Condition()
+        self._worker_alive = False
+
+    def submit(self):
+        """Request an analysis, coalescing with one that has not finished yet"""
+        with self._condition:
+            if self.state == "pending" or (self.state == "running" and self._rerun):
+                self.coalesced += 1
+                return
+
+            if self.state == "running":
+                # The running job read its messages already; run once more afterwards
+                self._rerun = True
+            else:
+                self.state = "pending"
+
+            if not self._worker_alive:
+                self._worker_alive = True
+                threading.Thread(target=self._run, name="personality-analysis", daemon=True).start()
+
+    def is_pending(self) -> bool:
+        """Whether an analysis is queued or running"""
+        return self.state != "idle"
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until no analysis is queued or running"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.state == "idle", timeout)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return job state and counters"""
+        return {
+            "state": self.state,
+            "completed": self.completed,
+            "coalesced": self.coalesced,
+            "last_error": self.last_error,
+            "last_duration": self.last_duration
+        }
+
+    def _run(self):
+        """Worker loop: analyze the latest messages until no request is left"""
+        while True:
+            with self._condition:
+                if self.state == "idle":
+                    self._worker_alive = False
+                    return
+                self.state = "running"
+
+            start = time.perf_counter()
+            try:
+                # Messages are read when the job runs so coalesced requests see the newest ones
+                self.personality_analyzer.update_profile(self.memory_manager)
+                self.last_error = None
+            except Exception as e:
+                print(f"Error in background personality analysis: {e}")
+                self.last_error = str(e)
+
+            with self._condition:
+                self.last_duration = time.perf_counter() - start
+                self.completed += 1
+                self.state = "pending" if self._rerun else "idle"
+                self._rerun = False
+                self._condition.notify_all()
@@ -0,0 +1,23 @@
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Start the shared background event loop on first use"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="mirrorme-async", daemon=True).start()
+        return _loop
+
+def run_sync(coro: Coroutine) -> Any:
+    """Run a coroutine to completion from synchronous code.
+
+    Coroutines always run on one long-lived loop because async OpenAI clients
+    keep connections bound to the loop that opened them.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
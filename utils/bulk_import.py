@@ -0,0 +1,85 @@
+import csv
+import json
+import os
+from typing import Dict, Iterator, Any, Optional
+from utils.json_stream import JsonStreamReader
+
+CONTENT_FIELDS = ("content", "text", "message", "body")
+
+def read_messages(path: str, file_format: Optional[str] = None, default_role: str = "user") -> Iterator[Dict[str, Any]]:
+    """Stream chat messages from a JSON, JSONL or CSV export"""
+    file_format = file_format or os.path.splitext(path)[1].lstrip(".").lower()
+
+    if file_format in ("jsonl", "ndjson"):
+        records = _read_jsonl(path)
+    elif file_format == "json":
+        records = _read_json(path)
+    elif file_format == "csv":
+        records = _read_csv(path)
+    else:
+        raise ValueError(f"Unsupported import format: {file_format}")
+
+    for record in records:
+        message = _to_message(record, default_role)
+        if message:
+            yield message
+
+def _to_message(record: Dict[str, Any], default_role: str) -> Optional[Dict[str, Any]]:
+    """Normalize an exported record into the chat history message shape"""
+    content = next((record[field] for field in CONTENT_FIELDS if record.get(field)), None)
+    if not content or not str(content).strip():
+        return None
+
+    role = str(record.get("role") or default_role).lower()
+    metadata = record.get("metadata")
+    message = {
+        "role": "assistant" if role in ("assistant", "ai", "bot") else "user",
+        "content": str(content).strip(),
+        "metadata": metadata if isinstance(metadata, dict) else {}
+    }
+    if record.get("timestamp"):
+        message["timestamp"] = str(record["timestamp"])
+    return message
+
+def _require_object(record: Any, where: str) -> Dict[str, Any]:
+    """A record that must be a JSON object, or a ValueError naming where it was found"""
+    if not isinstance(record, dict):
+        raise ValueError(f"{where}: expected a message object, got {type(record).__name__}")
+    return record
+
+def _read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Line {number}: {e}") from e
+                yield _require_object(record, f"Line {number}")
+
+def _read_csv(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        yield from csv.DictReader(f)
+
+def _read_json(path: str) -> Iterator[Dict[str, Any]]:
+    """Read a JSON array, or a MirrorMe export object, one message at a time"""
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = JsonStreamReader(f)
+
+        if reader.peek() == "{":
+            # Exports wrap the history in an object next to the profile
+            for key in reader.iter_object():
+                if key in ("chat_history", "messages"):
+                    yield from _objects(reader.iter_array())
+                else:
+                    reader.read_value()
+            return
+
+        if reader.peek() != "[":
+            raise ValueError("Expected a JSON array of messages")
+        yield from _objects(reader.iter_array())
+
+def _objects(records: Iterator[Any]) -> Iterator[Dict[str, Any]]:
+    """Items of a JSON array, numbered from 1 in any error"""
+    for number, record in enumerate(records, 1):
+        yield _require_object(record, f"Message {number}")
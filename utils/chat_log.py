@@ -0,0 +1,149 @@
+import json
+import os
+from collections import deque
+from typing import Dict, Iterator, List, Any, Optional
+from utils.json_stream import JsonStreamReader
+
+class ChatLog:
+    """Append-only JSONL log of chat messages with periodic snapshot compaction"""
+
+    def __init__(self, snapshot_file: str, log_file: str, fsync_every: int = 8, compact_every: int = 500):
+        self.snapshot_file = snapshot_file
+        self.log_file = log_file
+        self.fsync_every = fsync_every
+        self.compact_every = compact_every
+
+        self.last_seq = 0
+        self.log_records = 0
+        self._unsynced = 0
+        self._handle = None
+
+    def load(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Load the snapshot and replay the log tail written after it, keeping only the last limit messages"""
+        messages, snapshot_seq = self._load_snapshot(limit)
+        self.last_seq = snapshot_seq
+        self.log_records = 0
+
+        if os.path.exists(self.log_file):
+            valid_bytes = 0
+            with open(self.log_file, 'rb') as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("missing newline")
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    valid_bytes += len(line)
+                    self.log_records += 1
+                    if record['seq'] > snapshot_seq:
+                        messages.append(record['message'])
+                        self.last_seq = record['seq']
+
+            # Cut off a torn final record from a crash mid-append so new
+            # records are not written onto the end of it
+            if valid_bytes < os.path.getsize(self.log_file):
+                print("Discarding incomplete chat log record")
+                with open(self.log_file, 'r+b') as f:
+                    f.truncate(valid_bytes)
+
+        return list(messages)
+
+    def append(self, message: Dict[str, Any]):
+        """Append a message to the log, assigning its sequence number as the message ID"""
+        if self._handle is None:
+            os.makedirs(os.path.dirname(self.log_file) or ".", exist_ok=True)
+            self._handle = open(self.log_file, 'a')
+
+        self.last_seq += 1
+        message['id'] = self.last_seq
+        self._handle.write(json.dumps({"seq": self.last_seq, "message": message}) + "\n")
+        self._handle.flush()
+        self.log_records += 1
+        self._unsynced += 1
+
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def assign_ids(self, messages: List[Dict[str, Any]]):
+        """Give messages sequence IDs without logging them, for writes that end in a compaction"""
+        for message in messages:
+            self.last_seq += 1
+            message['id'] = self.last_seq
+
+    def sync(self):
+        """Force appended records to disk"""
+        if self._handle is not None and self._unsynced:
+            os.fsync(self._handle.fileno())
+            self._unsynced = 0
+
+    def needs_compaction(self) -> bool:
+        """Whether the log has grown enough to fold into the snapshot"""
+        return self.log_records >= self.compact_every
+
+    def compact(self, messages: List[Dict[str, Any]]):
+        """Write messages as the new snapshot and start an empty log"""
+        os.makedirs(os.path.dirname(self.snapshot_file) or ".", exist_ok=True)
+        tmp_path = self.snapshot_file + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"last_seq": self.last_seq, "messages": messages}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_file)
+
+        # Records up to last_seq are now in the snapshot and skipped on replay,
+        # so a crash before the log is truncated cannot duplicate messages
+        self.close()
+        with open(self.log_file, 'w'):
+            pass
+        self.log_records = 0
+
+    def close(self):
+        """Sync and close the log file"""
+        if self._handle is not None:
+            self.sync()
+            self._handle.close()
+            self._handle = None
+
+    def _load_snapshot(self, limit: Optional[int] = None):
+        """Load the tail of the snapshot, accepting the legacy plain-list format"""
+        messages = deque(maxlen=limit)
+        last_seq = 0
+        try:
+            for item in self._read_snapshot():
+                if isinstance(item, dict):
+                    messages.append(item)
+                else:
+                    last_seq = item
+        except Exception as e:
+            print(f"Error loading chat history snapshot: {e}")
+            return deque(maxlen=limit), 0
+        return messages, last_seq
+
+    def _read_snapshot(self) -> Iterator[Any]:
+        """Yield snapshot messages in order, then its last sequence number"""
+        if not os.path.exists(self.snapshot_file):
+            yield 0
+            return
+
+        with open(self.snapshot_file, 'r') as f:
+            reader = JsonStreamReader(f)
+
+            if reader.peek() == "[":
+                # Legacy snapshots are a plain list whose positions are the IDs
+                count = 0
+                for count, message in enumerate(reader.iter_array(), 1):
+                    message.setdefault('id', count)
+                    yield message
+                yield count
+                return
+
+            last_seq = 0
+            for key in reader.iter_object():
+                if key == "messages":
+                    yield from reader.iter_array()
+                elif key == "last_seq":
+                    last_seq = reader.read_value()
+                else:
+                    reader.read_value()
+            yield last_seq
@@ -0,0 +1,108 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+import httpx
+from langchain_openai import ChatOpenAI
+from config import Config
+from utils.rate_limiter import RateLimiter
+from utils.resilience import AsyncResilientTransport, CircuitBreaker, ResilientTransport, RetryPolicy
+
+_chat_models: Dict[Tuple[float, Optional[int]], ChatOpenAI] = {}
+_embedding_model = None
+_http: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+def _timeout() -> httpx.Timeout:
+    """Per-call timeout, with a shorter limit on opening connections"""
+    return httpx.Timeout(Config.OPENAI_TIMEOUT, connect=Config.OPENAI_CONNECT_TIMEOUT)
+
+def _rate_limiter() -> Optional[RateLimiter]:
+    """Scheduler holding calls to the configured per-minute limits, None when no limit is set"""
+    if Config.RATE_LIMIT_RPM <= 0 and Config.RATE_LIMIT_TPM <= 0:
+        return None
+    reserves = {"embedding": Config.RATE_LIMIT_EMBEDDING_RESERVE, "background": Config.RATE_LIMIT_BACKGROUND_RESERVE}
+    return RateLimiter(Config.RATE_LIMIT_RPM, Config.RATE_LIMIT_TPM, reserves, Config.RATE_LIMIT_MAX_WAIT)
+
+def _http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """The process-wide keep-alive HTTP clients every OpenAI client sends through; call with _lock held"""
+    if not _http:
+        limits = httpx.Limits(max_connections=Config.OPENAI_MAX_CONNECTIONS,
+                              max_keepalive_connections=Config.OPENAI_MAX_KEEPALIVE)
+        policy = RetryPolicy(Config.OPENAI_MAX_RETRIES, Config.OPENAI_BACKOFF_BASE, Config.OPENAI_BACKOFF_MAX)
+        # Sync and async calls reach the same provider, so they share one view of its health
+        breaker = CircuitBreaker(Config.CIRCUIT_BREAKER_FAILURES, Config.CIRCUIT_BREAKER_RESET)
+        # They also draw on one budget of requests and tokens per minute
+        limiter = _rate_limiter()
+        _http["transport"] = ResilientTransport(httpx.HTTPTransport(limits=limits), policy, breaker, limiter)
+        _http["async_transport"] = AsyncResilientTransport(httpx.AsyncHTTPTransport(limits=limits), policy, breaker,
+                                                           limiter)
+        _http["client"] = httpx.Client(transport=_http["transport"], timeout=_timeout())
+        _http["async_client"] = httpx.AsyncClient(transport=_http["async_transport"], timeout=_timeout())
+    return _http["client"], _http["async_client"]
+
+def _client_options() -> Dict[str, Any]:
+    """Connection settings shared by the chat and embedding clients"""
+    client, async_client = _http_clients()
+    return {
+        "openai_api_key": Config.OPENAI_API_KEY,
+        "openai_api_base": Config.OPENAI_BASE_URL,
+        "http_client": client,
+        "http_async_client": async_client,
+        "request_timeout": _timeout(),
+        # Retries happen in the shared transport, where the circuit breaker sees them
+        "max_retries": 0
+    }
+
+def get_chat_model(temperature: float = Config.TEMPERATURE, max_tokens: Optional[int] = None) -> ChatOpenAI:
+    """Get the process-wide chat client for a temperature and token limit.
+
+    Clients are thread-safe and send through one shared connection pool,
+    with timeouts, retries and a circuit breaker, so every session shares
+    them instead of opening its own.
+    """
+    key = (temperature, max_tokens)
+    with _lock:
+        if key not in _chat_models:
+            _chat_models[key] = ChatOpenAI(
+                model_name=Config.MODEL_NAME,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **_client_options()
+            )
+        return _chat_models[key]
+
+def get_embedding_model():
+    """Get the process-wide OpenAI embeddings client, sharing the chat clients' connection pool"""
+    global _embedding_model
+    from langchain_openai import OpenAIEmbeddings
+    with _lock:
+        if _embedding_model is None:
+            _embedding_model = OpenAIEmbeddings(**_client_options())
+        return _embedding_model
+
+def get_client_stats() -> Dict[str, Any]:
+    """Return request, retry, circuit breaker and rate limiter counters of the shared transports"""
+    with _lock:
+        if not _http:
+            return {}
+        sync_stats, async_stats = _http["transport"].get_stats(), _http["async_transport"].get_stats()
+        limiter = _http["transport"].limiter
+    stats = {
+        "requests": sync_stats["requests"] + async_stats["requests"],
+        "retries": sync_stats["retries"] + async_stats["retries"],
+        "failures": sync_stats["failures"] + async_stats["failures"],
+        "breaker": sync_stats["breaker"]
+    }
+    if limiter:
+        stats["rate_limiter"] = limiter.get_stats()
+    return stats
+
+def reset_clients():
+    """Drop the shared clients so the next ones pick up changed settings"""
+    global _embedding_model
+    with _lock:
+        _chat_models.clear()
+        _embedding_model = None
+        if _http:
+            _http["client"].close()
+        # The async client belongs to whichever event loop used it last, so it is left to be collected
+        _http.clear()
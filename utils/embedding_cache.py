@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from utils.embeddings import embed_array
+
+class CachedEmbeddings(Embeddings):
+    """Content-addressed embedding cache with an in-memory LRU tier over SQLite"""
+
+    def __init__(self, embeddings: Embeddings, cache_file: Optional[str] = None, max_memory_items: int = 5000):
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, 'model', None) or type(embeddings).__name__
+        self.max_memory_items = max_memory_items
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if cache_file:
+            os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+            try:
+                self._db = sqlite3.connect(cache_file, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+                self._db.commit()
+            except Exception as e:
+                print(f"Error opening embedding cache: {e}")
+                self._db = None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, calling the wrapped model only for uncached texts"""
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        """Embed documents into a float32 matrix, calling the wrapped model only for uncached texts"""
+        keys, vectors, missing = self._partition(texts)
+        if missing:
+            embedded = embed_array(self.embeddings, list(missing.values()))
+            vectors.update(self._store(list(missing), embedded))
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async version of embed_documents"""
+        # SQLite reads and writes run off the event loop, which every session's turn shares
+        keys, vectors, missing = await asyncio.to_thread(self._partition, texts)
+        if missing:
+            embedded = await self.embeddings.aembed_documents(list(missing.values()))
+            vectors.update(await asyncio.to_thread(self._store, list(missing), embedded))
+        return [vectors[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, reusing the vector of an identical indexed message"""
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async version of embed_query"""
+        return (await self.aembed_documents([text]))[0]
+
+    def get_stats(self) -> Dict[str, float]:
+        """Return hit/miss counters"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self._memory)
+        }
+
+    def _key(self, text: str) -> str:
+        """Hash of the normalized text and model name"""
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        return hashlib.sha256(f"{self.model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _partition(self, texts: List[str]):
+        """Split texts into cached vectors and uncached texts keyed by hash"""
+        keys = [self._key(text) for text in texts]
+        vectors = self._lookup(keys)
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        return keys, vectors, missing
+
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Find cached vectors in memory first, then on disk"""
+        found = {}
+        with self._lock:
+            disk_keys = []
+            for key in keys:
+                if key in found:
+                    continue
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.hits += 1
+                else:
+                    disk_keys.append(key)
+
+            if disk_keys and self._db is not None:
+                unique_keys = list(dict.fromkeys(disk_keys))
+                try:
+                    for start in range(0, len(unique_keys), 500):
+                        chunk = unique_keys[start:start + 500]
+                        rows = self._db.execute(
+                            f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                            chunk
+                        ).fetchall()
+                        for key, blob in rows:
+                            found[key] = np.frombuffer(blob, dtype=np.float32)
+                            self._remember(key, found[key])
+                            self.disk_hits += 1
+                except Exception as e:
+                    print(f"Error reading embedding cache: {e}")
+
+            self.misses += len({key for key in disk_keys if key not in found})
+        return found
+
+    def _store(self, keys: List[str], embedded) -> Dict[str, np.ndarray]:
+        """Add vectors to both cache tiers"""
+        vectors = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(keys, embedded)}
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+
+            if self._db is not None:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        [(key, vector.tobytes()) for key, vector in vectors.items()]
+                    )
+                    self._db.commit()
+                except Exception as e:
+                    print(f"Error writing embedding cache: {e}")
+        return vectors
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert into the LRU tier, evicting the least recently used vector"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
@@ -0,0 +1,102 @@
+import hashlib
+import re
+import zlib
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config import Config
+
+class HashingEmbeddings(Embeddings):
+    """Local CPU embeddings from signed feature hashing of words and word pairs"""
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+        self.model = f"hashing-{dimensions}"
+        self._token_pattern = re.compile(r"\w+")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts"""
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query"""
+        return self.embed_documents_array([text])[0].tolist()
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts into an (n, dimensions) float32 matrix"""
+        rows, hashes = [], []
+        for row, text in enumerate(texts):
+            tokens = self._token_pattern.findall(text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            rows.extend([row] * len(features))
+            hashes.extend(zlib.crc32(feature.encode("utf-8")) for feature in features)
+
+        # One bincount over all (row, column) cells replaces per-text accumulation
+        hashes = np.asarray(hashes, dtype=np.int64)
+        columns = hashes % self.dimensions
+        signs = np.where((hashes >> 31) & 1, -1.0, 1.0)
+        cells = np.asarray(rows, dtype=np.int64) * self.dimensions + columns
+        counts = np.bincount(cells, weights=signs, minlength=len(texts) * self.dimensions)
+
+        matrix = counts.reshape(len(texts), self.dimensions).astype(np.float32)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        return _normalize(matrix)
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic embeddings derived from a hash of the text, for tests"""
+
+    def __init__(self, dimensions: int = 64):
+        self.dimensions = dimensions
+        self.model = f"fake-{dimensions}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts"""
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query"""
+        return self.embed_documents_array([text])[0].tolist()
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts into an (n, dimensions) float32 matrix"""
+        if not texts:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+
+        digests = b"".join(hashlib.blake2b(text.encode("utf-8"), digest_size=32).digest() for text in texts)
+        matrix = np.frombuffer(digests, dtype=np.uint8).reshape(len(texts), 32).astype(np.float32)
+        repeats = -(-self.dimensions // 32)
+        matrix = np.tile(matrix - 127.5, repeats)[:, :self.dimensions]
+        return _normalize(matrix)
+
+def embed_array(embeddings: Embeddings, texts: List[str]) -> np.ndarray:
+    """Embed texts as a float32 matrix, using the backend's NumPy path when it has one"""
+    if hasattr(embeddings, "embed_documents_array"):
+        return embeddings.embed_documents_array(texts)
+    return np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+def get_embeddings(backend: Optional[str] = None) -> Embeddings:
+    """Create the embedding backend selected by Config.EMBEDDING_BACKEND"""
+    backend = backend or Config.EMBEDDING_BACKEND
+
+    if backend == "openai":
+        from utils.clients import get_embedding_model
+        return get_embedding_model()
+    if backend == "local":
+        return HashingEmbeddings(Config.EMBEDDING_DIMENSIONS)
+    if backend == "fake":
+        return FakeEmbeddings(Config.EMBEDDING_DIMENSIONS)
+
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+def similarity_threshold(backend: Optional[str] = None) -> float:
+    """Cosine similarity a vector-only match needs, from Config or the embedding backend's default"""
+    if Config.SIMILARITY_THRESHOLD is not None:
+        return Config.SIMILARITY_THRESHOLD
+    # Scores differ by backend: unrelated OpenAI vectors still score around 0.7, hashed ones near 0
+    return Config.SIMILARITY_THRESHOLDS.get(backend or Config.EMBEDDING_BACKEND, 0.7)
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length, leaving all-zero rows alone"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
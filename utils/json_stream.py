@@ -0,0 +1,89 @@
+import json
+import re
+from typing import Any, Iterator, TextIO
+
+CHUNK_SIZE = 1 << 16
+NUMBER_CHARS = frozenset("0123456789.eE+-")
+WHITESPACE = re.compile(r"\s*")
+
+class JsonStreamReader:
+    """Incremental reader for large JSON documents, one value at a time"""
+
+    def __init__(self, f: TextIO, chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self._decoder = json.JSONDecoder()
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or "" at end of file"""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char: str):
+        """Consume the next non-whitespace character, which must be char"""
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON stream")
+        self.pos += 1
+
+    def read_value(self) -> Any:
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                # The value spans the chunk boundary
+                if not self._fill():
+                    raise
+                continue
+            # A number cut at the chunk boundary may continue in the next chunk
+            cut = end == len(self.buffer) or (isinstance(value, (int, float)) and self.buffer[end] in NUMBER_CHARS)
+            if cut and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """Yield the items of the array at the current position"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.read_value()
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("]")
+                return
+
+    def iter_object(self) -> Iterator[str]:
+        """Yield the keys of the object at the current position.
+
+        After each key the caller must consume its value, with read_value,
+        iter_array or iter_object.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("}")
+                return
+
+    def _fill(self) -> bool:
+        """Read another chunk, dropping what has already been consumed"""
+        chunk = self.f.read(self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return bool(chunk)
@@ -0,0 +1,84 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+class BM25Index:
+    """Incrementally maintained BM25 inverted index over message IDs"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.doc_lengths: Dict[int, int] = {}
+        self.documents: Dict[int, str] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, doc_id: int, text: str):
+        """Index a message"""
+        if doc_id in self.documents:
+            self.remove([doc_id])
+        terms = Counter(tokenize(text))
+        for term, count in terms.items():
+            self.postings[term][doc_id] = count
+        length = sum(terms.values())
+        self.doc_lengths[doc_id] = length
+        self.documents[doc_id] = text
+        self.total_length += length
+
+    def remove(self, ids: Iterable[int]):
+        """Drop messages from the index"""
+        for doc_id in ids:
+            text = self.documents.pop(doc_id, None)
+            if text is None:
+                continue
+            for term in set(tokenize(text)):
+                postings = self.postings[term]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+            self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def clear(self):
+        """Drop every message"""
+        self.postings.clear()
+        self.doc_lengths.clear()
+        self.documents.clear()
+        self.total_length = 0
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[int, float]]:
+        """The k best-matching message IDs with their BM25 scores"""
+        if not self.documents:
+            return []
+
+        count = len(self.documents)
+        avg_length = self.total_length / count or 1.0
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        # Newer messages win ties, since IDs grow over time
+        return sorted(scores.items(), key=lambda item: (item[1], item[0]), reverse=True)[:k]
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 3, constant: int = 60) -> List[int]:
+    """Merge ranked ID lists, scoring each ID by the sum of 1 / (constant + rank)"""
+    scores: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1.0 / (constant + rank)
+    return sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)[:k]
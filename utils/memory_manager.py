@@ -1,58 +1,129 @@
+import asyncio
 import json
 import os
+import threading
+import time
+import unicodedata
+from collections import deque
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-import faiss
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple
 import numpy as np
-from langchain_openai import OpenAIEmbeddings
-from langchain_core.documents import Document
-from langchain_community.vectorstores import FAISS
 from config import Config
+from utils.chat_log import ChatLog
+from utils.embedding_cache import CachedEmbeddings
+from utils.embeddings import get_embeddings, similarity_threshold
+from utils.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+from utils.message_stats import MessageStatistics
+from utils.message_store import MessageStore
+from utils.personality_profile import PersonalityProfile
+from utils.sentiment import get_sentiment_scorer
+from utils.vector_index import MessageVectorIndex, VectorIndexStore, maximal_marginal_relevance
+
+# Messages read per hold of the lock while exporting
+EXPORT_BATCH_SIZE = 256
 
 class MemoryManager:
-    def __init__(self):
-        self.embeddings = OpenAIEmbeddings(openai_api_key=Config.OPENAI_API_KEY)
-        self.memory_file = "data/chat_history.json"
-        self.personality_file = "data/personality_profile.json"
+    def __init__(self, embeddings=None, data_dir: str = Config.DATA_DIR):
+        if isinstance(embeddings, CachedEmbeddings):
+            # A cache shared between tenants is used as is
+            self.embeddings = embeddings
+        else:
+            self.embeddings = CachedEmbeddings(
+                embeddings or get_embeddings(),
+                cache_file=os.path.join(data_dir, "embedding_cache.sqlite"),
+                max_memory_items=Config.EMBEDDING_CACHE_SIZE
+            )
+        self.memory_file = os.path.join(data_dir, "chat_history.json")
+        self.personality_file = os.path.join(data_dir, "personality_profile.json")
+        self.chat_log = ChatLog(
+            self.memory_file,
+            os.path.join(data_dir, "chat_history.log.jsonl"),
+            fsync_every=Config.CHAT_LOG_FSYNC_EVERY,
+            compact_every=Config.CHAT_LOG_COMPACT_EVERY
+        )
+        self.index_store = VectorIndexStore(os.path.join(data_dir, "vector_index"))
+        
+        # Sessions sharing this tenant call in from different Streamlit threads
+        self._lock = threading.RLock()
         
         # Initialize FAISS vector store
         self.vector_store = None
-        self.chat_history = []
-        self.personality_profile = {}
+        self.lexical_index = BM25Index()
+        self._unsaved_index_items = 0
+        self.chat_history = MessageStore(Config.MAX_MEMORY_ITEMS)
+        self.profile = PersonalityProfile({})
+        # Kept up to date as messages arrive so analysis never re-parses the window
+        self.sentiment_scorer = get_sentiment_scorer()
+        self.message_stats = MessageStatistics(window=Config.ANALYSIS_WINDOW, scorer=self.sentiment_scorer)
         
         self._load_memory()
         self._initialize_vector_store()
     
     def _load_memory(self):
         """Load chat history and personality profile from files"""
-        if os.path.exists(self.memory_file):
-            try:
-                with open(self.memory_file, 'r') as f:
-                    self.chat_history = json.load(f)
-            except:
-                self.chat_history = []
+        try:
+            # Only the tail that survives trimming is held in memory while loading
+            messages = self.chat_log.load(limit=Config.MAX_MEMORY_ITEMS)
+        except Exception as e:
+            print(f"Error loading memory: {e}")
+            messages = []
+        
+        window = [msg for msg in messages if msg['role'] == 'user'][-Config.ANALYSIS_WINDOW:]
+        self._score_sentiment(window)
+        for msg in window:
+            self.message_stats.add(msg['content'], msg['metadata']['sentiment'])
+        self.chat_history.extend(messages)
+        for msg in messages:
+            if msg['role'] == 'user':
+                self.lexical_index.add(msg['id'], msg['content'])
         
         if os.path.exists(self.personality_file):
             try:
                 with open(self.personality_file, 'r') as f:
-                    self.personality_profile = json.load(f)
+                    self.profile = PersonalityProfile(json.load(f), revision=1)
             except:
-                self.personality_profile = {}
+                self.profile = PersonalityProfile({})
     
     def _initialize_vector_store(self):
-        """Initialize FAISS vector store with existing messages"""
-        if self.chat_history:
-            user_messages = [msg for msg in self.chat_history if msg['role'] == 'user']
-            if user_messages:
-                documents = [Document(page_content=msg['content'], 
-                                   metadata={"timestamp": msg['timestamp']}) 
-                           for msg in user_messages]
-                self.vector_store = FAISS.from_documents(documents, self.embeddings)
+        """Load the saved FAISS index and embed only messages added since it was saved"""
+        user_messages = self.chat_history.user_messages()
+        self.vector_store = None
+        
+        manifest = self.index_store.load_manifest()
+        if manifest and manifest.get('embedding_model') == self._embedding_model_name():
+            self.vector_store = self.index_store.load(self.embeddings)
         
         if self.vector_store is None:
-            # Create empty vector store
-            dummy_doc = Document(page_content="initialization", metadata={})
-            self.vector_store = FAISS.from_documents([dummy_doc], self.embeddings)
+            self.vector_store = MessageVectorIndex(self.embeddings)
+        
+        # Reconcile with history: evict trimmed messages, embed new ones
+        live_ids = {msg['id'] for msg in user_messages}
+        stale_ids = [doc_id for doc_id in self.vector_store.documents if doc_id not in live_ids]
+        pending = [msg for msg in user_messages if msg['id'] not in self.vector_store.documents]
+        
+        self.vector_store.remove(stale_ids)
+        self.vector_store.add_messages(pending)
+        
+        if manifest is None or stale_ids or pending:
+            self._save_vector_store()
+    
+    def _embedding_model_name(self) -> str:
+        """Name of the embedding model, used to invalidate saved indexes"""
+        return getattr(self.embeddings, 'model', None) or type(self.embeddings).__name__
+    
+    def _save_vector_store(self):
+        """Save the FAISS index alongside the chat history"""
+        last_id = max(self.vector_store.documents, default=0)
+        last_doc = self.vector_store.documents.get(last_id)
+        manifest = {
+            "message_count": len(self.vector_store),
+            "last_id": last_id,
+            "last_timestamp": last_doc.metadata.get('timestamp') if last_doc else None,
+            "embedding_model": self._embedding_model_name(),
+            "saved_at": datetime.now().isoformat()
+        }
+        self.index_store.save(self.vector_store, manifest)
+        self._unsaved_index_items = 0
     
     def add_message(self, role: str, content: str, metadata: Optional[Dict] = None):
         """Add a message to memory"""
@@ -60,64 +131,265 @@ class MemoryManager:
             "role": role,
             "content": content,
             "timestamp": datetime.now().isoformat(),
-            "metadata": metadata or {}
+            "metadata": dict(metadata or {})
         }
         
-        self.chat_history.append(message)
-        
-        # Add to vector store if it's a user message
+        # Scored once here and stored, so analysis never scores the same message again
         if role == "user":
-            doc = Document(page_content=content, metadata={"timestamp": message["timestamp"]})
-            self.vector_store.add_documents([doc])
+            self._score_sentiment([message])
+        
+        with self._lock:
+            # Appending to the log assigns the message its stable ID
+            self.chat_log.append(message)
+            # The store drops its oldest message once full; trimmed messages leave the vector store too
+            evicted_ids = self.chat_history.append(message)
+        
+            # Add to vector store if it's a user message
+            if role == "user":
+                self.vector_store.add_messages([message])
+                self.lexical_index.add(message['id'], content)
+                self.message_stats.add(content, message['metadata']['sentiment'])
+                self._unsaved_index_items += 1
+        
+            self.vector_store.remove(evicted_ids)
+            self.lexical_index.remove(evicted_ids)
         
-        # Keep memory under limit
-        if len(self.chat_history) > Config.MAX_MEMORY_ITEMS:
-            self.chat_history = self.chat_history[-Config.MAX_MEMORY_ITEMS:]
+            if self.chat_log.needs_compaction():
+                self._save_memory()
         
-        self._save_memory()
+            # Messages added since the last save are re-embedded on the next startup
+            if self._unsaved_index_items >= Config.INDEX_SAVE_INTERVAL:
+                self._save_vector_store()
+    
+    def import_messages(self, messages: Iterable[Dict[str, Any]], batch_size: int = Config.IMPORT_BATCH_SIZE,
+                        processes: int = Config.SENTIMENT_PROCESSES) -> Dict[str, Any]:
+        """Bulk-load messages, embedding in batches and writing storage once at the end"""
+        start = time.perf_counter()
+        read = 0
+        
+        # Only the newest MAX_MEMORY_ITEMS messages survive trimming, so only those are kept and embedded
+        imported = deque(maxlen=Config.MAX_MEMORY_ITEMS)
+        for message in messages:
+            read += 1
+            imported.append({
+                "role": message.get("role", "user"),
+                "content": message["content"],
+                "timestamp": message.get("timestamp") or datetime.now().isoformat(),
+                "metadata": dict(message.get("metadata") or {})
+            })
+        
+        imported = list(imported)
+        self._score_sentiment([msg for msg in imported if msg['role'] == 'user'], processes)
+        
+        with self._lock:
+            self.chat_log.assign_ids(imported)
+        
+            evicted_ids = self.chat_history.extend(imported)
+            self.vector_store.remove(evicted_ids)
+            self.lexical_index.remove(evicted_ids)
+        
+            # Build the index in one pass over the surviving user messages
+            to_embed = [msg for msg in imported if msg['role'] == 'user']
+            for batch_start in range(0, len(to_embed), batch_size):
+                self.vector_store.add_messages(to_embed[batch_start:batch_start + batch_size])
+            for msg in to_embed:
+                self.lexical_index.add(msg['id'], msg['content'])
+            for msg in to_embed[-Config.ANALYSIS_WINDOW:]:
+                self.message_stats.add(msg['content'], msg['metadata']['sentiment'])
+        
+            self._save_memory()
+            self._save_vector_store()
+        
+        elapsed = time.perf_counter() - start
+        return {
+            "messages_read": read,
+            "messages_imported": len(imported),
+            "messages_embedded": len(to_embed),
+            "seconds": elapsed,
+            "messages_per_sec": read / elapsed if elapsed else 0.0
+        }
+    
+    async def aadd_message(self, role: str, content: str, metadata: Optional[Dict] = None):
+        """Async version of add_message that embeds user messages without blocking"""
+        if role == "user":
+            # Warm the embedding cache so add_message does not make a blocking call
+            await self.embeddings.aembed_documents([content])
+        # Storing takes locks and may compact the log or save the index, so it runs off the shared event loop
+        await asyncio.to_thread(self.add_message, role, content, metadata)
     
     def get_similar_messages(self, query: str, k: int = 3) -> List[str]:
-        """Get similar user messages based on semantic similarity"""
+        """Get similar user messages, fusing keyword (BM25) and semantic matches"""
         if not self.vector_store or not query or not query.strip():
             return []
         
+        query = query.strip()
+        lexical_ids = self._lexical_candidates(query, k)
+        if self._use_lexical_only(query):
+            return self._distinct_contents(query, lexical_ids, k)
+        
         try:
-            similar_docs = self.vector_store.similarity_search(query.strip(), k=k)
-            return [doc.page_content for doc in similar_docs if doc.page_content != "initialization"]
+            vector = self.embeddings.embed_query(query)
         except Exception as e:
-            print(f"Error in similarity search: {e}")
+            print(f"Error in similarity search, using keyword matches: {e}")
+            return self._distinct_contents(query, lexical_ids, k)
+        return self._rank(query, lexical_ids, vector, k)
+    
+    async def aget_similar_messages(self, query: str, k: int = 3) -> List[str]:
+        """Async version of get_similar_messages that falls back to keywords if embedding is slow"""
+        if not self.vector_store or not query or not query.strip():
             return []
+        
+        query = query.strip()
+        # BM25 scoring, ranking and lock waits all run off the shared event loop
+        lexical_ids = await asyncio.to_thread(self._lexical_candidates, query, k)
+        if self._use_lexical_only(query):
+            return await asyncio.to_thread(self._distinct_contents, query, lexical_ids, k)
+        
+        try:
+            vector = await asyncio.wait_for(self.embeddings.aembed_query(query), Config.RETRIEVAL_EMBED_TIMEOUT)
+        except Exception as e:
+            print(f"Error in similarity search, using keyword matches: {e!r}")
+            return await asyncio.to_thread(self._distinct_contents, query, lexical_ids, k)
+        return await asyncio.to_thread(self._rank, query, lexical_ids, vector, k)
+    
+    def _lexical_candidates(self, query: str, k: int) -> List[int]:
+        """IDs of the best keyword matches for a query"""
+        with self._lock:
+            return [doc_id for doc_id, _ in self.lexical_index.search(query, k=k * Config.RETRIEVAL_CANDIDATES)]
+    
+    def _use_lexical_only(self, query: str) -> bool:
+        """Whether to skip the embedding round trip for this query"""
+        # Inputs like "lol" embed to noise, so they only match messages that share their words
+        return (Config.RETRIEVAL_MODE == "lexical"
+                or len(tokenize(query)) <= Config.LEXICAL_FAST_PATH_TOKENS)
+    
+    def _rank(self, query: str, lexical_ids: List[int], vector: List[float], k: int) -> List[str]:
+        """Pick up to k keyword matches and vector matches above the similarity threshold, skipping near-duplicates"""
+        pool = k * Config.RETRIEVAL_CANDIDATES
+        query_key = self._normalize(query)
+        with self._lock:
+            similar_docs = self.vector_store.similarity_search_by_vector(vector, k=pool)
+            vector_ids = [doc.metadata['id'] for doc, _ in similar_docs]
+            if Config.RETRIEVAL_MODE == "vector":
+                candidates = vector_ids
+            else:
+                candidates = reciprocal_rank_fusion([lexical_ids, vector_ids], pool, Config.RRF_CONSTANT)
+            # The message just stored for this turn matches itself and adds nothing
+            candidates = [doc_id for doc_id in candidates
+                          if doc_id in self.lexical_index.documents
+                          and self._normalize(self.lexical_index.documents[doc_id]) != query_key]
+            vectors = self.vector_store.get_vectors(candidates)
+        if not candidates:
+            return []
+        
+        # Cosine similarity from stored vectors, since FAISS distances depend on vector norms
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        query_vector = np.asarray(vector, dtype=np.float32)
+        relevance = vectors @ (query_vector / max(np.linalg.norm(query_vector), 1e-12))
+        
+        # Keyword matches stand on their own; only matches found by vector search alone must clear the threshold
+        lexical = set(lexical_ids) if Config.RETRIEVAL_MODE != "vector" else set()
+        matched = np.fromiter((doc_id in lexical for doc_id in candidates), dtype=bool, count=len(candidates))
+        relevant = np.flatnonzero(matched | (relevance >= similarity_threshold()))
+        if Config.RETRIEVAL_MMR:
+            picks = maximal_marginal_relevance(relevance[relevant], vectors[relevant], k,
+                                               Config.MMR_LAMBDA, Config.DUPLICATE_THRESHOLD)
+        else:
+            # Keep fused rank order, only dropping near-duplicates
+            picks = maximal_marginal_relevance(np.linspace(1, 0, len(relevant)), vectors[relevant], k,
+                                               1.0, Config.DUPLICATE_THRESHOLD)
+        return self._contents([candidates[relevant[pick]] for pick in picks])
+    
+    def _distinct_contents(self, query: str, ids: List[int], k: int) -> List[str]:
+        """Text of the first k messages that differ from the query and from each other"""
+        seen = {self._normalize(query)}
+        distinct = []
+        for content in self._contents(ids):
+            key = self._normalize(content)
+            if key not in seen:
+                seen.add(key)
+                distinct.append(content)
+                if len(distinct) == k:
+                    break
+        return distinct
+    
+    def _contents(self, ids: List[int]) -> List[str]:
+        """Message text for indexed user message IDs"""
+        with self._lock:
+            return [self.lexical_index.documents[doc_id] for doc_id in ids if doc_id in self.lexical_index.documents]
+    
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Case- and whitespace-insensitive form of a message, for spotting repeats"""
+        return " ".join(unicodedata.normalize("NFC", text).lower().split())
+    
+    def get_embedding_cache_stats(self) -> Dict[str, float]:
+        """Get embedding cache hit/miss counters"""
+        return self.embeddings.get_stats()
     
     def get_conversation_context(self, limit: int = 10) -> List[Dict]:
         """Get recent conversation context"""
-        return self.chat_history[-limit:] if self.chat_history else []
+        with self._lock:
+            return self.chat_history[-limit:] if limit > 0 else []
     
     def get_user_message_count(self) -> int:
         """Get count of user messages"""
-        return len([msg for msg in self.chat_history if msg['role'] == 'user'])
+        return self.chat_history.user_count
+    
+    @property
+    def personality_profile(self) -> Dict[str, Any]:
+        """Current personality profile data, not to be modified"""
+        return self.profile.data
+    
+    def get_profile(self) -> PersonalityProfile:
+        """Current personality profile snapshot with its memoized views"""
+        return self.profile
     
     def get_personality_traits(self) -> Dict[str, Any]:
         """Get current personality profile"""
-        return self.personality_profile.copy()
+        return self.profile.data.copy()
     
     def update_personality_profile(self, traits: Dict[str, Any]):
         """Update personality profile"""
-        self.personality_profile.update(traits)
-        self.personality_profile['last_updated'] = datetime.now().isoformat()
-        self._save_personality()
+        # Swap in the new profile in one step so readers on other threads never see a partial update
+        with self._lock:
+            self.profile = self.profile.updated(traits)
+            self._save_personality()
+    
+    def merge_personality_profile(self, delta: Dict[str, Any]):
+        """Blend an incremental analysis into the personality profile"""
+        with self._lock:
+            self.profile = self.profile.merged(delta, Config.PROFILE_EWMA_ALPHA, Config.PROFILE_LIST_LIMIT)
+            self._save_personality()
+    
+    def _score_sentiment(self, messages: List[Dict[str, Any]], processes: int = 0):
+        """Store a sentiment score in the metadata of messages that lack one"""
+        unscored = [msg for msg in messages if msg.setdefault('metadata', {}).get('sentiment') is None]
+        if unscored:
+            scores = self.sentiment_scorer.score_batch([msg['content'] for msg in unscored], processes)
+            for msg, score in zip(unscored, scores):
+                msg['metadata']['sentiment'] = score
     
-    def get_user_messages_for_analysis(self, limit: int = 50) -> List[str]:
+    def get_message_statistics(self) -> Dict[str, Any]:
+        """Get running statistics of the analysis window"""
+        with self._lock:
+            return self.message_stats.summary()
+    
+    def get_user_messages_for_analysis(self, limit: int = Config.ANALYSIS_WINDOW) -> List[str]:
         """Get recent user messages for personality analysis"""
-        user_messages = [msg['content'] for msg in self.chat_history 
-                        if msg['role'] == 'user']
-        return user_messages[-limit:] if user_messages else []
+        with self._lock:
+            return self.chat_history.user_contents(limit)
+    
+    def get_unanalyzed_user_messages(self, after_id: int = 0,
+                                     limit: int = Config.ANALYSIS_WINDOW) -> Tuple[List[str], int]:
+        """Get recent user messages newer than after_id, and the ID of the newest one"""
+        with self._lock:
+            return self.chat_history.user_contents_since(after_id, limit)
     
     def _save_memory(self):
-        """Save chat history to file"""
-        os.makedirs(os.path.dirname(self.memory_file), exist_ok=True)
+        """Compact the chat log into a snapshot of the current history"""
         try:
-            with open(self.memory_file, 'w') as f:
-                json.dump(self.chat_history, f, indent=2)
+            self.chat_log.compact(list(self.chat_history))
         except Exception as e:
             print(f"Error saving memory: {e}")
     
@@ -125,23 +397,58 @@ class MemoryManager:
         """Save personality profile to file"""
         os.makedirs(os.path.dirname(self.personality_file), exist_ok=True)
         try:
-            with open(self.personality_file, 'w') as f:
+            tmp_path = self.personality_file + ".tmp"
+            with open(tmp_path, 'w') as f:
                 json.dump(self.personality_profile, f, indent=2)
+            os.replace(tmp_path, self.personality_file)
         except Exception as e:
             print(f"Error saving personality: {e}")
     
     def clear_memory(self):
         """Clear all memory"""
-        self.chat_history = []
-        self.personality_profile = {}
-        self._initialize_vector_store()
-        self._save_memory()
-        self._save_personality()
+        with self._lock:
+            self.chat_history.clear()
+            self.profile = self.profile.cleared()
+            self.message_stats.clear()
+            self.lexical_index.clear()
+            self.vector_store = MessageVectorIndex(self.embeddings)
+            self._save_vector_store()
+            self._save_memory()
+            self._save_personality()
+    
+    def flush(self):
+        """Write pending log records and index changes to disk"""
+        with self._lock:
+            self.chat_log.sync()
+            if self._unsaved_index_items:
+                self._save_vector_store()
     
     def export_data(self) -> Dict[str, Any]:
         """Export all data for backup"""
         return {
-            "chat_history": self.chat_history,
+            "chat_history": list(self.chat_history),
             "personality_profile": self.personality_profile,
             "export_timestamp": datetime.now().isoformat()
-        }
\ No newline at end of file
+        }
+    
+    def iter_export(self) -> Iterator[str]:
+        """Generate export_data as indented JSON text, one message per chunk, without copying the history"""
+        with self._lock:
+            position = self.chat_history.end - len(self.chat_history)
+            end = self.chat_history.end
+            profile = self.personality_profile
+        
+        yield '{\n  "chat_history": ['
+        exported = 0
+        while position < end:
+            # Short batches under the lock; messages dropped meanwhile are skipped
+            with self._lock:
+                messages, next_position = self.chat_history.read(position, end, EXPORT_BATCH_SIZE)
+            if next_position == position:
+                break
+            position = next_position
+            for message in messages:
+                yield ("," if exported else "") + "\n    " + json.dumps(message, indent=2).replace("\n", "\n    ")
+                exported += 1
+        yield ("\n  ]" if exported else "]") + ',\n  "personality_profile": ' + json.dumps(profile, indent=2).replace("\n", "\n  ")
+        yield f',\n  "export_timestamp": {json.dumps(datetime.now().isoformat())}\n}}'
\ No newline at end of file
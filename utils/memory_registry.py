@@ -0,0 +1,139 @@
+import atexit
+import hashlib
+import os
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from config import Config
+from utils.embedding_cache import CachedEmbeddings
+from utils.embeddings import get_embeddings
+from utils.memory_manager import MemoryManager
+
+def resolve_tenant_id(login: Optional[str] = None, requested: Optional[str] = None,
+                      source: Optional[str] = None) -> Optional[str]:
+    """Tenant a visitor may use: their signed-in identity, ?user= when configured, else the default tenant, or None if a required sign-in is missing"""
+    source = source or Config.TENANT_SOURCE
+    if login:
+        # Prefixed so no other source can name a signed-in user's memory
+        return f"login-{login}"
+    if source == "url" and requested and not requested.startswith("login-"):
+        # Anyone can type any name, so this suits only deployments where every visitor is trusted
+        return requested
+    if source == "login":
+        return None
+    return Config.DEFAULT_USER_ID
+
+class MemoryRegistry:
+    """Process-wide pool of per-user memory stores with LRU unloading of idle tenants"""
+
+    def __init__(self, data_dir: str = Config.DATA_DIR, max_tenants: int = Config.MAX_LOADED_TENANTS, embeddings=None):
+        self.data_dir = data_dir
+        self.max_tenants = max_tenants
+        self.loads = 0
+        self.evictions = 0
+
+        self._embeddings = embeddings
+        self._loaded: "OrderedDict[str, MemoryManager]" = OrderedDict()
+        # Evicted stores that a session still holds are reused rather than loaded twice
+        self._live = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, user_id: Optional[str] = None) -> MemoryManager:
+        """Get the memory store for a user, loading it on first use"""
+        user_id = user_id or Config.DEFAULT_USER_ID
+        memory = self._lookup(user_id)
+        if memory is not None:
+            return memory
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(user_id, threading.Lock())
+
+        # Loading reads and embeds from disk, so it happens outside the registry lock
+        with load_lock:
+            memory = self._lookup(user_id)
+            if memory is None:
+                memory = MemoryManager(embeddings=self._get_embeddings(), data_dir=self.tenant_dir(user_id))
+                with self._lock:
+                    self.loads += 1
+                    self._live[user_id] = memory
+                    evicted = self._remember(user_id, memory)
+                for stale in evicted:
+                    stale.flush()
+        return memory
+
+    def tenant_dir(self, user_id: str) -> str:
+        """Directory holding a user's history, index and profile"""
+        if user_id == Config.DEFAULT_USER_ID:
+            # The default tenant keeps the single-user layout so existing data is picked up
+            return self.data_dir
+
+        safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", user_id)[:64]
+        if safe_id != user_id:
+            safe_id += "-" + hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.data_dir, "users", safe_id)
+
+    def flush_all(self):
+        """Flush every loaded tenant to disk"""
+        with self._lock:
+            loaded = list(self._live.values())
+        for memory in loaded:
+            memory.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return load and eviction counters"""
+        with self._lock:
+            return {
+                "loaded": len(self._loaded),
+                "live": len(self._live),
+                "loads": self.loads,
+                "evictions": self.evictions
+            }
+
+    def _lookup(self, user_id: str) -> Optional[MemoryManager]:
+        """Find a loaded or still-referenced store and mark it recently used"""
+        with self._lock:
+            memory = self._loaded.get(user_id) or self._live.get(user_id)
+            if memory is None:
+                return None
+            evicted = self._remember(user_id, memory)
+        for stale in evicted:
+            stale.flush()
+        return memory
+
+    def _remember(self, user_id: str, memory: MemoryManager):
+        """Move a store to the recent end of the LRU and return any stores pushed out"""
+        self._loaded[user_id] = memory
+        self._loaded.move_to_end(user_id)
+
+        evicted = []
+        while len(self._loaded) > self.max_tenants:
+            _, stale = self._loaded.popitem(last=False)
+            evicted.append(stale)
+            self.evictions += 1
+        return evicted
+
+    def _get_embeddings(self) -> CachedEmbeddings:
+        """Embedding client and cache shared by every tenant"""
+        with self._lock:
+            if not isinstance(self._embeddings, CachedEmbeddings):
+                self._embeddings = CachedEmbeddings(
+                    self._embeddings or get_embeddings(),
+                    cache_file=os.path.join(self.data_dir, "embedding_cache.sqlite"),
+                    max_memory_items=Config.EMBEDDING_CACHE_SIZE
+                )
+            return self._embeddings
+
+_registry: Optional[MemoryRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_memory_registry() -> MemoryRegistry:
+    """Get the process-wide memory registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MemoryRegistry()
+            atexit.register(_registry.flush_all)
+        return _registry
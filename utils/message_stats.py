@@ -0,0 +1,91 @@
+import re
+from collections import Counter, deque
+from typing import Any, Dict, Iterable, Optional
+from utils.sentiment import get_sentiment_scorer
+
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are',
+    'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
+    'should', 'may', 'might', 'must', 'can', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him',
+    'her', 'us', 'them', 'my', 'your', 'his', 'its', 'our', 'their'
+})
+WORD_PATTERN = re.compile(r'\b\w+\b')
+
+class MessageFeatures:
+    """Statistics of one message, computed once when it arrives"""
+    __slots__ = ("words", "chars", "exclamations", "questions", "sentiment", "terms")
+
+    def __init__(self, text: str, sentiment: float):
+        self.words = len(text.split())
+        self.chars = len(text)
+        self.exclamations = text.count('!')
+        self.questions = text.count('?')
+        self.sentiment = sentiment
+        self.terms = Counter(w for w in WORD_PATTERN.findall(text.lower())
+                             if len(w) > 2 and w not in STOP_WORDS)
+
+class MessageStatistics:
+    """Running statistics over a sliding window of the most recent user messages"""
+
+    def __init__(self, window: int = 50, scorer=None):
+        self.window = window
+        self.scorer = scorer or get_sentiment_scorer()
+        self.messages: "deque[MessageFeatures]" = deque()
+        self.term_counts: Counter = Counter()
+        self._totals = {"words": 0, "chars": 0, "exclamations": 0, "questions": 0, "sentiment": 0.0}
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[str], window: Optional[int] = None, scorer=None) -> "MessageStatistics":
+        """Build statistics for a fixed list of messages"""
+        messages = list(messages)
+        stats = cls(window or max(len(messages), 1), scorer)
+        for text, sentiment in zip(messages, stats.scorer.score_batch(messages)):
+            stats.add(text, sentiment)
+        return stats
+
+    def add(self, text: str, sentiment: Optional[float] = None):
+        """Add a message, dropping the oldest one once the window is full"""
+        if sentiment is None:
+            sentiment = self.scorer.score(text)
+        features = MessageFeatures(text, sentiment)
+        self.messages.append(features)
+        self._apply(features, 1)
+        if len(self.messages) > self.window:
+            self._apply(self.messages.popleft(), -1)
+
+    def clear(self):
+        """Forget every message"""
+        self.messages.clear()
+        self.term_counts.clear()
+        for key in self._totals:
+            self._totals[key] = 0
+
+    def summary(self) -> Dict[str, Any]:
+        """Window statistics in the message_statistics profile format"""
+        count = len(self.messages)
+        if not count:
+            return {}
+
+        return {
+            "message_statistics": {
+                "total_messages": count,
+                "avg_words_per_message": self._totals["words"] / count,
+                "avg_chars_per_message": self._totals["chars"] / count,
+                "avg_sentiment": self._totals["sentiment"] / count,
+                "common_words": [word for word, _ in self.term_counts.most_common(10)],
+                "exclamation_frequency": self._totals["exclamations"] / count,
+                "question_frequency": self._totals["questions"] / count
+            }
+        }
+
+    def _apply(self, features: MessageFeatures, sign: int):
+        """Add (sign=1) or remove (sign=-1) a message from the running totals"""
+        for key in self._totals:
+            self._totals[key] += sign * getattr(features, key)
+        if sign > 0:
+            self.term_counts.update(features.terms)
+        else:
+            self.term_counts.subtract(features.terms)
+            for term in features.terms:
+                if self.term_counts[term] <= 0:
+                    del self.term_counts[term]
@@ -0,0 +1,203 @@
+import math
+import sys
+from array import array
+from collections import deque
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+ROLES = ("user", "assistant")
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+NO_TIMESTAMP = -(1 << 63)
+RECENT_TIMESTAMPS = 16  # Newest messages whose timestamp text is kept once formatted, enough for a chat context
+
+class MessageStore:
+    """Fixed-capacity columnar ring buffer of chat messages.
+
+    Roles are stored as byte codes, timestamps as int64 microseconds since
+    the epoch and sentiment as float64, with content strings interned. The
+    oldest message is dropped when the store is full. Reading an item
+    builds the same message dict that used to be stored; the timestamp text
+    of the newest few messages is kept after its first read, since those
+    are read on every chat turn.
+    """
+
+    def __init__(self, capacity: int, recent_timestamps: int = RECENT_TIMESTAMPS):
+        self.capacity = capacity
+        self.recent_timestamps = recent_timestamps
+        # Plain typed arrays: compact like NumPy, but much faster to read one element at a time
+        self.ids = array('q', bytes(8 * capacity))
+        self.roles = bytearray(capacity)
+        self.timestamps = array('q', bytes(8 * capacity))
+        self.sentiments = array('d', [math.nan]) * capacity
+        self.contents: List[Optional[str]] = [None] * capacity
+        self.metadata: List[Optional[Dict[str, Any]]] = [None] * capacity
+
+        self.role_names = list(ROLES)
+        self._role_codes = {role: code for code, role in enumerate(ROLES)}
+        # Timestamps that do not survive a round trip through int64 are kept verbatim
+        self._raw_timestamps: Dict[int, str] = {}
+        # Formatted timestamps of recent messages by position, dropped as messages leave the tail
+        self._recent_texts: Dict[int, str] = {}
+        # Absolute positions of user messages, oldest first
+        self._user_positions: "deque[int]" = deque()
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for position in range(self._start, self._end):
+            yield self._message(position)
+
+    def __getitem__(self, key):
+        positions = range(self._start, self._end)[key]
+        if isinstance(key, slice):
+            return [self._message(position) for position in positions]
+        return self._message(positions)
+
+    @property
+    def user_count(self) -> int:
+        """Number of user messages held"""
+        return len(self._user_positions)
+
+    def append(self, message: Dict[str, Any]) -> List[int]:
+        """Add a message, returning the IDs of user messages pushed out to make room"""
+        evicted = []
+        if len(self) == self.capacity:
+            evicted = self._evict_oldest()
+
+        position = self._end
+        slot = position % self.capacity
+        role = message.get('role', 'user')
+        metadata = dict(message.get('metadata') or {})
+        sentiment = metadata.get('sentiment')
+
+        self.ids[slot] = message.get('id', 0)
+        self.roles[slot] = self._role_code(role)
+        self.timestamps[slot] = self._encode_timestamp(position, message.get('timestamp'))
+        self._recent_texts.pop(position - self.recent_timestamps, None)
+        self.contents[slot] = sys.intern(message['content'])
+        if isinstance(sentiment, (int, float)) and not isinstance(sentiment, bool):
+            self.sentiments[slot] = metadata.pop('sentiment')
+        else:
+            self.sentiments[slot] = math.nan
+        self.metadata[slot] = metadata or None
+
+        if role == 'user':
+            self._user_positions.append(position)
+        self._end += 1
+        return evicted
+
+    def extend(self, messages: Iterable[Dict[str, Any]]) -> List[int]:
+        """Add messages in order, returning the IDs of user messages pushed out"""
+        evicted = []
+        for message in messages:
+            evicted.extend(self.append(message))
+        return evicted
+
+    def clear(self):
+        """Drop every message"""
+        self.contents = [None] * self.capacity
+        self.metadata = [None] * self.capacity
+        self._raw_timestamps.clear()
+        self._recent_texts.clear()
+        self._user_positions.clear()
+        # Positions keep counting up, so a reader part-way through never mistakes new messages for old ones
+        self._start = self._end
+
+    @property
+    def end(self) -> int:
+        """Absolute position the next message will take"""
+        return self._end
+
+    def read(self, position: int, end: int, limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Up to limit messages from an absolute position up to end, skipping dropped ones, and the position to read next"""
+        start = max(position, self._start)
+        stop = min(end, self._end, start + limit)
+        return [self._message(p) for p in range(start, stop)], max(stop, position)
+
+    def user_contents(self, limit: int) -> List[str]:
+        """Content of the last limit user messages, oldest first"""
+        if limit <= 0:
+            return []
+        recent = list(islice(reversed(self._user_positions), limit))
+        return [self.contents[position % self.capacity] for position in reversed(recent)]
+
+    def user_contents_since(self, message_id: int, limit: int) -> Tuple[List[str], int]:
+        """Content of up to limit newest user messages with IDs above message_id, oldest first, and the newest ID"""
+        recent = []
+        for position in reversed(self._user_positions):
+            if len(recent) == limit or self.ids[position % self.capacity] <= message_id:
+                break
+            recent.append(position)
+        newest = self.ids[recent[0] % self.capacity] if recent else message_id
+        return [self.contents[position % self.capacity] for position in reversed(recent)], newest
+
+    def user_messages(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The last limit user messages, or all of them, oldest first"""
+        positions = self._user_positions if limit is None else list(islice(reversed(self._user_positions), limit))[::-1]
+        return [self._message(position) for position in positions]
+
+    def _message(self, position: int) -> Dict[str, Any]:
+        """Rebuild the message dict stored at an absolute position"""
+        slot = position % self.capacity
+        stored = self.metadata[slot]
+        metadata = dict(stored) if stored else {}
+        sentiment = self.sentiments[slot]
+        if sentiment == sentiment:
+            metadata['sentiment'] = sentiment
+        timestamp = self._recent_texts.get(position)
+        if timestamp is None:
+            timestamp = self._decode_timestamp(position)
+        return {
+            "role": self.role_names[self.roles[slot]],
+            "content": self.contents[slot],
+            "timestamp": timestamp,
+            "metadata": metadata,
+            "id": self.ids[slot]
+        }
+
+    def _evict_oldest(self) -> List[int]:
+        """Drop the oldest message, returning its ID if it was a user message"""
+        position = self._start
+        slot = position % self.capacity
+        self.contents[slot] = None
+        self.metadata[slot] = None
+        self._raw_timestamps.pop(position, None)
+        self._recent_texts.pop(position, None)
+        self._start += 1
+
+        if self._user_positions and self._user_positions[0] == position:
+            self._user_positions.popleft()
+            return [self.ids[slot]]
+        return []
+
+    def _role_code(self, role: str) -> int:
+        if role not in self._role_codes:
+            self._role_codes[role] = len(self.role_names)
+            self.role_names.append(role)
+        return self._role_codes[role]
+
+    def _encode_timestamp(self, position: int, timestamp: Optional[str]) -> int:
+        try:
+            value = datetime.fromisoformat(timestamp)
+            if value.isoformat() == timestamp and value.tzinfo is None:
+                return (value - EPOCH) // MICROSECOND
+        except (TypeError, ValueError, OverflowError):
+            pass
+        self._raw_timestamps[position] = timestamp
+        return NO_TIMESTAMP
+
+    def _decode_timestamp(self, position: int) -> Optional[str]:
+        """Format a timestamp, keeping the text if the message is among the most recent"""
+        micros = self.timestamps[position % self.capacity]
+        if micros == NO_TIMESTAMP:
+            return self._raw_timestamps.get(position)
+        seconds, micros = divmod(micros, 1000000)
+        text = (EPOCH + timedelta(0, seconds, micros)).isoformat()
+        if position >= self._end - self.recent_timestamps:
+            self._recent_texts[position] = text
+        return text
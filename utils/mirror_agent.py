@@ -1,82 +1,76 @@
-from typing import Dict, List, Any, Optional
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
+import asyncio
+import threading
+import time
+import weakref
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from langchain_core.messages import HumanMessage, AIMessage
 from config import Config
+from utils.analysis_worker import PersonalityAnalysisWorker
+from utils.async_runner import run_sync
+from utils.clients import get_chat_model
 from utils.memory_manager import MemoryManager
+from utils.memory_registry import get_memory_registry
 from utils.personality_analyzer import PersonalityAnalyzer
+from utils.prompt_builder import PromptBuilder, render_personality_context
+from utils.response_cache import ResponseCache
+
+FALLBACK_RESPONSE = "I'm still learning about your communication style. Could you tell me more?"
+
+# Agents in use by at least one session, so every tab of a user shares one agent and analysis worker
+_agents = weakref.WeakValueDictionary()
+_agents_lock = threading.Lock()
 
 class MirrorAgent:
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model_name=Config.MODEL_NAME,
-            temperature=Config.TEMPERATURE,
-            max_tokens=Config.MAX_TOKENS,
-            openai_api_key=Config.OPENAI_API_KEY
-        )
+    def __init__(self, llm=None, memory_manager: Optional[MemoryManager] = None,
+                 personality_analyzer: Optional[PersonalityAnalyzer] = None):
+        # Clients and memory are shared across sessions; only conversation state is per agent
+        self.llm = llm or get_chat_model(Config.TEMPERATURE, Config.MAX_TOKENS)
         
-        self.memory_manager = MemoryManager()
-        self.personality_analyzer = PersonalityAnalyzer()
+        self.memory_manager = memory_manager or get_memory_registry().get()
+        self.personality_analyzer = personality_analyzer or PersonalityAnalyzer()
+        self.analysis_worker = PersonalityAnalysisWorker(self.personality_analyzer, self.memory_manager)
         
         # Initialize conversation messages
         self.conversation_messages = []
         
-        # Base prompt template
-        self.base_prompt = PromptTemplate.from_template("""
-        You are MirrorMe, an AI that learns to mirror the user's personality and communication style over time.
-
-        PERSONALITY PROFILE:
-        {personality_context}
-
-        SIMILAR PAST MESSAGES:
-        {similar_messages}
-
-        CONVERSATION CONTEXT:
-        {conversation_context}
-
-        INSTRUCTIONS:
-        1. Respond in the user's typical communication style based on the personality profile
-        2. Use similar tone, formality level, and enthusiasm as shown in past messages
-        3. Reference their interests and use their favorite phrases when appropriate
-        4. Keep responses concise and engaging
-        5. Gradually become more like them as you learn more about their style
-
-        Current message: {input}
+        # Per-stage timings of the most recent turn, in seconds
+        self.last_turn_timings: Dict[str, float] = {}
+        
+        # Token counts per prompt section of the most recent turn
+        self.last_prompt_stats: Dict[str, Any] = {}
+        
+        self.prompt_builder = PromptBuilder()
         
-        Response:""")
+        # Replies to repeated inputs, reused while the profile and recent user messages are unchanged
+        self.response_cache = None
+        if Config.RESPONSE_CACHE:
+            self.response_cache = ResponseCache(Config.RESPONSE_CACHE_SIZE, Config.RESPONSE_CACHE_TTL,
+                                                Config.RESPONSE_CACHE_SIMILARITY)
     
     def generate_response(self, user_input: str) -> str:
         """Generate a response that mirrors the user's style"""
-        if not user_input or not user_input.strip():
-            return "I didn't receive any message. Could you please try again?"
-        
-        # Validate API key
-        if not Config.OPENAI_API_KEY or Config.OPENAI_API_KEY == "your-openai-api-key-here":
-            return "⚠️ OpenAI API key not configured. Please check your .env file and add a valid API key."
-        
-        # Add user message to memory
-        self.memory_manager.add_message("user", user_input.strip())
-        
-        # Check if we need to update personality profile
-        self._maybe_update_personality()
+        return run_sync(self.agenerate_response(user_input))
+    
+    async def agenerate_response(self, user_input: str) -> str:
+        """Generate a response, overlapping the independent steps of the turn"""
+        error = self._validate_input(user_input)
+        if error:
+            return error
         
-        # Get context for response generation
-        personality_context = self._get_personality_context()
-        similar_messages = self.memory_manager.get_similar_messages(user_input.strip(), k=3)
-        conversation_context = self._get_conversation_context()
+        user_input = user_input.strip()
+        timings = {}
+        turn_start = time.perf_counter()
         
-        # Generate response
         try:
-            # Create the full prompt
-            full_prompt = self.base_prompt.format(
-                personality_context=personality_context,
-                similar_messages=self._format_similar_messages(similar_messages),
-                conversation_context=conversation_context,
-                input=user_input.strip()
-            )
+            cached, cache_key = await self._alookup_response(user_input, timings)
+            if cached is not None:
+                await self._astore_cached_turn(user_input, cached, timings)
+                return cached
+            
+            full_prompt = await self._abuild_prompt(user_input, timings)
             
             # Generate response using invoke method
-            response = self.llm.invoke(full_prompt)
+            response = await self._timed(timings, "llm", self.llm.ainvoke(full_prompt))
             
             # Extract content from response
             if hasattr(response, 'content'):
@@ -87,123 +81,207 @@ class MirrorAgent:
             # Clean up response
             response_text = response_text.strip()
             if not response_text:
-                response_text = "I'm still learning about your communication style. Could you tell me more?"
+                response_text = FALLBACK_RESPONSE
+            else:
+                self._cache_response(cache_key, response_text, turn_start)
             
             # Add AI response to memory
-            self.memory_manager.add_message("assistant", response_text)
+            await self._timed(timings, "store_response", self.memory_manager.aadd_message("assistant", response_text))
             
             return response_text
             
         except Exception as e:
             print(f"Error generating response: {e}")
-            return "I'm still learning about your communication style. Could you tell me more?"
+            return FALLBACK_RESPONSE
+        
+        finally:
+            self._record_timings(timings, turn_start)
     
-    def _maybe_update_personality(self):
-        """Update personality profile if we have enough new messages"""
-        user_count = self.memory_manager.get_user_message_count()
+    def stream_response(self, user_input: str) -> Iterator[str]:
+        """Yield the response as the model generates it, storing it once complete"""
+        error = self._validate_input(user_input)
+        if error:
+            yield error
+            return
         
-        if (user_count >= Config.MIN_MESSAGES_FOR_ANALYSIS and 
-            user_count % Config.PERSONALITY_ANALYSIS_FREQUENCY == 0):
+        user_input = user_input.strip()
+        timings = {}
+        turn_start = time.perf_counter()
+        chunks = []
+        
+        try:
+            cached, cache_key = run_sync(self._alookup_response(user_input, timings))
+            if cached is not None:
+                run_sync(self._astore_cached_turn(user_input, cached, timings))
+                yield cached
+                return
             
-            # Get recent messages for analysis
-            messages = self.memory_manager.get_user_messages_for_analysis()
+            full_prompt = run_sync(self._abuild_prompt(user_input, timings))
             
-            # Analyze personality
-            new_profile = self.personality_analyzer.analyze_messages(messages)
+            llm_start = time.perf_counter()
+            for chunk in self.llm.stream(full_prompt):
+                text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                if not text:
+                    continue
+                if not chunks:
+                    timings["first_token"] = time.perf_counter() - llm_start
+                chunks.append(text)
+                yield text
+            timings["llm"] = time.perf_counter() - llm_start
             
-            # Update profile
-            self.memory_manager.update_personality_profile(new_profile)
-    
-    def _get_personality_context(self) -> str:
-        """Get formatted personality context"""
-        profile = self.memory_manager.get_personality_traits()
-        
-        if not profile:
-            return "User personality still being learned..."
-        
-        context = []
-        
-        # Communication style
-        comm_style = profile.get("communication_style", {})
-        if comm_style:
-            context.append(f"Communication Style: {comm_style.get('tone', 'neutral')} tone, "
-                         f"formality level {comm_style.get('formality_level', 5)}/10")
-        
-        # Personality traits
-        personality = profile.get("personality_traits", {})
-        if personality:
-            traits = []
-            for trait, score in personality.items():
-                if score > 7:
-                    traits.append(f"high {trait}")
-                elif score < 4:
-                    traits.append(f"low {trait}")
-            if traits:
-                context.append(f"Personality: {', '.join(traits)}")
-        
-        # Interests
-        interests = profile.get("interests_and_topics", [])
-        if interests:
-            context.append(f"Interests: {', '.join(interests[:5])}")
-        
-        # Favorite phrases
-        phrases = profile.get("favorite_phrases", [])
-        if phrases:
-            context.append(f"Typical phrases: {', '.join(phrases[:3])}")
-        
-        # Message statistics
-        stats = profile.get("message_statistics", {})
-        if stats:
-            avg_words = stats.get("avg_words_per_message", 0)
-            sentiment = stats.get("avg_sentiment", 0)
-            context.append(f"Typical message length: {avg_words:.1f} words")
+            response_text = "".join(chunks).strip()
+            if not response_text:
+                response_text = FALLBACK_RESPONSE
+                yield response_text
+            else:
+                self._cache_response(cache_key, response_text, turn_start)
+            
+            # Persist the full response only after the stream completes
+            store_start = time.perf_counter()
+            self.memory_manager.add_message("assistant", response_text)
+            timings["store_response"] = time.perf_counter() - store_start
             
-            if sentiment > 0.1:
-                context.append("Generally positive tone")
-            elif sentiment < -0.1:
-                context.append("Generally more reserved tone")
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            if not chunks:
+                yield FALLBACK_RESPONSE
         
-        return "\n".join(context) if context else "User personality still being learned..."
+        finally:
+            self._record_timings(timings, turn_start)
     
-    def _format_similar_messages(self, messages: List[str]) -> str:
-        """Format similar messages for context"""
-        if not messages:
-            return "No similar messages found yet."
+    def _validate_input(self, user_input: str) -> Optional[str]:
+        """Return an error message if the turn cannot be answered"""
+        if not user_input or not user_input.strip():
+            return "I didn't receive any message. Could you please try again?"
         
-        formatted = []
-        for i, msg in enumerate(messages, 1):
-            formatted.append(f"{i}. {msg}")
+        # Validate API key
+        if not Config.OPENAI_API_KEY or Config.OPENAI_API_KEY == "your-openai-api-key-here":
+            return "⚠️ OpenAI API key not configured. Please check your .env file and add a valid API key."
         
-        return "\n".join(formatted)
+        return None
     
-    def _get_conversation_context(self) -> str:
-        """Get recent conversation context"""
-        context = self.memory_manager.get_conversation_context(limit=6)
+    async def _abuild_prompt(self, user_input: str, timings: Dict[str, float]) -> str:
+        """Store the user message and assemble the prompt for the reply"""
+        # Embedding the new message is the only network call before the LLM,
+        # so format the personality context while it is in flight
+        _, personality_context = await asyncio.gather(
+            self._timed(timings, "store_message", self.memory_manager.aadd_message("user", user_input)),
+            self._timed(timings, "personality_context", asyncio.to_thread(self._get_personality_context))
+        )
         
-        if not context:
-            return "Start of conversation"
+        # Check if we need to update personality profile
+        await self._timed(timings, "personality_update", asyncio.to_thread(self._maybe_update_personality))
         
-        formatted = []
-        for msg in context[-6:]:  # Last 6 messages
-            role = "User" if msg["role"] == "user" else "Assistant"
-            formatted.append(f"{role}: {msg['content']}")
+        # Retrieval reuses the vector cached while storing the message
+        similar_messages, conversation = await asyncio.gather(
+            self._timed(timings, "retrieval", self.memory_manager.aget_similar_messages(user_input, k=3)),
+            self._timed(timings, "conversation_context", asyncio.to_thread(self._get_conversation_context))
+        )
         
-        return "\n".join(formatted)
+        format_start = time.perf_counter()
+        prompt, self.last_prompt_stats = self.prompt_builder.build(
+            personality_context, similar_messages, conversation, user_input
+        )
+        timings["format_prompt"] = time.perf_counter() - format_start
+        return prompt
+    
+    async def _alookup_response(self, user_input: str,
+                                timings: Dict[str, float]) -> Tuple[Optional[str], Optional[Tuple[str, str, Any]]]:
+        """Return a cached reply to the input, if any, and the key a fresh reply is cached under"""
+        if self.response_cache is None:
+            return None, None
+        
+        start = time.perf_counter()
+        try:
+            # The key is taken before the message is stored, so it covers the user messages before it
+            key, scope = await asyncio.to_thread(self._cache_key, user_input)
+            vector = None
+            if self.response_cache.semantic:
+                # Storing the message needs this embedding anyway and finds it cached
+                vector = await self.memory_manager.embeddings.aembed_query(user_input)
+            return self.response_cache.get(key, scope, vector), (key, scope, vector)
+        except Exception as e:
+            print(f"Error looking up cached response: {e}")
+            return None, None
+        finally:
+            timings["response_cache"] = time.perf_counter() - start
+    
+    async def _astore_cached_turn(self, user_input: str, response_text: str, timings: Dict[str, float]):
+        """Record a turn answered from the cache just like one the model answered"""
+        await self._timed(timings, "store_message", self.memory_manager.aadd_message("user", user_input))
+        await self._timed(timings, "personality_update", asyncio.to_thread(self._maybe_update_personality))
+        await self._timed(timings, "store_response", self.memory_manager.aadd_message("assistant", response_text))
+    
+    def _cache_key(self, user_input: str) -> Tuple[str, str]:
+        """Response cache key and scope for an input, read under the memory lock"""
+        context = self.memory_manager.get_user_messages_for_analysis(limit=Config.RESPONSE_CACHE_CONTEXT_MESSAGES)
+        return self.response_cache.make_key(user_input, self.memory_manager.get_profile().revision, context)
+    
+    def _cache_response(self, cache_key: Optional[Tuple[str, str, Any]], response_text: str, turn_start: float):
+        """Cache a fresh reply along with the time it took to produce"""
+        if self.response_cache is not None and cache_key is not None:
+            key, scope, vector = cache_key
+            self.response_cache.put(key, scope, response_text, vector, cost=time.perf_counter() - turn_start)
+    
+    def _record_timings(self, timings: Dict[str, float], turn_start: float):
+        """Keep the stage timings of the finished turn"""
+        timings["total"] = time.perf_counter() - turn_start
+        self.last_turn_timings = timings
+        if Config.LOG_TURN_TIMINGS:
+            print("Turn timings (ms): " + ", ".join(
+                f"{stage}={elapsed * 1000:.1f}" for stage, elapsed in timings.items()))
+            if self.last_prompt_stats:
+                print(f"Prompt tokens: {self.last_prompt_stats['total']} of {self.last_prompt_stats['budget']}")
+    
+    async def _timed(self, timings: Dict[str, float], stage: str, awaitable):
+        """Await a turn stage and record how long it took"""
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[stage] = time.perf_counter() - start
+    
+    def _maybe_update_personality(self):
+        """Update personality profile if we have enough new messages"""
+        user_count = self.memory_manager.get_user_message_count()
+        
+        if (user_count >= Config.MIN_MESSAGES_FOR_ANALYSIS and 
+            user_count % Config.PERSONALITY_ANALYSIS_FREQUENCY == 0):
+            
+            if Config.BACKGROUND_PERSONALITY_ANALYSIS:
+                # The new profile is swapped in when the worker finishes
+                self.analysis_worker.submit()
+                return
+            
+            # Analyze new messages and update the profile
+            self.personality_analyzer.update_profile(self.memory_manager)
+    
+    def _get_personality_context(self) -> str:
+        """Get formatted personality context, rendered once per profile revision"""
+        return self.memory_manager.get_profile().view("prompt_context", render_personality_context)
+    
+    def _get_conversation_context(self) -> List[Dict[str, Any]]:
+        """Get recent messages, plus the one being answered, for the prompt builder to fit"""
+        return self.memory_manager.get_conversation_context(limit=Config.CONTEXT_MESSAGES + 1)
     
     def get_personality_summary(self) -> str:
-        """Get a summary of the learned personality"""
-        profile = self.memory_manager.get_personality_traits()
-        return self.personality_analyzer.get_personality_summary(profile)
+        """Get a summary of the learned personality, rendered once per profile revision"""
+        return self.memory_manager.get_profile().view("summary", self.personality_analyzer.get_personality_summary)
+    
+    def get_response_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache hit rate and saved model time, empty when the cache is off"""
+        return self.response_cache.get_stats() if self.response_cache is not None else {}
     
     def get_learning_progress(self) -> Dict[str, Any]:
         """Get learning progress statistics"""
         user_count = self.memory_manager.get_user_message_count()
-        profile = self.memory_manager.get_personality_traits()
+        profile = self.memory_manager.get_profile()
         
         return {
             "messages_analyzed": user_count,
             "personality_updates": len(profile) > 0,
             "learning_stage": self._get_learning_stage(user_count),
+            "analysis_pending": self.analysis_worker.is_pending(),
             "next_analysis_at": ((user_count // Config.PERSONALITY_ANALYSIS_FREQUENCY) + 1) * Config.PERSONALITY_ANALYSIS_FREQUENCY
         }
     
@@ -227,4 +305,25 @@ class MirrorAgent:
     
     def export_data(self) -> Dict[str, Any]:
         """Export all learning data"""
-        return self.memory_manager.export_data()
\ No newline at end of file
+        return self.memory_manager.export_data()
+    
+    def iter_export(self) -> Iterator[str]:
+        """Generate all learning data as JSON text, chunk by chunk"""
+        return self.memory_manager.iter_export()
+
+def get_mirror_agent(user_id: Optional[str] = None) -> "MirrorAgent":
+    """Get the agent for a user, creating it when no session holds one"""
+    user_id = user_id or Config.DEFAULT_USER_ID
+    with _agents_lock:
+        agent = _agents.get(user_id)
+    if agent is not None:
+        return agent
+    
+    # Loading memory can take a while, so other users are not kept waiting on the lock
+    memory_manager = get_memory_registry().get(user_id)
+    with _agents_lock:
+        agent = _agents.get(user_id)
+        if agent is None:
+            agent = MirrorAgent(memory_manager=memory_manager)
+            _agents[user_id] = agent
+        return agent
\ No newline at end of file
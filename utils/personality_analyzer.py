@@ -1,18 +1,19 @@
-import re
-from typing import Dict, List, Any
-from collections import Counter
-from textblob import TextBlob
-from langchain_openai import ChatOpenAI
+import json
+from typing import Dict, List, Any, Optional
 from langchain_core.prompts import PromptTemplate
 from config import Config
+from utils.analysis_parser import AnalysisParseError, parse_analysis
+from utils.clients import get_chat_model
+from utils.message_stats import MessageStatistics
+from utils.prompt_builder import get_token_counter
+from utils.rate_limiter import request_priority
+
+# Profile fields the model does not estimate, left out of the summary sent with incremental analyses
+UNANALYZED_FIELDS = ("message_statistics", "last_updated", "last_analyzed_id")
 
 class PersonalityAnalyzer:
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model_name=Config.MODEL_NAME,
-            temperature=0.3,
-            openai_api_key=Config.OPENAI_API_KEY
-        )
+    def __init__(self, llm=None):
+        self.llm = llm or get_chat_model(temperature=0.3)
         
         self.analysis_prompt = PromptTemplate.from_template("""
         You are an expert personality analyst. Analyze the following messages from a user and extract their personality traits, communication style, and preferences.
@@ -57,84 +58,172 @@ class PersonalityAnalyzer:
 
         Respond with ONLY the JSON, no additional text.
         """)
+        
+        self.incremental_prompt = PromptTemplate.from_template("""
+        You are an expert personality analyst. Below is the profile built from a user's earlier messages, followed by messages they sent since. Analyze the new messages, using the profile only as context, and extract their personality traits, communication style, and preferences.
+
+        Current Profile:
+        {profile}
+
+        New User Messages:
+        {messages}
+
+        Respond with ONLY JSON in the same structure as the current profile, scores on the same 1-10 scales, no additional text.
+        """)
+        
+        self.repair_prompt = PromptTemplate.from_template("""
+        The text below was meant to be a JSON personality analysis but could not be used ({error}). Rewrite it as one valid JSON object with the same content, every score a number from 1 to 10.
+
+        Text:
+        {response}
+
+        Respond with ONLY the JSON, no additional text.
+        """)
+        
+        self.last_analysis_stats: Dict[str, Any] = {}
+        
+        # Outcome counters; tokens of analyses that failed even after a repair were paid for nothing
+        self.analyses = 0
+        self.repaired = 0
+        self.failed = 0
+        self.repair_tokens = 0
+        self.wasted_tokens = 0
+    
+    def update_profile(self, memory_manager):
+        """Analyze messages not analyzed yet and fold the result into the user's profile"""
+        profile = memory_manager.get_profile()
+        last_analyzed_id = profile.get("last_analyzed_id", 0)
+        
+        if Config.INCREMENTAL_PERSONALITY_ANALYSIS and profile and last_analyzed_id:
+            messages, newest_id = memory_manager.get_unanalyzed_user_messages(last_analyzed_id)
+            if not messages:
+                return
+            delta = self.analyze_new_messages(messages, profile.data, memory_manager.get_message_statistics())
+            # A failed analysis leaves the watermark, so the next one covers these messages again
+            if delta:
+                delta["last_analyzed_id"] = newest_id
+                memory_manager.merge_personality_profile(delta)
+            return
+        
+        messages, newest_id = memory_manager.get_unanalyzed_user_messages()
+        if not messages:
+            return
+        new_profile = self.analyze_messages(messages, memory_manager.get_message_statistics())
+        # After a failure analyze_messages returns the default profile, which must not replace a learned one
+        if self.last_analysis_stats.get("parsed"):
+            new_profile["last_analyzed_id"] = newest_id
+            memory_manager.update_personality_profile(new_profile)
     
-    def analyze_messages(self, messages: List[str]) -> Dict[str, Any]:
-        """Analyze user messages and extract personality traits"""
+    def analyze_messages(self, messages: List[str], statistics: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Analyze user messages and extract personality traits, reusing precomputed statistics if given"""
         if not messages:
             return self._get_default_profile()
         
-        # Combine messages for analysis
-        combined_messages = "\n".join(messages)
-        
         try:
-            # Get AI analysis
-            response = self.llm.invoke(
-                self.analysis_prompt.format(messages=combined_messages)
-            )
-            
-            # Extract content from response
-            if hasattr(response, 'content'):
-                response_text = response.content
-            else:
-                response_text = str(response)
-            
-            # Parse JSON response
-            import json
-            personality_data = json.loads(response_text)
-            
-            # Add statistical analysis
-            stats = self._calculate_message_statistics(messages)
-            personality_data.update(stats)
-            
-            return personality_data
-            
+            prompt = self.analysis_prompt.format(messages="\n".join(messages))
+            return self._analyze(prompt, "full", messages, statistics)
         except Exception as e:
             print(f"Error in personality analysis: {e}")
             return self._get_default_profile()
     
-    def _calculate_message_statistics(self, messages: List[str]) -> Dict[str, Any]:
-        """Calculate statistical patterns from messages"""
+    def analyze_new_messages(self, messages: List[str], profile: Dict[str, Any],
+                             statistics: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Analyze messages sent since the profile was built, returning traits to merge or None on failure"""
         if not messages:
-            return {}
-        
-        # Basic statistics
-        total_words = sum(len(msg.split()) for msg in messages)
-        total_chars = sum(len(msg) for msg in messages)
-        
-        # Sentiment analysis
-        sentiments = []
-        for msg in messages:
-            blob = TextBlob(msg)
-            sentiments.append(blob.sentiment.polarity)
+            return None
         
-        avg_sentiment = sum(sentiments) / len(sentiments) if sentiments else 0
-        
-        # Common words (excluding stop words)
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them', 'my', 'your', 'his', 'her', 'its', 'our', 'their'}
+        try:
+            prompt = self.incremental_prompt.format(profile=self._compact_profile(profile),
+                                                    messages="\n".join(messages))
+            return self._analyze(prompt, "incremental", messages, statistics)
+        except Exception as e:
+            print(f"Error in incremental personality analysis: {e}")
+            return None
+    
+    def _analyze(self, prompt: str, mode: str, messages: List[str],
+                 statistics: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Send an analysis prompt and parse the reply, asking once for a repair, then add message statistics"""
+        count = get_token_counter().count
+        self.last_analysis_stats = {
+            "mode": mode,
+            "messages": len(messages),
+            "prompt_tokens": count(prompt),
+            "parsed": False,
+            "repaired": False
+        }
+        self.analyses += 1
+        spent = self.last_analysis_stats["prompt_tokens"]
         
-        all_words = []
-        for msg in messages:
-            words = re.findall(r'\b\w+\b', msg.lower())
-            all_words.extend([w for w in words if w not in stop_words and len(w) > 2])
+        try:
+            response_text = self._invoke(prompt)
+            spent += count(response_text)
+            try:
+                personality_data = parse_analysis(response_text)
+            except AnalysisParseError as e:
+                # Fixing up the reply costs far less than analyzing the messages again
+                repair_prompt = self.repair_prompt.format(error=str(e), response=response_text)
+                repaired_text = self._invoke(repair_prompt)
+                repair_tokens = count(repair_prompt) + count(repaired_text)
+                spent += repair_tokens
+                self.repair_tokens += repair_tokens
+                personality_data = parse_analysis(repaired_text)
+                self.repaired += 1
+                self.last_analysis_stats["repaired"] = True
+        except Exception:
+            self.failed += 1
+            self.wasted_tokens += spent
+            raise
+        self.last_analysis_stats["parsed"] = True
         
-        common_words = Counter(all_words).most_common(10)
+        # Add statistical analysis
+        if statistics is None:
+            statistics = self._calculate_message_statistics(messages)
+        personality_data.update(statistics)
         
-        # Punctuation patterns
-        exclamations = sum(msg.count('!') for msg in messages)
-        questions = sum(msg.count('?') for msg in messages)
+        return personality_data
+    
+    def _invoke(self, prompt: str) -> str:
+        """Send a prompt to the model and return the text of its reply"""
+        # Analysis can wait; chat turns and embeddings get the rate limit budget first
+        with request_priority("background"):
+            response = self.llm.invoke(prompt)
         
+        # Extract content from response
+        if hasattr(response, 'content'):
+            return response.content
+        return str(response)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return analysis outcome and token counters"""
         return {
-            "message_statistics": {
-                "total_messages": len(messages),
-                "avg_words_per_message": total_words / len(messages),
-                "avg_chars_per_message": total_chars / len(messages),
-                "avg_sentiment": avg_sentiment,
-                "common_words": [word for word, count in common_words],
-                "exclamation_frequency": exclamations / len(messages),
-                "question_frequency": questions / len(messages)
-            }
+            "analyses": self.analyses,
+            "repaired": self.repaired,
+            "failed": self.failed,
+            "success_rate": (self.analyses - self.failed) / self.analyses if self.analyses else 0.0,
+            "repair_tokens": self.repair_tokens,
+            "wasted_tokens": self.wasted_tokens
         }
     
+    def _compact_profile(self, profile: Dict[str, Any]) -> str:
+        """The estimated parts of the profile as compact JSON, with lists shortened"""
+        compact = {}
+        for key, value in profile.items():
+            if key in UNANALYZED_FIELDS:
+                continue
+            if isinstance(value, list):
+                value = value[:10]
+            elif isinstance(value, dict):
+                value = {k: v[:10] if isinstance(v, list) else v for k, v in value.items()}
+            compact[key] = value
+        return json.dumps(compact, separators=(",", ":"))
+    
+    def _calculate_message_statistics(self, messages: List[str]) -> Dict[str, Any]:
+        """Calculate statistical patterns from messages"""
+        if not messages:
+            return {}
+        
+        return MessageStatistics.from_messages(messages).summary()
+    
     def _get_default_profile(self) -> Dict[str, Any]:
         """Return default personality profile"""
         return {
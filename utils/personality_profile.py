@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+# Fields measured over the current window rather than estimated, so a new value replaces the old one
+REPLACED_FIELDS = ("message_statistics", "last_analyzed_id")
+
+def _as_number(value: Any) -> Optional[float]:
+    """A score as a float, or None when the value is not numeric"""
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def merge_traits(current: Dict[str, Any], delta: Dict[str, Any], alpha: float, list_limit: int) -> Dict[str, Any]:
+    """Blend delta into current: scores by exponentially weighted average, lists deduplicated newest first"""
+    merged = dict(current)
+    for key, new in delta.items():
+        old = current.get(key)
+        if old is None or key in REPLACED_FIELDS:
+            merged[key] = new
+        elif isinstance(old, dict) and isinstance(new, dict):
+            merged[key] = merge_traits(old, new, alpha, list_limit)
+        elif isinstance(old, list) and isinstance(new, list):
+            seen, items = set(), []
+            for item in new + old:
+                marker = item.strip().lower() if isinstance(item, str) else repr(item)
+                if marker not in seen:
+                    seen.add(marker)
+                    items.append(item)
+            merged[key] = items[:list_limit]
+        else:
+            old_score, new_score = _as_number(old), _as_number(new)
+            if old_score is not None and new_score is not None:
+                merged[key] = round((1 - alpha) * old_score + alpha * new_score, 2)
+            elif old_score is None:
+                merged[key] = new
+            # Otherwise the model returned no score for a scored field, so the old score stands
+    return merged
+
+class PersonalityProfile:
+    """Read-only snapshot of the learned personality profile.
+
+    Every update creates a new snapshot with the next revision, so views
+    derived from one (prompt context, dashboard summary, charts) are
+    computed once and reused until the profile changes.
+    """
+
+    def __init__(self, data: Dict[str, Any], revision: int = 0):
+        self.data = data
+        self.revision = revision
+        self._views: Dict[str, Any] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Look up a profile field"""
+        return self.data.get(key, default)
+
+    def view(self, name: str, render: Callable[[Dict[str, Any]], Any]) -> Any:
+        """Render a derived view of this revision once and memoize it"""
+        if name not in self._views:
+            # Concurrent first renders produce equal values, so the last one simply wins
+            self._views[name] = render(self.data)
+        return self._views[name]
+
+    def updated(self, traits: Dict[str, Any]) -> "PersonalityProfile":
+        """New snapshot with traits applied and the next revision"""
+        data = dict(self.data)
+        data.update(traits)
+        data['last_updated'] = datetime.now().isoformat()
+        return PersonalityProfile(data, self.revision + 1)
+
+    def merged(self, delta: Dict[str, Any], alpha: float, list_limit: int) -> "PersonalityProfile":
+        """New snapshot with an incremental analysis blended in and the next revision"""
+        data = merge_traits(self.data, delta, alpha, list_limit)
+        data['last_updated'] = datetime.now().isoformat()
+        return PersonalityProfile(data, self.revision + 1)
+
+    def cleared(self) -> "PersonalityProfile":
+        """Empty snapshot with the next revision"""
+        return PersonalityProfile({}, self.revision + 1)
@@ -0,0 +1,207 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import tiktoken
+from config import Config
+
+# Instructions never change, so they lead the prompt where provider-side prefix caching can reuse them
+PROMPT_PREFIX = """You are MirrorMe, an AI that learns to mirror the user's personality and communication style over time.
+
+INSTRUCTIONS:
+1. Respond in the user's typical communication style based on the personality profile
+2. Use similar tone, formality level, and enthusiasm as shown in past messages
+3. Reference their interests and use their favorite phrases when appropriate
+4. Keep responses concise and engaging
+5. Gradually become more like them as you learn more about their style"""
+
+NO_PERSONALITY = "User personality still being learned..."
+NO_SIMILAR_MESSAGES = "No similar messages found yet."
+NO_CONVERSATION = "Start of conversation"
+
+_counters: Dict[str, "TokenCounter"] = {}
+_counters_lock = threading.Lock()
+
+class TokenCounter:
+    """Counts tokens with the model's tiktoken encoding, remembering recent texts"""
+
+    def __init__(self, model: str, cache_size: int = 1024):
+        self.model = model
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        try:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # The encoding is downloaded on first use; without it, estimate from length
+            print(f"Error loading tokenizer, estimating token counts: {e}")
+            self.encoding = None
+
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        with self._lock:
+            if text in self._cache:
+                self._cache.move_to_end(text)
+                return self._cache[text]
+
+        tokens = len(self.encoding.encode(text)) if self.encoding else (len(text) + 3) // 4
+        with self._lock:
+            self._cache[text] = tokens
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text down to at most max_tokens tokens"""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding:
+            return self.encoding.decode(self.encoding.encode(text)[:max_tokens])
+        return text[:max_tokens * 4]
+
+def get_token_counter(model: Optional[str] = None) -> TokenCounter:
+    """Get the process-wide token counter for a model"""
+    model = model or Config.MODEL_NAME
+    with _counters_lock:
+        if model not in _counters:
+            _counters[model] = TokenCounter(model)
+        return _counters[model]
+
+def prompt_token_budget() -> int:
+    """Tokens available to the prompt after reserving room for the reply"""
+    return min(Config.PROMPT_TOKEN_BUDGET, Config.MODEL_CONTEXT_TOKENS - (Config.MAX_TOKENS or 0))
+
+def render_personality_context(profile: Dict[str, Any]) -> str:
+    """Format the personality profile for the prompt"""
+    if not profile:
+        return NO_PERSONALITY
+
+    context = []
+
+    # Communication style
+    comm_style = profile.get("communication_style", {})
+    if comm_style:
+        context.append(f"Communication Style: {comm_style.get('tone', 'neutral')} tone, "
+                     f"formality level {comm_style.get('formality_level', 5)}/10")
+
+    # Personality traits
+    personality = profile.get("personality_traits", {})
+    if personality:
+        traits = []
+        for trait, score in personality.items():
+            if score > 7:
+                traits.append(f"high {trait}")
+            elif score < 4:
+                traits.append(f"low {trait}")
+        if traits:
+            context.append(f"Personality: {', '.join(traits)}")
+
+    # Interests
+    interests = profile.get("interests_and_topics", [])
+    if interests:
+        context.append(f"Interests: {', '.join(interests[:5])}")
+
+    # Favorite phrases
+    phrases = profile.get("favorite_phrases", [])
+    if phrases:
+        context.append(f"Typical phrases: {', '.join(phrases[:3])}")
+
+    # Message statistics
+    stats = profile.get("message_statistics", {})
+    if stats:
+        avg_words = stats.get("avg_words_per_message", 0)
+        sentiment = stats.get("avg_sentiment", 0)
+        context.append(f"Typical message length: {avg_words:.1f} words")
+
+        if sentiment > 0.1:
+            context.append("Generally positive tone")
+        elif sentiment < -0.1:
+            context.append("Generally more reserved tone")
+
+    return "\n".join(context) if context else NO_PERSONALITY
+
+def format_similar_messages(messages: List[str]) -> str:
+    """Number similar messages for the prompt"""
+    if not messages:
+        return NO_SIMILAR_MESSAGES
+    return "\n".join(f"{i}. {msg}" for i, msg in enumerate(messages, 1))
+
+def format_conversation_message(message: Dict[str, Any]) -> str:
+    """One line of conversation context"""
+    role = "User" if message["role"] == "user" else "Assistant"
+    return f"{role}: {message['content']}"
+
+class PromptBuilder:
+    """Assembles the chat prompt, filling sections by priority within a token budget.
+
+    The current message always fits, truncated if need be. The personality
+    profile comes next, then recent conversation newest first, then similar
+    past messages in rank order.
+    """
+
+    def __init__(self, counter: Optional[TokenCounter] = None, budget: Optional[int] = None):
+        self.counter = counter or get_token_counter()
+        self.budget = budget
+
+    def build(self, personality_context: str, similar_messages: List[str],
+              conversation: List[Dict[str, Any]], user_input: str) -> Tuple[str, Dict[str, Any]]:
+        """Return the prompt text and its token counts per section"""
+        count = self.counter.count
+        budget = self.budget or prompt_token_budget()
+        # Headers, separators and placeholders; constant, so counted once and cached
+        used = count(self._render(NO_PERSONALITY, [], NO_CONVERSATION, ""))
+        stats = {"fixed": used}
+
+        # The message being answered was stored before the prompt was built
+        if conversation and conversation[-1]["role"] == "user" and conversation[-1]["content"] == user_input:
+            conversation = conversation[:-1]
+
+        if used + count(user_input) > budget:
+            user_input = self.counter.truncate(user_input, budget - used)
+        stats["input"] = count(user_input)
+        used += stats["input"]
+
+        # The placeholder is already counted, so a profile costs only the difference
+        personality_context = personality_context or NO_PERSONALITY
+        extra = count(personality_context) - count(NO_PERSONALITY)
+        if used + extra > budget:
+            personality_context, extra = NO_PERSONALITY, 0
+        stats["personality"] = count(personality_context)
+        used += extra
+
+        lines = []
+        for message in reversed(conversation):
+            line = format_conversation_message(message)
+            if used + count(line) + 1 > budget:
+                break
+            lines.append(line)
+            used += count(line) + 1
+        lines.reverse()
+
+        kept = []
+        for msg in similar_messages:
+            line_tokens = count(f"{len(kept) + 1}. {msg}") + 1
+            if used + line_tokens <= budget:
+                kept.append(msg)
+                used += line_tokens
+
+        stats["conversation_messages"] = len(lines)
+        stats["similar_messages"] = len(kept)
+        stats["dropped"] = len(conversation) - len(lines) + len(similar_messages) - len(kept)
+        stats["total"] = used
+        stats["budget"] = budget
+        return self._render(personality_context, kept, "\n".join(lines) or NO_CONVERSATION, user_input), stats
+
+    def _render(self, personality_context: str, similar_messages: List[str],
+                conversation_context: str, user_input: str) -> str:
+        """Lay out the prompt from its most stable part to its least"""
+        return "\n\n".join([
+            PROMPT_PREFIX,
+            f"PERSONALITY PROFILE:\n{personality_context}",
+            f"SIMILAR PAST MESSAGES:\n{format_similar_messages(similar_messages)}",
+            f"CONVERSATION CONTEXT:\n{conversation_context}",
+            f"Current message: {user_input}",
+            "Response:"
+        ])
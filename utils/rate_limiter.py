@@ -0,0 +1,171 @@
+import asyncio
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+import httpx
+
+# Priority classes, most urgent first
+PRIORITIES = ("interactive", "embedding", "background")
+
+_priority: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_priority", default=None)
+
+class RateLimitTimeout(httpx.TransportError):
+    """A call waited longer than allowed for rate limit budget"""
+
+@contextmanager
+def request_priority(priority: str) -> Iterator[None]:
+    """Send the provider calls made inside the block with the given priority class"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def request_class(request: httpx.Request) -> str:
+    """Priority class of a request: the one set by request_priority, else by endpoint"""
+    return _priority.get() or ("embedding" if request.url.path.endswith("/embeddings") else "interactive")
+
+def estimate_request_tokens(request: httpx.Request) -> int:
+    """Tokens a request counts against the provider's budget"""
+    try:
+        return estimate_body_tokens(json.loads(request.content or b"{}"))
+    except ValueError:
+        return 1
+
+def estimate_body_tokens(body: Dict[str, Any]) -> int:
+    """Tokens of a chat or embedding request body: its input plus the most it may generate"""
+    text_chars, token_ids = 0, 0
+    inputs = body.get("input", [])
+    for item in inputs if isinstance(inputs, list) else [inputs]:
+        if isinstance(item, str):
+            text_chars += len(item)
+        elif isinstance(item, list):
+            # Embedding clients may send inputs already split into token IDs
+            token_ids += len(item)
+    for message in body.get("messages", []):
+        content = message.get("content")
+        text_chars += len(content) if isinstance(content, str) else len(json.dumps(content))
+    max_output = body.get("max_tokens") or body.get("max_completion_tokens") or 0
+    # Providers meter rate limits on roughly four characters a token, before any tokenizer runs
+    return max(1, token_ids + (text_chars + 3) // 4 + max_output)
+
+class TokenBucket:
+    """Budget refilled continuously up to a per-minute capacity"""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float]):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.clock = clock
+        self.level = per_minute
+        self._updated = clock()
+
+    def refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, reserve: float) -> float:
+        """Seconds until amount fits while leaving reserve untouched, 0 if it fits now"""
+        # A call bigger than the whole bucket waits for a full bucket rather than forever
+        amount = min(amount, self.capacity - reserve)
+        missing = amount + reserve - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+class RateLimiter:
+    """Client-side scheduler keeping calls within requests and tokens per minute.
+
+    Each priority class may only draw a budget down to its reserve, the
+    share kept for more urgent classes, and waits while a more urgent
+    call is waiting. Interactive turns therefore go first while
+    background analysis uses whatever capacity they leave.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 reserves: Optional[Dict[str, float]] = None, max_wait: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.max_wait = max_wait
+        self.reserves = reserves or {}
+        self.buckets = [TokenBucket(limit, clock) for limit in (requests_per_minute, tokens_per_minute) if limit > 0]
+        self._request_bucket = self.buckets[0] if requests_per_minute > 0 else None
+
+        self.granted = {priority: 0 for priority in PRIORITIES}
+        self.waited = {priority: 0.0 for priority in PRIORITIES}
+        self.timeouts = 0
+
+        self._waiting = {priority: 0 for priority in PRIORITIES}
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int, priority: str = "interactive"):
+        """Block until a call of this many tokens fits the budget"""
+        start = self.clock()
+        with self._lock:
+            self._waiting[priority] += 1
+        try:
+            while True:
+                delay = self._try_acquire(tokens, priority, start)
+                if delay == 0:
+                    return
+                time.sleep(delay)
+        finally:
+            with self._lock:
+                self._waiting[priority] -= 1
+
+    async def aacquire(self, tokens: int, priority: str = "interactive"):
+        """Async version of acquire"""
+        start = self.clock()
+        with self._lock:
+            self._waiting[priority] += 1
+        try:
+            while True:
+                delay = self._try_acquire(tokens, priority, start)
+                if delay == 0:
+                    return
+                await asyncio.sleep(delay)
+        finally:
+            with self._lock:
+                self._waiting[priority] -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return calls granted and seconds waited per class, and budget left"""
+        with self._lock:
+            for bucket in self.buckets:
+                bucket.refill()
+            return {
+                "granted": dict(self.granted),
+                "waited_seconds": dict(self.waited),
+                "waiting": dict(self._waiting),
+                "timeouts": self.timeouts,
+                "budget_left": [bucket.level for bucket in self.buckets]
+            }
+
+    def _try_acquire(self, tokens: int, priority: str, start: float) -> float:
+        """Take budget and return 0, or return how long to wait before trying again"""
+        with self._lock:
+            now = self.clock()
+            rank = PRIORITIES.index(priority)
+            if any(self._waiting[other] for other in PRIORITIES[:rank]):
+                # Let the more urgent call go first
+                delay = 0.01
+            else:
+                reserve = self.reserves.get(priority, 0.0)
+                amounts = [1 if bucket is self._request_bucket else tokens for bucket in self.buckets]
+                delay = 0.0
+                for bucket, amount in zip(self.buckets, amounts):
+                    bucket.refill()
+                    delay = max(delay, bucket.wait_time(amount, reserve * bucket.capacity))
+                if delay == 0:
+                    for bucket, amount in zip(self.buckets, amounts):
+                        bucket.level -= min(amount, bucket.level)
+                    self.granted[priority] += 1
+                    self.waited[priority] += now - start
+                    return 0.0
+
+            if now - start + delay > self.max_wait:
+                self.timeouts += 1
+                raise RateLimitTimeout(f"no {priority} rate limit budget within {self.max_wait:.0f}s")
+            # Wake up soon enough to notice a more urgent call arriving
+            return min(delay, 0.05)
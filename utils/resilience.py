@@ -0,0 +1,226 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+import httpx
+from utils.rate_limiter import RateLimiter, estimate_request_tokens, request_class
+
+# Statuses worth retrying: rate limiting and server-side failures
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+class CircuitOpenError(httpx.TransportError):
+    """The provider failed repeatedly, so calls fail fast until the breaker resets"""
+
+class CircuitBreaker:
+    """Stops calls to a degraded provider after consecutive failures.
+
+    Closed: calls go through. After failure_threshold failures in a row
+    the breaker opens and calls fail at once. Once reset_timeout has
+    passed it lets a single trial call through (half-open); success
+    closes it again, failure re-opens it. A trial that ends without a
+    verdict is released, and one with no verdict after reset_timeout is
+    given up on, so a lost trial never blocks the provider for good.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+
+        self.state = "closed"  # closed, open or half-open
+        self.consecutive_failures = 0
+        self.opened = 0
+        self.rejected = 0
+
+        self._opened_at = 0.0
+        self._trial_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go through now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = self.clock()
+            if (self.state == "open" and now - self._opened_at >= self.reset_timeout) or (
+                    self.state == "half-open" and now - self._trial_at >= self.reset_timeout):
+                self.state = "half-open"
+                self._trial_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """A call succeeded"""
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        """A call failed in a way that suggests the provider is degraded"""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half-open" or (
+                    self.state == "closed" and self.consecutive_failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened += 1
+                self._opened_at = self.clock()
+
+    def release(self):
+        """A call ended without telling whether the provider works, so another trial may go"""
+        with self._lock:
+            if self.state == "half-open":
+                self.state = "open"
+                self._opened_at = self.clock() - self.reset_timeout
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return state and counters"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honouring Retry-After"""
+
+    def __init__(self, max_retries: int, base_delay: float, max_delay: float):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Seconds to wait before retry number attempt, counting from 0"""
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(self.max_delay, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+class _ResilientTransportMixin:
+    """Shared bookkeeping for the sync and async transports"""
+
+    def _setup(self, policy: RetryPolicy, breaker: CircuitBreaker, limiter: Optional[RateLimiter]):
+        self.policy = policy
+        self.breaker = breaker
+        self.limiter = limiter
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _check_breaker(self, request: httpx.Request):
+        self.requests += 1
+        if not self.breaker.allow():
+            raise CircuitOpenError("provider circuit open, failing fast", request=request)
+
+    def _budget(self, request: httpx.Request):
+        """Token estimate and priority class the rate limiter charges each attempt of a request"""
+        return estimate_request_tokens(request), request_class(request)
+
+    def _failed(self, attempt: int) -> bool:
+        """Record a failed attempt, returning whether to retry it"""
+        self.breaker.record_failure()
+        if attempt < self.policy.max_retries and self.breaker.state == "closed":
+            self.retries += 1
+            return True
+        self.failures += 1
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return request, retry and failure counters with the breaker's state"""
+        return {"requests": self.requests, "retries": self.retries, "failures": self.failures,
+                "breaker": self.breaker.get_stats()}
+
+class ResilientTransport(_ResilientTransportMixin, httpx.BaseTransport):
+    """HTTP transport that retries transient failures, respects a circuit breaker and waits for rate limit budget"""
+
+    def __init__(self, transport: httpx.BaseTransport, policy: RetryPolicy, breaker: CircuitBreaker,
+                 limiter: Optional[RateLimiter] = None):
+        self.transport = transport
+        self._setup(policy, breaker, limiter)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._check_breaker(request)
+        tokens, priority = self._budget(request)
+        attempt = 0
+        settled = False
+        try:
+            while True:
+                if self.limiter:
+                    self.limiter.acquire(tokens, priority)
+                try:
+                    response = self.transport.handle_request(request)
+                except httpx.TransportError:
+                    if not self._failed(attempt):
+                        settled = True
+                        raise
+                    time.sleep(self.policy.delay(attempt))
+                else:
+                    if response.status_code not in RETRY_STATUSES:
+                        self.breaker.record_success()
+                        settled = True
+                        return response
+                    if not self._failed(attempt):
+                        settled = True
+                        return response
+                    delay = self.policy.delay(attempt, response)
+                    # Reading the short error body lets the connection go back to the pool
+                    response.read()
+                    response.close()
+                    time.sleep(delay)
+                attempt += 1
+        finally:
+            # Waiting for budget timed out, or the call was interrupted
+            if not settled:
+                self.breaker.release()
+
+    def close(self):
+        self.transport.close()
+
+class AsyncResilientTransport(_ResilientTransportMixin, httpx.AsyncBaseTransport):
+    """Async version of ResilientTransport"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, policy: RetryPolicy, breaker: CircuitBreaker,
+                 limiter: Optional[RateLimiter] = None):
+        self.transport = transport
+        self._setup(policy, breaker, limiter)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._check_breaker(request)
+        tokens, priority = self._budget(request)
+        attempt = 0
+        settled = False
+        try:
+            while True:
+                if self.limiter:
+                    await self.limiter.aacquire(tokens, priority)
+                try:
+                    response = await self.transport.handle_async_request(request)
+                except httpx.TransportError:
+                    if not self._failed(attempt):
+                        settled = True
+                        raise
+                    await asyncio.sleep(self.policy.delay(attempt))
+                else:
+                    if response.status_code not in RETRY_STATUSES:
+                        self.breaker.record_success()
+                        settled = True
+                        return response
+                    if not self._failed(attempt):
+                        settled = True
+                        return response
+                    delay = self.policy.delay(attempt, response)
+                    await response.aread()
+                    await response.aclose()
+                    await asyncio.sleep(delay)
+                attempt += 1
+        finally:
+            if not settled:
+                self.breaker.release()
+
+    async def aclose(self):
+        await self.transport.aclose()
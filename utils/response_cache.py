@@ -0,0 +1,156 @@
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Punctuation that does not change what a short message asks for, so "hi!" and "hi" share a reply
+TRAILING_PUNCTUATION = ".!?,~ "
+
+def normalize_input(text: str) -> str:
+    """Case-folded text with collapsed whitespace and no trailing punctuation"""
+    text = " ".join(unicodedata.normalize("NFC", text).casefold().split())
+    return text.rstrip(TRAILING_PUNCTUATION) or text
+
+class CachedResponse:
+    """A stored reply with its expiry, lookup scope and what producing it cost"""
+
+    __slots__ = ("response", "expires_at", "scope", "vector", "cost")
+
+    def __init__(self, response: str, expires_at: float, scope: str, vector: Optional[np.ndarray], cost: float):
+        self.response = response
+        self.expires_at = expires_at
+        self.scope = scope
+        self.vector = vector
+        self.cost = cost
+
+class ResponseCache:
+    """LRU cache of replies keyed on the normalized input, profile revision and recent user messages.
+
+    Entries expire after ttl seconds. With a similarity threshold set,
+    an input that misses exactly can still reuse the reply to a near
+    duplicate asked under the same profile revision and user messages.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, similarity_threshold: float = 0.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.clock = clock
+
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._scopes: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def semantic(self) -> bool:
+        """Whether near-duplicate inputs are matched by embedding"""
+        return self.similarity_threshold > 0
+
+    def make_key(self, user_input: str, revision: int, context: Sequence[str]) -> Tuple[str, str]:
+        """Exact key for an input, and the scope of revision and preceding user messages it was asked in"""
+        digest = hashlib.sha256(str(revision).encode("utf-8"))
+        # Only the user's side: the model's replies are almost never repeated, so keying on them never hits
+        for message in context:
+            digest.update(f"\0{normalize_input(message)}".encode("utf-8"))
+        scope = digest.hexdigest()
+        key = hashlib.sha256(f"{scope}\0{normalize_input(user_input)}".encode("utf-8")).hexdigest()
+        return key, scope
+
+    def get(self, key: str, scope: str, vector: Optional[Sequence[float]] = None) -> Optional[str]:
+        """Cached reply for the key, or for the nearest input in its scope when a vector is given"""
+        now = self.clock()
+        with self._lock:
+            entry = self._live_entry(key, now)
+            if entry is None and vector is not None and self.semantic:
+                entry = self._nearest(scope, self._unit(vector), now)
+                if entry is not None:
+                    self.semantic_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += entry.cost
+            return entry.response
+
+    def put(self, key: str, scope: str, response: str, vector: Optional[Sequence[float]] = None, cost: float = 0.0):
+        """Store a reply, along with the input's vector for near-duplicate matching and its cost in seconds"""
+        unit = self._unit(vector) if vector is not None and self.semantic else None
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = CachedResponse(response, self.clock() + self.ttl, scope, unit, cost)
+            self._scopes.setdefault(scope, []).append(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the model time saved by hits"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "entries": len(self._entries)
+        }
+
+    def _live_entry(self, key: str, now: float, touch: bool = True) -> Optional[CachedResponse]:
+        """The entry for key if it has not expired, marked most recently used unless touch is off"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._drop(key)
+            self.expired += 1
+            return None
+        if touch:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _nearest(self, scope: str, unit: np.ndarray, now: float) -> Optional[CachedResponse]:
+        """Most similar live entry in scope at or above the similarity threshold"""
+        best_key, best_score = None, self.similarity_threshold
+        for key in list(self._scopes.get(scope, ())):
+            entry = self._live_entry(key, now, touch=False)
+            if entry is None or entry.vector is None:
+                continue
+            score = float(entry.vector @ unit)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return self._live_entry(best_key, now) if best_key else None
+
+    def _drop(self, key: str):
+        """Remove an entry and its place in its scope"""
+        entry = self._entries.pop(key)
+        keys = self._scopes[entry.scope]
+        keys.remove(key)
+        if not keys:
+            del self._scopes[entry.scope]
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        """Vector scaled to unit length, so dot products are cosine similarities"""
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,77 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+import numpy as np
+from textblob import TextBlob
+from config import Config
+
+NEGATIONS = frozenset({"no", "not", "never", "n't"})
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+def _textblob_polarity(text: str) -> float:
+    return TextBlob(text).sentiment.polarity
+
+class TextBlobScorer:
+    """Sentiment polarity from TextBlob's pattern analyzer"""
+
+    name = "textblob"
+
+    def score(self, text: str) -> float:
+        """Polarity of one text, from -1 to 1"""
+        return _textblob_polarity(text)
+
+    def score_batch(self, texts: List[str], processes: int = 0) -> List[float]:
+        """Polarity of many texts, spread over worker processes when processes > 1"""
+        if processes > 1 and len(texts) > processes:
+            with ProcessPoolExecutor(processes) as pool:
+                return list(pool.map(_textblob_polarity, texts, chunksize=max(len(texts) // (processes * 4), 1)))
+        return [_textblob_polarity(text) for text in texts]
+
+class LexiconScorer:
+    """Fast approximate polarity: mean lexicon score of known words, with simple negation"""
+
+    name = "lexicon"
+
+    def __init__(self):
+        # TextBlob's own word list, flattened once into a word -> polarity table
+        from textblob.en import sentiment as lexicon
+        self.table = {}
+        for word, tags in lexicon.items():
+            values = tags.get(None) or next(iter(tags.values()))
+            if " " not in word:
+                self.table[word] = values[0]
+
+    def score(self, text: str) -> float:
+        """Polarity of one text, from -1 to 1"""
+        return self.score_batch([text])[0]
+
+    def score_batch(self, texts: List[str], processes: int = 0) -> List[float]:
+        """Polarity of many texts; lookups are already cheap, so processes is ignored"""
+        rows, weights = [], []
+        table = self.table
+        for row, text in enumerate(texts):
+            negated = False
+            for token in TOKEN_PATTERN.findall(text.lower()):
+                polarity = table.get(token)
+                if polarity is not None:
+                    rows.append(row)
+                    weights.append(-0.5 * polarity if negated else polarity)
+                negated = token in NEGATIONS or token.endswith("n't")
+
+        # Per-text means in two bincounts instead of a Python loop per text
+        rows = np.asarray(rows, dtype=np.int64)
+        totals = np.bincount(rows, weights=np.asarray(weights, dtype=np.float64), minlength=len(texts))
+        counts = np.bincount(rows, minlength=len(texts))
+        means = np.divide(totals, counts, out=np.zeros(len(texts)), where=counts > 0)
+        return np.clip(means, -1.0, 1.0).tolist()
+
+def get_sentiment_scorer(backend: Optional[str] = None):
+    """Create the sentiment scorer selected by Config.SENTIMENT_BACKEND"""
+    backend = backend or Config.SENTIMENT_BACKEND
+
+    if backend == "textblob":
+        return TextBlobScorer()
+    if backend == "lexicon":
+        return LexiconScorer()
+
+    raise ValueError(f"Unknown sentiment backend: {backend}")
@@ -0,0 +1,384 @@
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from config import Config
+from utils.embeddings import embed_array
+
+BUILD_CHUNK = 65536  # Vectors copied out of the exact index at a time while building
+
+class MessageVectorIndex:
+    """FAISS index of message embeddings keyed by stable message IDs.
+
+    The exact flat index holds every vector. Past VECTOR_INDEX_HNSW_MIN or
+    VECTOR_INDEX_IVF_MIN vectors an approximate index is built on top of it
+    to find candidates, which are re-ranked by exact distance.
+    """
+
+    def __init__(self, embeddings, index=None, documents: Optional[Dict[int, Document]] = None):
+        self.embeddings = embeddings
+        self.index = index
+        self.documents = documents or {}
+
+        self.ann = None
+        self.ann_kind = "flat"
+        self.last_build_seconds = 0.0
+        self._ann_inner = None
+        self._trained_size = 0
+        self._stale = 0
+        self._pending: Optional[List[int]] = None
+        self._build_thread: Optional[threading.Thread] = None
+        self._failed_kind: Optional[str] = None
+        self._lock = threading.RLock()
+        self._maybe_rebuild()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add_messages(self, messages: List[Dict[str, Any]]):
+        """Embed and index messages under their IDs"""
+        if not messages:
+            return
+
+        vectors = embed_array(self.embeddings, [msg['content'] for msg in messages])
+        documents = [Document(page_content=msg['content'],
+                              metadata={"id": msg['id'], "timestamp": msg['timestamp']})
+                     for msg in messages]
+        self.add_embeddings([msg['id'] for msg in messages], vectors, documents)
+
+    def add_embeddings(self, ids: List[int], vectors, documents: List[Document]):
+        """Index precomputed vectors under their IDs"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        id_array = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            if self.index is None:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+
+            self.index.add_with_ids(vectors, id_array)
+            for doc_id, doc in zip(ids, documents):
+                self.documents[doc_id] = doc
+
+            # The current approximate index keeps serving, so it must see new vectors too
+            if self.ann is not None:
+                self.ann.add_with_ids(vectors, id_array)
+            if self._pending is not None:
+                self._pending.extend(ids)
+        self._maybe_rebuild()
+
+    def remove(self, ids: List[int]):
+        """Remove messages from the index"""
+        ids = [doc_id for doc_id in ids if doc_id in self.documents]
+        if not ids:
+            return
+
+        with self._lock:
+            self.index.remove_ids(np.asarray(ids, dtype=np.int64))
+            for doc_id in ids:
+                del self.documents[doc_id]
+            # HNSW cannot delete, so removed IDs are filtered from results until the next rebuild
+            if self.ann is not None:
+                self._stale += len(ids)
+        self._maybe_rebuild()
+
+    def get_vectors(self, ids: List[int]) -> np.ndarray:
+        """Stored embeddings of indexed messages, one row per ID"""
+        ids = [doc_id for doc_id in ids if doc_id in self.documents]
+        if not ids:
+            return np.zeros((0, self.index.d if self.index is not None else 0), dtype=np.float32)
+        with self._lock:
+            return self.index.reconstruct_batch(np.asarray(ids, dtype=np.int64))
+
+    def wait_for_build(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a background index build to finish, returning False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # A finished build may start another, e.g. when the index outgrew its tier meanwhile
+        while self._pending is not None:
+            thread = self._build_thread
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            if thread is not None:
+                thread.join(remaining)
+            else:
+                time.sleep(0.01)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Describe the index currently serving searches"""
+        return {
+            "vectors": len(self.documents),
+            "kind": self.ann_kind,
+            "building": self._pending is not None,
+            "stale": self._stale,
+            "last_build_seconds": self.last_build_seconds
+        }
+
+    def similarity_search_with_score(self, query: str, k: int = 3) -> List[Tuple[Document, float]]:
+        """Find the k nearest messages to a query with their L2 distances"""
+        if not self.documents:
+            return []
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k)
+
+    async def asimilarity_search_with_score(self, query: str, k: int = 3) -> List[Tuple[Document, float]]:
+        """Async version of similarity_search_with_score"""
+        if not self.documents:
+            return []
+        return self.similarity_search_by_vector(await self.embeddings.aembed_query(query), k)
+
+    def similarity_search_by_vector(self, vector, k: int = 3) -> List[Tuple[Document, float]]:
+        """Find the k nearest messages to an embedding with their L2 distances"""
+        if not self.documents:
+            return []
+
+        query = np.asarray([vector], dtype=np.float32)
+        with self._lock:
+            results = self._search_approximate(query, k) if self.ann is not None else None
+            if results is None:
+                distances, ids = self.index.search(query, min(k, len(self.documents)))
+                results = zip(ids[0], distances[0])
+            return [(self.documents[int(doc_id)], float(distance))
+                    for doc_id, distance in results
+                    if doc_id != -1]
+
+    def _search_approximate(self, query: np.ndarray, k: int):
+        """Candidates from the approximate index, re-ranked by exact distance"""
+        k = min(k, len(self.documents))
+        live_share = max(1.0 - self._stale / max(self.ann.ntotal, 1), 0.1)
+        fetch = min(math.ceil(k * Config.VECTOR_INDEX_REFINE / live_share) + k, self.ann.ntotal)
+
+        if self.ann_kind == "hnsw":
+            self._ann_inner.hnsw.efSearch = max(Config.HNSW_EF_SEARCH, fetch)
+        else:
+            self._ann_inner.nprobe = Config.IVF_NPROBE
+        _, ids = self.ann.search(query, fetch)
+
+        candidates = [int(doc_id) for doc_id in dict.fromkeys(ids[0].tolist())
+                      if doc_id != -1 and doc_id in self.documents]
+        if len(candidates) < k:
+            return None
+
+        vectors = self.index.reconstruct_batch(np.asarray(candidates, dtype=np.int64))
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        order = np.argsort(distances, kind="stable")[:k]
+        return [(candidates[i], distances[i]) for i in order]
+
+    def _target_kind(self) -> str:
+        """Index kind for the current vector count, with slack before stepping down a tier"""
+        count = len(self.documents)
+        if self.ann_kind == "ivfpq" and count >= 0.8 * Config.VECTOR_INDEX_IVF_MIN:
+            return "ivfpq"
+        if count >= Config.VECTOR_INDEX_IVF_MIN:
+            return "ivfpq"
+        if self.ann_kind == "hnsw" and count >= 0.8 * Config.VECTOR_INDEX_HNSW_MIN:
+            return "hnsw"
+        if count >= Config.VECTOR_INDEX_HNSW_MIN:
+            return "hnsw"
+        return "flat"
+
+    def _maybe_rebuild(self):
+        """Start building a new approximate index if the tier changed or the current one went stale"""
+        with self._lock:
+            if self._pending is not None or self.index is None:
+                return
+            kind = self._target_kind()
+            if kind == "flat":
+                self.ann, self.ann_kind, self._ann_inner, self._stale = None, "flat", None, 0
+                return
+            if kind == self._failed_kind:
+                return
+
+            outdated = (
+                kind != self.ann_kind
+                or self._stale > Config.VECTOR_INDEX_STALE_RATIO * self.ann.ntotal
+                or (kind == "ivfpq" and len(self.documents) > 2 * self._trained_size)
+            )
+            if not outdated:
+                return
+
+            # Snapshot IDs only: vectors are copied a chunk at a time while building
+            ids = faiss.vector_to_array(self.index.id_map).copy()
+            self._pending = []
+
+        if Config.VECTOR_INDEX_BACKGROUND_BUILD:
+            self._build_thread = threading.Thread(target=self._build, args=(kind, ids),
+                                                  name="mirrorme-index-build", daemon=True)
+            self._build_thread.start()
+        else:
+            self._build(kind, ids)
+
+    def _build(self, kind: str, ids: np.ndarray):
+        """Build an approximate index over a snapshot of IDs and swap it in"""
+        start = time.perf_counter()
+        try:
+            ann, inner = self._new_ann_index(kind, ids)
+            added = 0
+            for chunk_start in range(0, len(ids), BUILD_CHUNK):
+                chunk = self._live_ids(ids[chunk_start:chunk_start + BUILD_CHUNK])
+                with self._lock:
+                    vectors = self.index.reconstruct_batch(chunk)
+                ann.add_with_ids(vectors, chunk)
+                added += len(chunk)
+        except Exception as e:
+            print(f"Error building {kind} vector index: {e}")
+            with self._lock:
+                self._pending = None
+                self._failed_kind = kind
+            return
+
+        # Catch up on messages added while building, holding the lock only for the last few
+        while True:
+            with self._lock:
+                pending, self._pending = self._live_ids(np.asarray(self._pending, dtype=np.int64)), []
+                vectors = self.index.reconstruct_batch(pending) if len(pending) else None
+                if len(pending) < 1000:
+                    if vectors is not None:
+                        ann.add_with_ids(vectors, pending)
+                        added += len(pending)
+                    self.ann, self.ann_kind, self._ann_inner = ann, kind, inner
+                    # Removed IDs stay in the new index and are filtered as stale
+                    self._stale = max(added - len(self.documents), 0)
+                    self._trained_size = len(ids)
+                    self._pending = None
+                    self._failed_kind = None
+                    self.last_build_seconds = time.perf_counter() - start
+                    break
+            ann.add_with_ids(vectors, pending)
+            added += len(pending)
+        self._maybe_rebuild()
+
+    def _live_ids(self, ids: np.ndarray) -> np.ndarray:
+        """IDs from a snapshot that are still indexed"""
+        with self._lock:
+            return np.asarray([doc_id for doc_id in ids.tolist() if doc_id in self.documents], dtype=np.int64)
+
+    def _new_ann_index(self, kind: str, ids: np.ndarray):
+        """Create an empty HNSW graph, or an IVF-PQ index trained on a sample of vectors"""
+        dims = self.index.d
+        if kind == "hnsw":
+            inner = faiss.IndexHNSWFlat(dims, Config.HNSW_M)
+            inner.hnsw.efConstruction = Config.HNSW_EF_CONSTRUCTION
+            return faiss.IndexIDMap(inner), inner
+
+        nlist = Config.IVF_NLIST or int(min(4 * math.sqrt(len(ids)), 1024))
+        nlist = max(1, min(nlist, len(ids) // 39))
+        subquantizers = max(m for m in range(1, min(Config.IVF_PQ_SUBQUANTIZERS, dims) + 1) if dims % m == 0)
+        sample_size = min(len(ids), max(40 * nlist, 10000))
+        sample = self._live_ids(np.random.default_rng(0).choice(ids, sample_size, replace=False))
+        # Codes only pick candidates for exact re-ranking, so coarse PQ training is enough
+        bits = int(min(8, max(4, math.log2(max(len(sample) // 39, 1)))))
+
+        inner = faiss.IndexIVFPQ(faiss.IndexFlatL2(dims), dims, nlist, subquantizers, bits)
+        inner.pq.cp.max_points_per_centroid = 39
+        inner.pq.cp.niter = 10
+        with self._lock:
+            vectors = self.index.reconstruct_batch(sample)
+        inner.train(vectors)
+        return inner, inner
+
+    def similarity_search(self, query: str, k: int = 3) -> List[Document]:
+        """Find the k nearest messages to a query"""
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+def maximal_marginal_relevance(relevance: np.ndarray, vectors: np.ndarray, k: int,
+                               lambda_mult: float = 0.7, duplicate_threshold: float = 1.0) -> List[int]:
+    """Pick k rows balancing relevance against similarity to rows already picked.
+
+    Rows must be unit length. Candidates at least duplicate_threshold
+    similar to a picked row are never picked.
+    """
+    count = len(relevance)
+    closest = np.full(count, -1.0)
+    available = np.ones(count, dtype=bool)
+    picked: List[int] = []
+
+    while len(picked) < k and available.any():
+        scores = np.where(available, lambda_mult * relevance - (1 - lambda_mult) * np.maximum(closest, 0), -np.inf)
+        choice = int(np.argmax(scores))
+        picked.append(choice)
+        available[choice] = False
+
+        # One matrix-vector product updates every candidate's similarity to the picked set
+        closest = np.maximum(closest, vectors @ vectors[choice])
+        available &= closest < duplicate_threshold
+    return picked
+
+class VectorIndexStore:
+    """Persists a message vector index, its docstore and a manifest to disk"""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self.index_file = os.path.join(index_dir, "index.faiss")
+        self.docstore_file = os.path.join(index_dir, "docstore.json")
+        self.manifest_file = os.path.join(index_dir, "manifest.json")
+
+    def load_manifest(self) -> Optional[Dict[str, Any]]:
+        """Load the manifest describing the saved index"""
+        if not os.path.exists(self.manifest_file):
+            return None
+
+        try:
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading index manifest: {e}")
+            return None
+
+    def load(self, embeddings) -> Optional[MessageVectorIndex]:
+        """Load the saved vector index; the FAISS index is read fully into memory"""
+        if not os.path.exists(self.docstore_file):
+            return None
+
+        try:
+            with open(self.docstore_file, 'r') as f:
+                stored = json.load(f)
+
+            documents = {
+                int(doc_id): Document(page_content=doc['page_content'], metadata=doc['metadata'])
+                for doc_id, doc in stored['docs'].items()
+            }
+
+            index = None
+            if os.path.exists(self.index_file):
+                index = faiss.read_index(self.index_file)
+
+            if (index.ntotal if index is not None else 0) != len(documents):
+                return None
+
+            return MessageVectorIndex(embeddings, index, documents)
+        except Exception as e:
+            print(f"Error loading vector index: {e}")
+            return None
+
+    def save(self, vector_index: MessageVectorIndex, manifest: Dict[str, Any]):
+        """Save the vector index and manifest, replacing files atomically"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        try:
+            docs = {str(doc_id): {"page_content": doc.page_content, "metadata": doc.metadata}
+                    for doc_id, doc in vector_index.documents.items()}
+
+            # Drop the manifest first so a partial save is never mistaken for a valid one
+            if os.path.exists(self.manifest_file):
+                os.remove(self.manifest_file)
+
+            if vector_index.index is not None:
+                faiss.write_index(vector_index.index, self.index_file + ".tmp")
+                os.replace(self.index_file + ".tmp", self.index_file)
+            elif os.path.exists(self.index_file):
+                os.remove(self.index_file)
+
+            self._write_json(self.docstore_file, {"docs": docs})
+            self._write_json(self.manifest_file, manifest)
+        except Exception as e:
+            print(f"Error saving vector index: {e}")
+
+    def _write_json(self, path: str, data: Any):
+        """Write JSON to a temporary file and rename it into place"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)